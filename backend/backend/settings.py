@@ -10,7 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
-from decouple import config # load .env file securely
+from decouple import Csv, config # load .env file securely
 
 from pathlib import Path
 
@@ -49,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so the sampled requests are timed end to end
+    "healthhub_back.common.profiling.ProfilingMiddleware",
+    "healthhub_back.common.tracing.TracingMiddleware",
+    "healthhub_back.common.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -94,6 +98,53 @@ DATABASES = {
     } ,
 }
 
+# With DATABASE_POOL, connections come from a per-process pool
+# (healthhub_back.common.mysqlpool): at most max_size open, min_size kept warm,
+# closed after max_idle (above min_size) or max_lifetime seconds, pinged on
+# checkout; checkouts wait at most timeout seconds for a free one
+if config('DATABASE_POOL', default=False, cast=bool):
+    DATABASES['default']['ENGINE'] = 'healthhub_back.common.mysqlpool'
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': config('DATABASE_POOL_MIN_SIZE', default=2, cast=int),
+            'max_size': config('DATABASE_POOL_MAX_SIZE', default=20, cast=int),
+            'max_lifetime': config('DATABASE_POOL_MAX_LIFETIME', default=1800, cast=int),
+            'max_idle': config('DATABASE_POOL_MAX_IDLE', default=600, cast=int),
+            'timeout': config('DATABASE_POOL_TIMEOUT', default=10, cast=int),
+        },
+    }
+
+# Read replicas of the default database ("host" or "host:port", same
+# credentials). Safe-method requests read from a healthy one, see
+# healthhub_back.common.replicas
+DATABASE_REPLICAS = []
+for index, replica in enumerate(config('DATABASE_REPLICA_HOSTS', default='', cast=Csv())):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['healthhub_back.common.replicas.ReplicaRouter']
+
+# Default cache. It holds the replica write pins, so it must be shared by the
+# processes (e.g. django.core.cache.backends.db.DatabaseCache with
+# CACHE_LOCATION=healthhub_cache, or Redis/Memcached) once replicas are set
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    },
+}
+
+# Seconds a client reads from the primary after writing, highest replica lag
+# (seconds) tolerated, and seconds between replica health checks
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=int)
+REPLICA_CHECK_INTERVAL = config('REPLICA_CHECK_INTERVAL', default=10, cast=int)
+
 
 
 
@@ -144,7 +195,7 @@ AUTH_USER_MODEL = 'healthhub_back.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'healthhub_back.common.auth.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -177,4 +228,58 @@ SWAGGER_SETTINGS = {
 
 LOGIN_URL = '/auth/login/'  
 
+# In-process cache of authenticated tokens (entries, seconds). The TTL is how
+# long the other worker processes keep accepting a revoked token.
+TOKEN_CACHE_SIZE = config('TOKEN_CACHE_SIZE', default=10000, cast=int)
+TOKEN_CACHE_TTL = config('TOKEN_CACHE_TTL', default=5, cast=int)
+
+# Lifetime (seconds) of the in-process medicament autocomplete index
+MEDICAMENT_INDEX_TTL = config('MEDICAMENT_INDEX_TTL', default=600, cast=int)
+
+# Lifetime (seconds) of the in-process technician loads used for exam assignment
+EXAM_ASSIGNMENT_TTL = config('EXAM_ASSIGNMENT_TTL', default=60, cast=int)
+
+# Push channels (nurse worklist): broker backend, events kept per channel, and
+# how long (seconds) a long-poll waits and an event stream stays open. Event
+# streams are only served under ASGI; event IDs are counted per broker, so
+# with InMemoryBroker they are only meaningful to the process that sent them.
+EVENTS_BROKER = config('EVENTS_BROKER', default='healthhub_back.common.events.InMemoryBroker')
+EVENTS_BACKLOG = config('EVENTS_BACKLOG', default=100, cast=int)
+EVENTS_LONG_POLL_TIMEOUT = config('EVENTS_LONG_POLL_TIMEOUT', default=25, cast=int)
+EVENTS_STREAM_SECONDS = config('EVENTS_STREAM_SECONDS', default=300, cast=int)
+
+# Age (seconds) an ordonnance change must reach before the SGPH feed serves it
+SGPH_FEED_SETTLE_SECONDS = config('SGPH_FEED_SETTLE_SECONDS', default=2, cast=int)
+
+# Request profiling (Server-Timing header and log line): share of the requests
+# sampled, 0 to turn it off, and roles reported (all when empty)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=0.0, cast=float)
+PROFILING_ROLES = config('PROFILING_ROLES', default='', cast=Csv())
+
+# Tracing spans (view, permissions, serializers, uploads): share of the
+# requests and background uploads traced, 0 to turn it off, where finished
+# traces go, and how many the default in-memory exporter keeps
+TRACING_SAMPLE_RATE = config('TRACING_SAMPLE_RATE', default=0.0, cast=float)
+TRACING_EXPORTER = config('TRACING_EXPORTER', default='healthhub_back.common.tracing.RingBufferExporter')
+TRACING_BUFFER_SIZE = config('TRACING_BUFFER_SIZE', default=200, cast=int)
+
+# Background worker pools (QR rendering, radiology uploads). Eager mode runs tasks inline at commit.
+BACKGROUND_WORKERS = config('BACKGROUND_WORKERS', default=4, cast=int)
+BACKGROUND_TASKS_EAGER = config('BACKGROUND_TASKS_EAGER', default=False, cast=bool)
+BACKGROUND_POOL_SIZES = {
+    'radiology_uploads': config('RADIOLOGY_UPLOAD_CONCURRENCY', default=2, cast=int),
+}
+
+# Radiology images are staged locally, then pushed to the storage backend in the background
+RADIOLOGY_STAGING_DIR = config('RADIOLOGY_STAGING_DIR', default=str(BASE_DIR / 'media' / 'radiology_staging'))
+RADIOLOGY_STORAGE_BACKEND = config(
+    'RADIOLOGY_STORAGE_BACKEND',
+    default='healthhub_back.accounts.radiologue.radiologue_storage.CloudinaryStorage'
+)
+RADIOLOGY_LOCAL_STORAGE_DIR = config('RADIOLOGY_LOCAL_STORAGE_DIR', default=str(BASE_DIR / 'media' / 'radiology'))
+RADIOLOGY_LOCAL_STORAGE_URL = config('RADIOLOGY_LOCAL_STORAGE_URL', default='/media/radiology/')
+# Seconds after which an upload still 'en_cours' is considered abandoned and retried
+RADIOLOGY_UPLOAD_STALE_SECONDS = config('RADIOLOGY_UPLOAD_STALE_SECONDS', default=900, cast=int)
+
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['Last-Event-ID', 'Server-Timing']
@@ -0,0 +1,254 @@
+"""
+End-to-end benchmarks of every role's hot endpoints.
+
+Each endpoint is driven through the DRF test client against a seeded dataset
+and measured for SQL query count, p50/p95 latency, throughput and peak Python
+memory. The query count and peak memory are checked against
+benchmarks/budgets.json; latency depends on the machine, so its budget is only
+reported unless BENCH_ENFORCE_LATENCY is set. The results are written as a
+JSON report. The module is not collected by a plain `pytest` run; run it with:
+
+    pytest benchmarks/bench_endpoints.py
+
+Environment variables:
+- BENCH_PATIENTS: number of seeded patients (default 50)
+- BENCH_CONSULTATIONS: consultations per patient (default 2)
+- BENCH_MEDICAMENTS: medicaments per ordonnance (default 3)
+- BENCH_ITERATIONS: timed requests per endpoint (default 20)
+- BENCH_REPORT: path of the JSON report (default bench_report.json)
+- BENCH_ENFORCE_LATENCY: set to 1 to also fail on the p95_ms budgets (default off)
+"""
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .seed import BASE_NSS, seed_dataset
+
+BUDGETS = json.loads((Path(__file__).parent / 'budgets.json').read_text())
+ITERATIONS = int(os.environ.get('BENCH_ITERATIONS', 20))
+REPORT_PATH = Path(os.environ.get('BENCH_REPORT', 'bench_report.json'))
+ENFORCE_LATENCY = os.environ.get('BENCH_ENFORCE_LATENCY', '') not in ('', '0')
+
+RESULTS = {}
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        yield seed_dataset(
+            patients=int(os.environ.get('BENCH_PATIENTS', 50)),
+            consultations_per_patient=int(os.environ.get('BENCH_CONSULTATIONS', 2)),
+            medicaments_per_ordonnance=int(os.environ.get('BENCH_MEDICAMENTS', 3)),
+            pending_lab_exams=ITERATIONS + 3,
+            batch_lab_runs=ITERATIONS + 3,
+        )
+
+
+@pytest.fixture(scope='module', autouse=True)
+def report(dataset):
+    yield
+    REPORT_PATH.write_text(json.dumps({
+        'dataset': dataset.summary(),
+        'iterations': ITERATIONS,
+        'database': connection.vendor,
+        'endpoints': RESULTS,
+    }, indent=2))
+
+
+def _client(dataset, role):
+    client = APIClient()
+    if role == 'sgph':
+        client.credentials(HTTP_AUTHORIZATION=f"Api-Key {dataset.api_key}")
+    else:
+        client.credentials(HTTP_AUTHORIZATION=f"Token {dataset.tokens[role]}")
+    return client
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def measure(name, call):
+    """
+    Runs `call` (returning a response) ITERATIONS times after one warm-up call,
+    records the metrics in the report and checks them against the budget
+    (p95 latency only with BENCH_ENFORCE_LATENCY).
+    """
+    response = call()
+    assert response.status_code < 400, response.content[:500]
+
+    with CaptureQueriesContext(connection) as queries:
+        call()
+    # captured_queries reads the live log, which the next request resets
+    query_count = len(queries)
+
+    # Do not bill this endpoint for the garbage left by the previous ones
+    gc.collect()
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    budget = BUDGETS[name]
+    result = {
+        'queries': query_count,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(_percentile(timings, 95), 2),
+        'throughput_per_s': round(len(timings) / (sum(timings) / 1000), 1),
+        'peak_kb': round(peak / 1024, 1),
+        'budget': budget,
+    }
+    result['latency_ok'] = result['p95_ms'] <= budget['p95_ms']
+    result['passed'] = (
+        result['queries'] <= budget['max_queries']
+        and result['peak_kb'] <= budget['peak_kb']
+        and (result['latency_ok'] or not ENFORCE_LATENCY)
+    )
+    RESULTS[name] = result
+    assert result['passed'], f"{name} exceeded its budget: {result}"
+
+
+@pytest.mark.django_db
+def test_doctor_patient_list(dataset):
+    client = _client(dataset, 'medecin')
+    measure('doctor_patient_list', lambda: client.get(f"/api/medecin/doctors/{dataset.medecin_id}/patients/"))
+
+
+@pytest.mark.django_db
+def test_doctor_patient_search(dataset):
+    client = _client(dataset, 'medecin')
+    url = f"/api/medecin/medecin/patients/search/nss/{BASE_NSS}/"
+    measure('doctor_patient_search', lambda: client.get(url))
+
+
+@pytest.mark.django_db
+def test_patient_medical_file(dataset):
+    client = _client(dataset, 'medecin')
+    url = f"/api/patient/medical-file/{dataset.patient_ids[0]}/"
+    measure('patient_medical_file', lambda: client.get(url))
+
+
+@pytest.mark.django_db
+def test_patient_health_metrics(dataset):
+    client = _client(dataset, 'medecin')
+    url = f"/api/patient/medical-file/{dataset.patient_ids[0]}/metrics/glycemie/"
+    measure('patient_health_metrics', lambda: client.get(url, {'bucket': 'week', 'points': 100}))
+
+
+@pytest.mark.django_db
+def test_nurse_activites(dataset):
+    client = _client(dataset, 'infermier')
+    measure('nurse_activites', lambda: client.get("/api/infermier/activites/"))
+
+
+@pytest.mark.django_db
+def test_radiologue_examens(dataset):
+    client = _client(dataset, 'radiologue')
+    measure('radiologue_examens', lambda: client.get("/api/radiologue/examens/"))
+
+
+@pytest.mark.django_db
+def test_laborantin_exams(dataset):
+    client = _client(dataset, 'laborantin')
+    measure('laborantin_exams', lambda: client.get("/api/laborantin/exams/"))
+
+
+@pytest.mark.django_db
+def test_laborantin_worklist(dataset):
+    client = _client(dataset, 'laborantin')
+    measure('laborantin_worklist', lambda: client.get("/api/laborantin/worklist/", {'etat': ['planifie', 'termine']}))
+
+
+@pytest.mark.django_db
+def test_laborantin_submit_test(dataset):
+    client = _client(dataset, 'laborantin')
+    exam_ids = iter(dataset.pending_lab_exam_ids)
+
+    def submit():
+        return client.post("/api/laborantin/submit-test/", {
+            'examen': next(exam_ids),
+            'resultat': "Glycémie normale",
+            'status': 'termine',
+            'health_metrics': [{'metric_type': 'glycemie', 'value': '0.95', 'unit': 'g/L'}],
+        }, format='json')
+
+    measure('laborantin_submit_test', submit)
+
+
+@pytest.mark.django_db
+def test_laborantin_submit_batch(dataset):
+    client = _client(dataset, 'laborantin')
+    batches = iter(dataset.batch_lab_exam_ids)
+
+    def submit():
+        return client.post("/api/laborantin/submit-tests/batch/", {
+            'results': [
+                {
+                    'examen': examen_id,
+                    'resultat': "Glycémie normale",
+                    'status': 'termine',
+                    'health_metrics': [{'metric_type': 'glycemie', 'value': '0.95', 'unit': 'g/L'}],
+                }
+                for examen_id in next(batches)
+            ],
+        }, format='json')
+
+    measure('laborantin_submit_batch', submit)
+
+
+@pytest.mark.django_db
+def test_sgph_ordonnances(dataset):
+    client = _client(dataset, 'sgph')
+    measure('sgph_ordonnances', lambda: client.get("/api/sgph/ordonnances/"))
+
+
+@pytest.mark.django_db
+def test_admin_patient_admission_burst(dataset):
+    client = _client(dataset, 'admin')
+    admissions = iter(range(ITERATIONS + 3))
+
+    def admit():
+        n = next(admissions)
+        return client.post("/api/admin/patients/create/", {
+            'username': f"bench_admission{n}",
+            'email': f"bench_admission{n}@bench.local",
+            'password': "bench-password",
+            'NSS': BASE_NSS + dataset.patients + n,
+            'nom': f"Admission{n}",
+            'prenom': "Burst",
+            'dateNaissance': "1990-01-01",
+            'adresse': "1 rue du Benchmark",
+            'telephone': "0600000000",
+            'mutuelle': "Mutuelle Bench",
+            'contactUrgence': "Contact Bench",
+            'medecin': dataset.medecin_id,
+            'centreHospitalier': dataset.centre_id,
+        }, format='json')
+
+    measure('admin_patient_admission', admit)
+
+
+@pytest.mark.django_db
+def test_sgph_ordonnances_feed(dataset, settings):
+    settings.SGPH_FEED_SETTLE_SECONDS = 0
+    client = _client(dataset, 'sgph')
+    measure('sgph_ordonnances_feed', lambda: client.get("/api/sgph/ordonnances/feed/", {'limit': 100}))
@@ -0,0 +1,217 @@
+"""
+Seeds a synthetic hospital for the endpoint benchmarks.
+
+Every patient gets a dossier with `consultations_per_patient` consultations, each
+holding an ordonnance of `medicaments_per_ordonnance` lines, one lab exam with a
+result and health metrics, one radio exam with a result and one nurse activity.
+Rows are written with bulk_create so large datasets seed in seconds.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from rest_framework.authtoken.models import Token
+from rest_framework_api_key.models import APIKey
+
+from healthhub_back.common.search.patient_index import rebuild_index
+from healthhub_back.models import (
+    ActiviteInfermier, CentreHospitalier, Consultation, DossierMedical, Examen,
+    HealthMetrics, Infermier, Laboratin, Medecin, Medicament, Ordonnance,
+    OrdonnanceMedicament, Patient, Radiologue, ResultatLabo, ResultatRadio, User,
+)
+
+PASSWORD = "bench-password"
+BASE_NSS = 100000000
+# Exams per analyzer run of the batch submission benchmark
+BATCH_SIZE = 25
+
+
+@dataclass
+class Dataset:
+    patients: int
+    consultations_per_patient: int
+    medicaments_per_ordonnance: int
+    tokens: dict = field(default_factory=dict)
+    api_key: str = ""
+    medecin_id: str = ""
+    centre_id: int = 0
+    patient_ids: list = field(default_factory=list)
+    pending_lab_exam_ids: list = field(default_factory=list)
+    batch_lab_exam_ids: list = field(default_factory=list)
+
+    def summary(self):
+        return {
+            'patients': self.patients,
+            'consultations_per_patient': self.consultations_per_patient,
+            'medicaments_per_ordonnance': self.medicaments_per_ordonnance,
+        }
+
+
+def _staff_user(username, role, centre, password):
+    return User.objects.create(
+        username=username,
+        password=password,
+        email=f"{username}@bench.local",
+        first_name=username.capitalize(),
+        last_name="Bench",
+        role=role,
+        centreHospitalier=centre,
+    )
+
+
+def seed_dataset(patients=50, consultations_per_patient=2, medicaments_per_ordonnance=3, pending_lab_exams=50, batch_lab_runs=0):
+    dataset = Dataset(patients, consultations_per_patient, medicaments_per_ordonnance)
+    password = make_password(PASSWORD)
+    today = date.today()
+
+    centre = CentreHospitalier.objects.create(nom="Hôpital Benchmark", place="Bench")
+    medecin = Medecin.objects.create(
+        user=_staff_user("bench_medecin", "medecin", centre, password),
+        specialite="generaliste",
+        telephone="0000000000",
+    )
+    infermier = Infermier.objects.create(
+        user=_staff_user("bench_infermier", "infermier", centre, password),
+        shift="jour",
+        specialite="generale",
+        telephone="0000000001",
+    )
+    laborantin = Laboratin.objects.create(
+        user=_staff_user("bench_laborantin", "laborantin", centre, password),
+        shift="jour",
+        specialite="biochimie",
+        telephone="0000000002",
+        nombreTests=pending_lab_exams + batch_lab_runs * BATCH_SIZE + patients * consultations_per_patient,
+    )
+    radiologue = Radiologue.objects.create(
+        user=_staff_user("bench_radiologue", "radiologue", centre, password),
+        shift="jour",
+        specialite="scanner",
+        telephone="0000000003",
+    )
+    admin = _staff_user("bench_admin", "admin", centre, password)
+    dataset.medecin_id = str(medecin.user_id)
+    dataset.centre_id = centre.pk
+    for user in (medecin.user, infermier.user, laborantin.user, radiologue.user, admin):
+        dataset.tokens[user.role] = Token.objects.create(user=user).key
+    _, dataset.api_key = APIKey.objects.create_key(name="bench-sgph")
+
+    medicaments = Medicament.objects.bulk_create([
+        Medicament(nom=f"Medicament {i}", type="comprime", description=f"Description {i}")
+        for i in range(max(medicaments_per_ordonnance, 10))
+    ])
+
+    users = User.objects.bulk_create([
+        User(
+            username=f"bench_patient{i}",
+            password=password,
+            email=f"bench_patient{i}@bench.local",
+            role="patient",
+            centreHospitalier=centre,
+        )
+        for i in range(patients)
+    ])
+    patient_rows = Patient.objects.bulk_create([
+        Patient(
+            user=user,
+            NSS=BASE_NSS + i,
+            nom=f"Nom{i}",
+            prenom=f"Prenom{i}",
+            dateNaissance=today - timedelta(days=365 * 30 + i),
+            adresse=f"{i} rue du Benchmark",
+            telephone="0600000000",
+            mutuelle="Mutuelle Bench",
+            contactUrgence="Contact Bench",
+            medecin=medecin,
+            centreHospitalier=centre,
+        )
+        for i, user in enumerate(users)
+    ])
+    dataset.patient_ids = [str(patient.user_id) for patient in patient_rows]
+    # bulk_create skips the post_save signal maintaining the search index
+    rebuild_index()
+    dossiers = DossierMedical.objects.bulk_create([
+        DossierMedical(patient=patient, qrCode=f"bench-qr-{patient.NSS}")
+        for patient in patient_rows
+    ])
+
+    consultations = Consultation.objects.bulk_create([
+        Consultation(
+            dossier=dossier,
+            dateConsultation=today - timedelta(days=n),
+            diagnostic="Diagnostic benchmark",
+            resume="Resume benchmark",
+            status="termine",
+        )
+        for dossier in dossiers
+        for n in range(consultations_per_patient)
+    ])
+
+    ordonnances = Ordonnance.objects.bulk_create([
+        Ordonnance(consultation=consultation, dateExpiration=today + timedelta(days=30))
+        for consultation in consultations
+    ])
+    OrdonnanceMedicament.objects.bulk_create([
+        OrdonnanceMedicament(
+            ordonnance=ordonnance,
+            med=medicaments[m],
+            duree="7 jours",
+            dosage="moyen",
+            frequence="3 fois par jour",
+            instructions="Pendant les repas",
+        )
+        for ordonnance in ordonnances
+        for m in range(medicaments_per_ordonnance)
+    ])
+
+    lab_exams = Examen.objects.bulk_create([
+        Examen(consultation=consultation, laborantin=laborantin, type="labo", etat="termine", priorite="normal")
+        for consultation in consultations
+    ])
+    radio_exams = Examen.objects.bulk_create([
+        Examen(consultation=consultation, radiologue=radiologue, type="radio", etat="planifie", priorite="urgent")
+        for consultation in consultations
+    ])
+    resultats = ResultatLabo.objects.bulk_create([
+        ResultatLabo(examen=examen, laboratin=laborantin, resultat="Normal", dateAnalyse=today, status="termine")
+        for examen in lab_exams
+    ])
+    HealthMetrics.objects.bulk_create([
+        HealthMetrics(resLabo=resultat, metric_type=metric_type, value=Decimal("1.05"), unit="g/L")
+        for resultat in resultats
+        for metric_type in ("glycemie", "niveaux_cholesterol")
+    ])
+    ResultatRadio.objects.bulk_create([
+        ResultatRadio(examen=examen, radioImgURL="https://example.com/radio.png", type="scanner", rapport="RAS")
+        for examen in radio_exams
+    ])
+    ActiviteInfermier.objects.bulk_create([
+        ActiviteInfermier(
+            consultation=consultation,
+            infermier=infermier,
+            typeActivite="soins",
+            doctors_details="Pansement",
+            nurse_observations="",
+            status="planifie",
+        )
+        for consultation in consultations
+    ])
+
+    # Fresh exams consumed one per call by the submit-test benchmark, and one
+    # analyzer run of BATCH_SIZE exams per call by the batch benchmark
+    pending = Examen.objects.bulk_create([
+        Examen(consultation=consultations[i % len(consultations)], laborantin=laborantin, type="labo", etat="planifie", priorite="normal")
+        for i in range(pending_lab_exams)
+    ])
+    dataset.pending_lab_exam_ids = [str(examen.examenID) for examen in pending]
+
+    batched = Examen.objects.bulk_create([
+        Examen(consultation=consultations[i % len(consultations)], laborantin=laborantin, type="labo", etat="planifie", priorite="normal")
+        for i in range(batch_lab_runs * BATCH_SIZE)
+    ])
+    dataset.batch_lab_exam_ids = [
+        [str(examen.examenID) for examen in batched[i:i + BATCH_SIZE]]
+        for i in range(0, len(batched), BATCH_SIZE)
+    ]
+    return dataset
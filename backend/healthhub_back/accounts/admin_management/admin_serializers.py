@@ -83,5 +83,5 @@ class PatientSerializer(serializers.ModelSerializer):
 class DossierMedicalSerializer(serializers.ModelSerializer):
     class Meta:
         model = DossierMedical
-        fields = ['dossierID', 'patient', 'createdAt', 'active', 'qrCode']
-        read_only_fields = ['dossierID', 'qrCode']
\ No newline at end of file
+        fields = ['dossierID', 'patient', 'createdAt', 'active', 'qrCode', 'qrToken', 'qrStatus']
+        read_only_fields = ['dossierID', 'qrCode', 'qrToken', 'qrStatus']
\ No newline at end of file
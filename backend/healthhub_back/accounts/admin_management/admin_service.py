@@ -4,11 +4,10 @@ from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
 
 from healthhub_back.models import DossierMedical, Patient
+from healthhub_back.accounts.patient.patient_service import schedule_qr_code
+from healthhub_back.common.tracing import span
 from .admin_serializers import AdminUserCreateSerializer, AdminUserSerializer
 from django.contrib.auth.hashers import make_password
-import qrcode
-import base64
-import io
 
 User = get_user_model()
 
@@ -42,58 +41,31 @@ from django.db import transaction
 class PatientService:
     @staticmethod
     def create_patient_with_dossier(validated_data):
-        with transaction.atomic():
+        with span('patient.create'), transaction.atomic():
             try:
+                with span('password.hash'):
+                    password = make_password(validated_data.pop('password'))
                 # Extract User-specific data
                 user_data = {
                     'username': validated_data.pop('username'),
                     'email': validated_data.pop('email'),
-                    'password': make_password(validated_data.pop('password')),
+                    'password': password,
                     'first_name': validated_data.get('prenom'),
                     'last_name': validated_data.get('nom'),
                     'role': 'patient',
                     'centreHospitalier': validated_data.get('centreHospitalier')
                 }
-                print(user_data)
                 # Create User
                 user = User.objects.create(**user_data)
-
-                print(validated_data)
                 # Create Patient
                 patient = Patient.objects.create(
                     user=user,
                     **validated_data
                 )
 
-                # Generate QR code
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-
-                qr_data = {
-                    'patientID': str(patient.user.id),
-                    'nom': patient.nom,
-                    'prenom': patient.prenom,
-                    'NSS': str(patient.NSS)
-                }
-
-                qr.add_data(str(qr_data))
-                qr.make(fit=True)
-                qr_image = qr.make_image(fill_color="black", back_color="white")
-
-                # Convert QR code to base64 string
-                buffer = io.BytesIO()
-                qr_image.save(buffer, format="PNG")
-                qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-                # Create dossier
-                dossier = DossierMedical.objects.create(
-                    patient=patient,
-                    qrCode=qr_code_base64
-                )
+                # Create dossier; its QR image is rendered off-request
+                dossier = DossierMedical.objects.create(patient=patient)
+                schedule_qr_code(dossier)
 
                 return patient, dossier
 
@@ -1,6 +1,7 @@
 from rest_framework import generics, permissions, viewsets, status
 from rest_framework.generics import CreateAPIView
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from healthhub_back.models import CentreHospitalier, Patient
 from .admin_serializers import AdminUserCreateSerializer, AdminUserSerializer, CentreHospitalierSerializer, PatientCreateSerializer
@@ -9,12 +10,14 @@ from rest_framework.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password
 from .admin_service import PatientService
 from .admin_serializers import Patient, DossierMedicalSerializer
+from healthhub_back.common.auth.authentication import token_cache
+from healthhub_back.common.mysqlpool.pool import pool_stats
+from healthhub_back.common.tracing import get_exporter
 
 
 # restrict access to admin users.
 class IsAdminUserCustom(permissions.BasePermission):
     def has_permission(self, request, view):
-        print(request.user)
         return request.user and request.user.is_authenticated and request.user.role == 'admin'
 
 # Allows admin users to create new users.
@@ -69,7 +72,8 @@ class PatientCreateView(CreateAPIView):
             response_data = {
                 'patient': PatientCreateSerializer(patient).data,
                 'message': 'Patient créé avec succès',
-                'dossier_id': str(dossier.dossierID)
+                'dossier_id': str(dossier.dossierID),
+                'qr_status': dossier.qrStatus
             }
 
             return Response(response_data, status=status.HTTP_201_CREATED)
@@ -78,4 +82,42 @@ class PatientCreateView(CreateAPIView):
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+
+class TokenCacheMetricsView(APIView):
+    """
+    Hit ratio and size of this process's token authentication cache.
+    """
+    permission_classes = [IsAdminUserCustom]
+
+    def get(self, request):
+        return Response(token_cache.stats())
+
+
+class ConnectionPoolMetricsView(APIView):
+    """
+    Size, usage and counters of this process's database connection pools.
+    """
+    permission_classes = [IsAdminUserCustom]
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class TraceBufferView(APIView):
+    """
+    Traces kept by this process's tracing exporter, most recent first
+    (at most ?limit=).
+    """
+    permission_classes = [IsAdminUserCustom]
+
+    def get(self, request):
+        traces = get_exporter().dump()
+        limit = request.query_params.get('limit')
+        if limit:
+            try:
+                traces = traces[:int(limit)]
+            except ValueError:
+                raise ValidationError({'limit': 'Must be an integer.'})
+        return Response({'traces': traces})
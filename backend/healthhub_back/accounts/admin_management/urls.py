@@ -1,7 +1,7 @@
 # accounts/admin_management/urls.py
 
 from django.urls import path
-from .admin_view import AdminUserCreateView, AdminUserListView, AdminUserDetailView, CentreHospitalierCreateView, CentreHospitalierListView, PatientCreateView
+from .admin_view import AdminUserCreateView, AdminUserListView, AdminUserDetailView, CentreHospitalierCreateView, CentreHospitalierListView, PatientCreateView, TokenCacheMetricsView, ConnectionPoolMetricsView, TraceBufferView
 
 urlpatterns = [
     path('users/', AdminUserListView.as_view(), name='admin_user_list'),
@@ -11,4 +11,7 @@ urlpatterns = [
     path('centre-hospitalier/create/', CentreHospitalierCreateView.as_view(), name='centre-hospitalier-create'),
     path('centre-hospitalier/', CentreHospitalierListView.as_view(), name='centre-hospitalier-list'),
     path('patients/create/', PatientCreateView.as_view(), name='patient-create'),
+    path('metrics/token-cache/', TokenCacheMetricsView.as_view(), name='token-cache-metrics'),
+    path('metrics/db-pool/', ConnectionPoolMetricsView.as_view(), name='db-pool-metrics'),
+    path('metrics/traces/', TraceBufferView.as_view(), name='trace-buffer'),
 ]
\ No newline at end of file
@@ -20,7 +20,11 @@ from healthhub_back.models import (
     OrdonnanceMedicament, 
     Medicament
 )
+import operator
+from functools import reduce
+
 from django.db import transaction
+from django.db.models import Q
 
 from django.contrib.auth import get_user_model
 from django.utils import timezone
@@ -197,6 +201,8 @@ class DossierMedicalSerializer(serializers.ModelSerializer):
             'createdAt',
             'active',
             'qrCode',
+            'qrToken',
+            'qrStatus',
             'consultations'
         ]
 
@@ -231,18 +237,26 @@ class ConsultationCreateUpdateSerializer(serializers.ModelSerializer):
 class ExaminationCreateSerializer(serializers.ModelSerializer):
     radiologue_id = serializers.UUIDField(required=False, write_only=True)
     laborantin_id = serializers.UUIDField(required=False, write_only=True)
+    # Without a staff ID, pick the least-loaded matching technician
+    auto_assign = serializers.BooleanField(required=False, default=False, write_only=True)
+    specialite = serializers.CharField(required=False, write_only=True)
+    shift = serializers.ChoiceField(choices=Laboratin.SHIFT_CHOICES, required=False, write_only=True)
 
     class Meta:
         model = Examen
         fields = ['type', 'priorite', 'doctor_details', 
-                 'radiologue_id', 'laborantin_id']
+                 'radiologue_id', 'laborantin_id', 'auto_assign', 'specialite', 'shift']
 
     def validate(self, data):
+        auto_assign = data.pop('auto_assign', False)
         if data['type'] == 'radio':
             if 'radiologue_id' not in data:
-                raise serializers.ValidationError(
-                    "radiologue_id is required for radio examinations"
-                )
+                if not auto_assign:
+                    raise serializers.ValidationError(
+                        "radiologue_id is required for radio examinations"
+                    )
+                self.validate_staff_specialite(data, Radiologue)
+                return data
             try:
                 data['radiologue'] = Radiologue.objects.get(
                     user_id=data.pop('radiologue_id')
@@ -252,17 +266,31 @@ class ExaminationCreateSerializer(serializers.ModelSerializer):
 
         elif data['type'] == 'labo':
             if 'laborantin_id' not in data:
-                raise serializers.ValidationError(
-                    "laborantin_id is required for laboratory examinations"
-                )
+                if not auto_assign:
+                    raise serializers.ValidationError(
+                        "laborantin_id is required for laboratory examinations"
+                    )
+                self.validate_staff_specialite(data, Laboratin)
+                return data
             try:
                 data['laborantin'] = Laboratin.objects.get(
                     user_id=data.pop('laborantin_id')
                 )
             except Laboratin.DoesNotExist:
                 raise serializers.ValidationError("Invalid laborantin_id")
+
+        # specialite and shift only drive the automatic assignment
+        data.pop('specialite', None)
+        data.pop('shift', None)
         return data
 
+    def validate_staff_specialite(self, data, staff_model):
+        specialites = [value for value, _label in staff_model.SPECIALITE_CHOICES]
+        if data.get('specialite') not in (None, *specialites):
+            raise serializers.ValidationError({
+                "specialite": f"Must be one of: {', '.join(specialites)}."
+            })
+
 class RadiologueListSerializer(serializers.ModelSerializer):
     name = serializers.CharField(source='user.username')
 
@@ -312,17 +340,20 @@ class OrdonnanceCreateSerializer(serializers.ModelSerializer):
         fields = ['dateExpiration', 'medicaments']
 
     def create(self, validated_data):
+        from .doctor_service import add_ordonnance_lines
+
         medicaments_data = validated_data.pop('medicaments')
-        ordonnance = Ordonnance.objects.create(**validated_data)
+        found = Medicament.objects.in_bulk([data['medicament_id'] for data in medicaments_data])
+        unknown = [str(data['medicament_id']) for data in medicaments_data if data['medicament_id'] not in found]
+        if unknown:
+            raise serializers.ValidationError({"medicaments": f"Unknown medicaments: {', '.join(unknown)}"})
 
-        for medicament_data in medicaments_data:
-            medicament_id = medicament_data.pop('medicament_id')
-            medicament = Medicament.objects.get(medicamentID=medicament_id)
-            OrdonnanceMedicament.objects.create(
-                ordonnance=ordonnance,
-                med=medicament,
-                **medicament_data
-            )
+        with transaction.atomic():
+            ordonnance = Ordonnance.objects.create(**validated_data)
+            add_ordonnance_lines(ordonnance, [
+                {'med': found[data.pop('medicament_id')], **data}
+                for data in medicaments_data
+            ])
 
         return ordonnance
 
@@ -346,16 +377,6 @@ class MedicationInputSerializer(serializers.Serializer):
     frequence = serializers.CharField(max_length=50)
     instructions = serializers.CharField(max_length=1000, required=False, allow_blank=True)
 
-    def validate(self, attrs):
-        # Ensure that for existing medications, description is not required
-        if 'description' not in attrs or not attrs['description']:
-            # Check if the medication already exists
-            if not Medicament.objects.filter(nom=attrs['nom'], type=attrs['type']).exists():
-                raise serializers.ValidationError({
-                    "description": "Description is required for new medications."
-                })
-        return attrs
-    
 
 
 class PrescriptionCreateSerializer(serializers.Serializer):
@@ -364,50 +385,30 @@ class PrescriptionCreateSerializer(serializers.Serializer):
     def validate_medications(self, value):
         if not value:
             raise serializers.ValidationError("At least one medication must be provided.")
+
+        # Descriptions are only required for new medications: look up all the
+        # undescribed ones in a single query
+        undescribed = {(med['nom'], med['type']) for med in value if not med.get('description')}
+        if undescribed:
+            condition = reduce(operator.or_, (Q(nom=nom, type=type_) for nom, type_ in undescribed))
+            existing = set(Medicament.objects.filter(condition).values_list('nom', 'type'))
+            errors = [
+                {"description": ["Description is required for new medications."]}
+                if (med['nom'], med['type']) in undescribed - existing else {}
+                for med in value
+            ]
+            if any(errors):
+                raise serializers.ValidationError(errors)
         return value
 
     def create(self, validated_data):
-        medications_data = validated_data.pop('medications')
-        consultation = self.context.get('consultation')
+        from .doctor_service import create_prescription
 
+        consultation = self.context.get('consultation')
         if not consultation:
             raise serializers.ValidationError("Consultation context is required.")
 
-        with transaction.atomic():
-            # Create the Ordonnance
-            ordonnance = Ordonnance.objects.create(
-                consultation=consultation,
-                valide=False,  # or set based on your requirements
-                dateExpiration=None  # You may set this based on your logic
-            )
-
-            for med_data in medications_data:
-                nom = med_data.get('nom')
-                type_ = med_data.get('type')
-                description = med_data.get('description', '')
-
-                # Get or create Medicament
-                medicament, created = Medicament.objects.get_or_create(
-                    nom=nom,
-                    type=type_,
-                    defaults={'description': description}
-                )
-                if not created and not medicament.description:
-                    # Update description if it was previously blank and now provided
-                    medicament.description = description
-                    medicament.save()
-
-                # Create OrdonnanceMedicament
-                OrdonnanceMedicament.objects.create(
-                    med=medicament,
-                    ordonnance=ordonnance,
-                    duree=med_data.get('duree'),
-                    dosage=med_data.get('dosage'),
-                    frequence=med_data.get('frequence'),
-                    instructions=med_data.get('instructions', '')
-                )
-
-            return ordonnance
+        return create_prescription(consultation, validated_data['medications'])
         
 
 class ActiviteInfermierCreateSerializer(serializers.ModelSerializer):
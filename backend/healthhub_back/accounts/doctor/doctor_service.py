@@ -1,3 +1,9 @@
+import operator
+import uuid
+from functools import reduce
+
+from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework.exceptions import ValidationError
 from healthhub_back.models import (
@@ -10,6 +16,8 @@ from healthhub_back.models import (
     Examen,
 )
 from django.db import transaction
+from healthhub_back.accounts.patient.patient_service import schedule_consultations_refresh
+from healthhub_back.common.search.medicament_index import schedule_index_update
 
 
 def search_patient(query):
@@ -23,10 +31,10 @@ def search_patient(query):
     except ValueError:
         try:
             # Try to find by User UUID
-            patient = get_object_or_404(Patient, user__id=query)
-        except ValidationError:
-            # If not UUID, treat as QR code
-            dossier = get_object_or_404(DossierMedical, qrCode=query)
+            patient = get_object_or_404(Patient, user__id=uuid.UUID(query))
+        except ValueError:
+            # If not UUID, treat as a scanned QR token
+            dossier = get_object_or_404(DossierMedical.objects.select_related('patient'), qrToken=query)
             patient = dossier.patient
     return patient
 # 
@@ -90,25 +98,23 @@ def create_consultation(medecin, patient, data):
         )
 
         for med in medicaments:
-            medicament_id = med.get('medicament_id')
-            duree = med.get('duree')
-            dosage = med.get('dosage')
-            frequence = med.get('frequence')
-            instructions = med.get('instructions', '')
-
-            if not all([medicament_id, duree, dosage, frequence]):
+            if not all([med.get('medicament_id'), med.get('duree'), med.get('dosage'), med.get('frequence')]):
                 raise ValidationError("Tous les champs des médicaments sont requis.")
 
-            medicament = get_object_or_404(Medicament, medicamentID=medicament_id)
-
-            OrdonnanceMedicament.objects.create(
-                ordonnance=ordonnance,
-                med=medicament,
-                duree=duree,
-                dosage=dosage,
-                frequence=frequence,
-                instructions=instructions
-            )
+        found = Medicament.objects.in_bulk([med['medicament_id'] for med in medicaments])
+        lines = []
+        for med in medicaments:
+            medicament = found.get(_as_uuid(med['medicament_id']))
+            if medicament is None:
+                raise Http404("No Medicament matches the given query.")
+            lines.append({
+                'med': medicament,
+                'duree': med['duree'],
+                'dosage': med['dosage'],
+                'frequence': med['frequence'],
+                'instructions': med.get('instructions', ''),
+            })
+        add_ordonnance_lines(ordonnance, lines)
 
     else:
         # Prescribe Complementary Exams
@@ -142,4 +148,108 @@ def create_consultation(medecin, patient, data):
     consultation.status = 'termine'
     consultation.save()
 
-    return consultation
\ No newline at end of file
+    return consultation
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def resolve_medicaments(medications):
+    """
+    Returns {(nom, type): Medicament} for every medication of a prescription,
+    fetching the known ones in one query and inserting the missing ones in bulk.
+
+    Parameters:
+    - medications (list of dict): items with 'nom', 'type' and optional 'description'.
+    """
+    descriptions = {}
+    for med in medications:
+        key = (med['nom'], med['type'])
+        if med.get('description') or key not in descriptions:
+            descriptions[key] = med.get('description', '')
+
+    def fetch(keys):
+        condition = reduce(operator.or_, (Q(nom=nom, type=type_) for nom, type_ in keys))
+        return {(m.nom, m.type): m for m in Medicament.objects.filter(condition)}
+
+    medicaments = fetch(descriptions)
+    missing = [key for key in descriptions if key not in medicaments]
+    if missing:
+        # A concurrent prescription may insert the same medicament: skip the
+        # conflicting rows and read the winners back
+        Medicament.objects.bulk_create(
+            [Medicament(nom=nom, type=type_, description=descriptions[nom, type_]) for nom, type_ in missing],
+            ignore_conflicts=True
+        )
+        created = fetch(missing)
+        medicaments.update(created)
+        # bulk_create skips the signals maintaining the autocomplete index
+        schedule_index_update(medicaments=created.values())
+
+    # Fill in descriptions that were previously left blank
+    completed = []
+    for key, medicament in medicaments.items():
+        if not medicament.description and descriptions[key]:
+            medicament.description = descriptions[key]
+            completed.append(medicament)
+    if completed:
+        Medicament.objects.bulk_update(completed, ['description'])
+        # bulk_update skips the signals maintaining the autocomplete index and
+        # refreshing the medical files that show them
+        schedule_index_update(medicaments=completed)
+        schedule_consultations_refresh(
+            Consultation.objects.filter(ordonnance__ordonnancemedicament__med__in=completed).values('pk')
+        )
+    return medicaments
+
+
+def add_ordonnance_lines(ordonnance, lines):
+    """
+    Inserts the lines of an ordonnance in one statement and primes the
+    ordonnance's prefetch cache with them, so it serializes without re-querying.
+
+    Parameters:
+    - ordonnance (Ordonnance): saved ordonnance.
+    - lines (list of dict): OrdonnanceMedicament field values, 'med' being a Medicament.
+    """
+    created = OrdonnanceMedicament.objects.bulk_create([
+        OrdonnanceMedicament(ordonnance=ordonnance, **line) for line in lines
+    ])
+    ordonnance._prefetched_objects_cache = getattr(ordonnance, '_prefetched_objects_cache', {})
+    ordonnance._prefetched_objects_cache['ordonnancemedicament_set'] = created
+    # bulk_create skips the signals refreshing the medical file snapshot
+    schedule_consultations_refresh([ordonnance.consultation_id])
+    return created
+
+
+@transaction.atomic
+def create_prescription(consultation, medications, date_expiration=None):
+    """
+    Creates an ordonnance and its lines for a consultation.
+
+    Parameters:
+    - consultation (Consultation): Consultation instance.
+    - medications (list of dict): 'nom', 'type', 'description', 'dosage', 'duree',
+      'frequence' and 'instructions' of each medication.
+
+    Returns:
+    - Ordonnance instance, with its lines cached for serialization.
+    """
+    medicaments = resolve_medicaments(medications)
+    ordonnance = Ordonnance.objects.create(
+        consultation=consultation,
+        valide=False,
+        dateExpiration=date_expiration
+    )
+    add_ordonnance_lines(ordonnance, [
+        {
+            'med': medicaments[med['nom'], med['type']],
+            'duree': med.get('duree'),
+            'dosage': med.get('dosage'),
+            'frequence': med.get('frequence'),
+            'instructions': med.get('instructions', ''),
+        }
+        for med in medications
+    ])
+    return ordonnance
@@ -1,13 +1,19 @@
-from rest_framework import generics, filters
+from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
 from rest_framework import status
 from healthhub_back.models import ActiviteInfermier, Infermier, Patient, DossierMedical , Consultation , DossierMedical,Consultation,Examen,Radiologue,Laboratin ,    Ordonnance, Consultation, OrdonnanceMedicament, Medicament
 from healthhub_back.accounts.patient.patient_serializers import PatientsSerializer, DossierMedicalDetailSerializer, ConsultationsSerializer,ExamensSerializer,OrdonnancesSerializer, MedicamentsSerializer
+from healthhub_back.accounts.patient.patient_service import get_dossier_by_qr_token, get_medical_file_data, medical_file_queryset
+from healthhub_back.common.search.filters import PatientIndexSearchFilter, SearchRankOrderingFilter
+from healthhub_back.common.search.medicament_index import MAX_SEARCH_RESULTS, medicament_index
 from rest_framework import permissions
+from healthhub_back.accounts.nurse.nurse_service import publish_activity
+from healthhub_back.common.tracing import span
+from .exam_assignment import exam_board, schedule_load_change
 from .doctor_serializers import (
     ActiviteInfermierCreateSerializer,
     ConsultationCreateUpdateSerializer,
@@ -28,6 +34,20 @@ class IsMedecin(permissions.BasePermission):
     """
     def has_permission(self, request, view):
         return request.user.role == 'medecin' or request.user.role == 'admin'  
+
+
+def doctor_patient_queryset(doctor_id):
+    """
+    Patients followed by a doctor, with what PatientsSerializer reads.
+    """
+    return Patient.objects.filter(
+        medecin__user__id=doctor_id,
+    ).select_related(
+        'medecin',
+        'medecin__user',
+        'centreHospitalier'
+    )
+
     
 class DoctorPatientListView(generics.ListAPIView):
     """
@@ -35,26 +55,17 @@ class DoctorPatientListView(generics.ListAPIView):
     """
     permission_classes = [IsAuthenticated, IsMedecin]
     serializer_class = PatientsSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['nom', 'prenom', 'NSS']
+    filter_backends = [PatientIndexSearchFilter, SearchRankOrderingFilter]
     ordering_fields = ['nom', 'prenom', 'dateNaissance', 'createdAt']
     ordering = ['nom']  # default ordering
 
     def get_queryset(self):
         doctor_id = self.kwargs.get('doctor_id')
-        print(self.request.user.id)
-        print(doctor_id)
         # Verify the requesting user is the doctor or an admin
         if str(self.request.user.id) != str(doctor_id) :
             raise PermissionDenied("You can only view your own patients")
 
-        return Patient.objects.filter(
-            medecin__user__id=doctor_id,
-        ).select_related(
-            'medecin',
-            'medecin__user',
-            'centreHospitalier'
-        )
+        return doctor_patient_queryset(doctor_id)
 
 class PatientSearchView(generics.RetrieveAPIView):
     """
@@ -64,23 +75,7 @@ class PatientSearchView(generics.RetrieveAPIView):
     serializer_class = DossierMedicalDetailSerializer
 
     def get_queryset(self):
-        return DossierMedical.objects.select_related(
-            'patient',
-            'patient__medecin',
-            'patient__medecin__user',
-            'patient__centreHospitalier'
-        ).prefetch_related(
-            'consultation_set',
-            'consultation_set__ordonnance_set',
-            'consultation_set__ordonnance_set__ordonnancemedicament_set',
-            'consultation_set__ordonnance_set__ordonnancemedicament_set__med',
-            'consultation_set__examen_set',
-            'consultation_set__examen_set__resultatlabo_set',
-            'consultation_set__examen_set__resultatlabo_set__healthmetrics_set',  # Updated here
-            'consultation_set__examen_set__resultatradio_set',
-            'consultation_set__activiteinfermier_set',
-            'consultation_set__activiteinfermier_set__infermier'
-        )
+        return medical_file_queryset()
 
     def get(self, request,*args, **kwargs):
         # First, find the patient based on search criteria
@@ -92,10 +87,7 @@ class PatientSearchView(generics.RetrieveAPIView):
                     NSS=search_value,
                 )
             elif search_type == 'qr':
-                dossier = get_object_or_404(DossierMedical, 
-                    qrCode=search_value,
-                )
-                patient = dossier.patient
+                patient = get_dossier_by_qr_token(search_value).patient
             else:
                 return Response(
                     {"error": "Invalid search type"},
@@ -110,13 +102,7 @@ class PatientSearchView(generics.RetrieveAPIView):
                 )
 
             # Get the complete medical file
-            dossier = get_object_or_404(
-                self.get_queryset(),
-                patient=patient
-            )
-
-            serializer = self.serializer_class(dossier)
-            return Response(serializer.data)
+            return Response(get_medical_file_data(patient.pk))
 
         except (Patient.DoesNotExist, DossierMedical.DoesNotExist):
             return Response(
@@ -203,22 +189,41 @@ class ExaminationCreateView(generics.CreateAPIView):
         )
 
     def perform_create(self, serializer):
-        consultation = self.get_consultation()
-        print('H  ',consultation.dossier.patient.centreHospitalier)
-        print(self.request.user)
-        if consultation.dossier.patient.centreHospitalier != self.request.user.centreHospitalier:
+        with span('queryset', model='Consultation'):
+            consultation = self.get_consultation()
+        centre_id = consultation.centreHospitalier_id
+        if centre_id != self.request.user.centreHospitalier_id:
             raise PermissionDenied("Not authorized for this hospital's patients")
+
+        exam_type = serializer.validated_data['type']
+        staff_field = 'laborantin' if exam_type == 'labo' else 'radiologue'
+        specialite = serializer.validated_data.pop('specialite', None)
+        shift = serializer.validated_data.pop('shift', None)
+        assigned = {}
+        if staff_field not in serializer.validated_data:
+            # auto_assign: the board counts the exam in the technician's load
+            with span('exam.assign', type=exam_type):
+                staff_id = exam_board.assign(exam_type, centre_id, specialite, shift)
+            if staff_id is None:
+                raise ValidationError({
+                    f"{staff_field}_id": f"No {staff_field} of this hospital matches the requested specialite and shift."
+                })
+            assigned[f"{staff_field}_id"] = staff_id
+
         examen =serializer.save(
             consultation=consultation,
-            etat='planifie'
+            etat='planifie',
+            **assigned
         )
-        if examen.type == 'labo' and examen.laborantin:
-            Laboratin.objects.filter(user_id=examen.laborantin.user.id).update(nombreTests=F('nombreTests') + 1)
-            print(f"Laborantin {examen.laborantin} nombreTests incremented to {examen.laborantin.nombreTests + 1}")
+        if examen.type == 'labo' and examen.laborantin_id:
+            Laboratin.objects.filter(user_id=examen.laborantin_id).update(nombreTests=F('nombreTests') + 1)
+            if not assigned:
+                schedule_load_change('labo', examen.laborantin_id, 1)
 
-        elif examen.type == 'radio' and examen.radiologue:
-            Radiologue.objects.filter(user_id=examen.radiologue.user.id).update(nombreTests=F('nombreTests') + 1)
-            print(f"Radiologue {examen.radiologue} nombreTests incremented to {examen.radiologue.nombreTests + 1}")
+        elif examen.type == 'radio' and examen.radiologue_id:
+            Radiologue.objects.filter(user_id=examen.radiologue_id).update(nombreTests=F('nombreTests') + 1)
+            if not assigned:
+                schedule_load_change('radio', examen.radiologue_id, 1)
 
 class RadiologueListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsMedecin]
@@ -257,8 +262,7 @@ class ExaminationDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         return Examen.objects.select_related(
-            'consultation__dossier__patient__medecin__user',
-            'consultation__dossier__patient__centreHospitalier'
+            'consultation__dossier__patient__medecin__user'
         ).prefetch_related(
             'resultatlabo_set__healthmetrics_set',
             'resultatradio_set'
@@ -266,7 +270,7 @@ class ExaminationDetailView(generics.RetrieveAPIView):
 
     def get_object(self):
         obj = super().get_object()
-        if obj.consultation.dossier.patient.centreHospitalier != self.request.user.centreHospitalier:
+        if obj.centreHospitalier_id != self.request.user.centreHospitalier_id:
             raise PermissionDenied("Not authorized for this hospital's examinations")
         return obj
     
@@ -286,12 +290,12 @@ class OrdonnanceCreateView(generics.CreateAPIView):
 
     def perform_create(self, serializer):
         consultation = get_object_or_404(
-            Consultation, 
+            Consultation.objects.select_related('patient'),
             consultationID=self.kwargs['consultation_id']
         )
 
         # Check if doctor is authorized
-        if consultation.dossier.patient.medecin.user != self.request.user:
+        if consultation.patient.medecin_id != self.request.user.pk:
             raise PermissionDenied(
                 "You are not authorized to create prescriptions for this patient"
             )
@@ -307,14 +311,14 @@ class OrdonnanceDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         return Ordonnance.objects.select_related(
-            'consultation__dossier__patient__medecin__user'
+            'patient'
         ).prefetch_related(
             'ordonnancemedicament_set__med'
         )
 
     def get_object(self):
         obj = super().get_object()
-        if obj.consultation.dossier.patient.medecin.user != self.request.user:
+        if obj.patient.medecin_id != self.request.user.pk:
             raise PermissionDenied(
                 "You are not authorized to view this prescription"
             )
@@ -327,12 +331,12 @@ class ConsultationOrdonnanceListView(generics.ListAPIView):
 
     def get_queryset(self):
         consultation = get_object_or_404(
-            Consultation, 
+            Consultation.objects.select_related('patient'),
             consultationID=self.kwargs['consultation_id']
         )
 
         # Check if doctor is authorized
-        if consultation.dossier.patient.medecin.user != self.request.user:
+        if consultation.patient.medecin_id != self.request.user.pk:
             raise PermissionDenied(
                 "You are not authorized to view prescriptions for this patient"
             )
@@ -350,12 +354,12 @@ class OrdonnanceUpdateView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated, IsMedecin]
     serializer_class = OrdonnanceUpdateSerializer
     lookup_field = 'ordonnanceID'
-    queryset = Ordonnance.objects.all()
+    queryset = Ordonnance.objects.select_related('patient')
     http_method_names = ['patch']
 
     def get_object(self):
         obj = super().get_object()
-        if obj.consultation.dossier.patient.medecin.user != self.request.user:
+        if obj.patient.medecin_id != self.request.user.pk:
             raise PermissionDenied(
                 "You are not authorized to update this prescription"
             )
@@ -368,20 +372,14 @@ class MedicamentListView(generics.ListAPIView):
     queryset = Medicament.objects.all()
 
     def get_queryset(self):
-        queryset = Medicament.objects.all()
-
-        # Filter by type if provided
-        med_type = self.request.query_params.get('type', None)
-        if med_type:
-            queryset = queryset.filter(type=med_type)
-
-        # Search by name if provided
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(nom__icontains=search)
+        # Answered from the in-memory autocomplete index, best match first
+        search = self.request.query_params.get('search', '')
+        return medicament_index.search(
+            search,
+            type_=self.request.query_params.get('type') or None,
+            limit=MAX_SEARCH_RESULTS if search else None
+        )
 
-        return queryset
-    
 
 
 class PrescriptionCreateView(generics.CreateAPIView):
@@ -417,4 +415,9 @@ class PrescriptionCreateView(generics.CreateAPIView):
 class ActiviteInfermierCreateView(generics.CreateAPIView):
     queryset = ActiviteInfermier.objects.all()
     serializer_class = ActiviteInfermierCreateSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        activite = serializer.save()
+        # Push the new activity to the nurse's worklist
+        publish_activity(activite, 'activite_created')
\ No newline at end of file
@@ -0,0 +1,170 @@
+import heapq
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from healthhub_back.models import Laboratin, Radiologue
+
+# Technician model of each exam type
+STAFF_MODELS = {
+    'labo': Laboratin,
+    'radio': Radiologue,
+}
+
+
+class _Pool:
+    """
+    Min-heap of (load, str(user_id), user_id) of the technicians sharing a
+    hospital, specialite and shift. Outdated entries are left in the heap
+    and dropped once they surface.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.members = set()
+
+    def push(self, user_id, load):
+        heapq.heappush(self.heap, (load, str(user_id), user_id))
+
+    def peek(self, loads):
+        while self.heap:
+            load, _key, user_id = self.heap[0]
+            if loads.get(user_id) == load:
+                return self.heap[0]
+            heapq.heappop(self.heap)
+        return None
+
+    def compact(self, loads):
+        if len(self.heap) > 2 * len(self.members) + 16:
+            self.heap = [(loads[user_id], str(user_id), user_id) for user_id in self.members]
+            heapq.heapify(self.heap)
+
+
+class AssignmentBoard:
+    """
+    Thread-safe in-memory view of the outstanding exams (nombreTests) of the
+    lab technicians and radiologists, kept in min-heaps per hospital,
+    specialite and shift so the least-loaded match is found in O(log n).
+
+    The loads of a hospital are read from the database on first use and kept
+    up to date by the exam writes of this process; the TTL bounds how long
+    writes made by other processes are ignored.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        # Reentrant: a rolled back reservation may be released by the garbage
+        # collector while this thread holds the lock
+        self._lock = threading.RLock()
+        self._reset()
+
+    def assign(self, exam_type, centre_id, specialite=None, shift=None):
+        """
+        Returns the user ID of the least-loaded technician of `centre_id`
+        matching `specialite` and `shift` (any when None) and counts the new
+        exam in their load right away, so concurrent orders spread out, or
+        None when nobody matches. The count is given back if the current
+        transaction rolls back.
+        """
+        with self._lock:
+            self._ensure_loaded(exam_type, centre_id)
+            loads = self._loads[exam_type]
+            best = None
+            for (pool_specialite, pool_shift), pool in self._pools[exam_type, centre_id].items():
+                if specialite not in (None, pool_specialite) or shift not in (None, pool_shift):
+                    continue
+                top = pool.peek(loads)
+                if top is not None and (best is None or top < best):
+                    best = top
+            if best is None:
+                return None
+            load, _key, user_id = best
+            self._set_load(exam_type, user_id, load + 1)
+        transaction.on_commit(_Reservation(self, exam_type, user_id))
+        return user_id
+
+    def adjust(self, exam_type, user_id, delta):
+        with self._lock:
+            load = self._loads[exam_type].get(user_id)
+            if load is not None:
+                self._set_load(exam_type, user_id, load + delta)
+
+    def load_of(self, exam_type, user_id):
+        with self._lock:
+            return self._loads[exam_type].get(user_id)
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        self._expires_at = {}
+        # (exam type, centre) -> (specialite, shift) -> _Pool
+        self._pools = {}
+        # exam type -> user_id -> load, and user_id -> _Pool
+        self._loads = defaultdict(dict)
+        self._pool_of = defaultdict(dict)
+
+    def _ensure_loaded(self, exam_type, centre_id):
+        expires_at = self._expires_at.get((exam_type, centre_id))
+        if expires_at is not None and expires_at > time.monotonic():
+            return
+        for pool in self._pools.get((exam_type, centre_id), {}).values():
+            for user_id in pool.members:
+                self._loads[exam_type].pop(user_id, None)
+                self._pool_of[exam_type].pop(user_id, None)
+
+        pools = defaultdict(_Pool)
+        rows = STAFF_MODELS[exam_type].objects.filter(
+            user__centreHospitalier_id=centre_id,
+            user__is_active=True
+        ).values_list('user_id', 'specialite', 'shift', 'nombreTests')
+        for user_id, specialite, shift, load in rows:
+            pool = pools[specialite, shift]
+            pool.members.add(user_id)
+            pool.push(user_id, load)
+            self._loads[exam_type][user_id] = load
+            self._pool_of[exam_type][user_id] = pool
+        self._pools[exam_type, centre_id] = dict(pools)
+        self._expires_at[exam_type, centre_id] = time.monotonic() + self.ttl
+
+    def _set_load(self, exam_type, user_id, load):
+        pool = self._pool_of[exam_type][user_id]
+        self._loads[exam_type][user_id] = load
+        pool.push(user_id, load)
+        pool.compact(self._loads[exam_type])
+
+
+class _Reservation:
+    """
+    on_commit callback keeping a load counted by AssignmentBoard.assign. Only
+    the on_commit queue holds it: dropped uncalled, as a rollback does, it
+    gives the load back.
+    """
+
+    def __init__(self, board, exam_type, user_id):
+        self.state = state = {'committed': False}
+        weakref.finalize(self, _release, board, exam_type, user_id, state)
+
+    def __call__(self):
+        self.state['committed'] = True
+
+
+def _release(board, exam_type, user_id, state):
+    if not state['committed']:
+        board.adjust(exam_type, user_id, -1)
+
+
+exam_board = AssignmentBoard(ttl=settings.EXAM_ASSIGNMENT_TTL)
+
+
+def schedule_load_change(exam_type, user_id, delta):
+    """
+    Applies a change of a technician's nombreTests to the board once the
+    transaction commits. Used by the queryset updates of the counters.
+    """
+    transaction.on_commit(lambda: exam_board.adjust(exam_type, user_id, delta))
@@ -49,7 +49,7 @@ urlpatterns = [
     path(
         'infermier/',
         ActiviteInfermierCreateView.as_view(),
-        name='examination-create'
+        name='activite-infermier-create'
     )
     ,
     path(
@@ -78,4 +78,9 @@ urlpatterns = [
         PrescriptionCreateView.as_view(),
         name='create-prescription'
     ),
+    path(
+        'medicaments/',
+        MedicamentListView.as_view(),
+        name='medicament-list'
+    ),
 ]
\ No newline at end of file
@@ -9,16 +9,19 @@ from healthhub_back.accounts.patient.patient_serializers import HealthMetricsSer
 
 
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 
 class ExamRequiredSerializer(serializers.ModelSerializer):
     doctor_details = serializers.CharField(read_only=True)
-    patient = serializers.CharField(source='consultation.dossier.patient.__str__', read_only=True)
-    patient_id = serializers.CharField(source='consultation.dossier.patient.user.id', read_only=True)
-    nss = serializers.CharField(source='consultation.dossier.patient.NSS', read_only=True)
-    type = serializers.CharField(source='get_type_display', read_only=True)
-    etat = serializers.CharField(source='get_etat_display', read_only=True)
-    priorite = serializers.CharField(source='get_priorite_display', read_only=True)
+    # Method fields: DRF inspects the signature of callable sources on every
+    # row, which dominates the cost of long worklists
+    patient = serializers.SerializerMethodField()
+    patient_id = serializers.CharField(read_only=True)
+    nss = serializers.CharField(source='patient.NSS', read_only=True)
+    type = serializers.SerializerMethodField()
+    etat = serializers.SerializerMethodField()
+    priorite = serializers.SerializerMethodField()
     # Include 'doctor_details' from Examen model
     # Conditionally include 'health_metrics' if 'etat' is 'termine'
     health_metrics = serializers.SerializerMethodField()
@@ -39,15 +42,31 @@ class ExamRequiredSerializer(serializers.ModelSerializer):
             'nss'
         ]
 
+    @cached_property
+    def health_metrics_serializer(self):
+        # Built once per list instead of once per exam
+        return HealthMetricsSerializer(many=True)
+
+    def get_patient(self, obj):
+        return str(obj.patient)
+
+    def get_type(self, obj):
+        return obj.get_type_display()
+
+    def get_etat(self, obj):
+        return obj.get_etat_display()
+
+    def get_priorite(self, obj):
+        return obj.get_priorite_display()
+
     def get_health_metrics(self, obj):
         if obj.etat == 'termine':
-            # Assuming each 'termine' exam has at most one ResultatLabo
-            try:
-                resultat_labo = obj.resultatlabo_set.first()
-                if resultat_labo:
-                    return HealthMetricsSerializer(resultat_labo.healthmetrics_set.all(), many=True).data
-            except ResultatLabo.DoesNotExist:
-                return []
+            # Assuming each 'termine' exam has at most one ResultatLabo; all()
+            # reads the results prefetched by the list views
+            resultats = obj.resultatlabo_set.all()
+            if resultats:
+                resultat_labo = min(resultats, key=lambda resultat: resultat.pk)
+                return self.health_metrics_serializer.to_representation(resultat_labo.healthmetrics_set.all())
         return []  # Return empty list if not 'termine'
 
 
@@ -80,6 +99,24 @@ class ResultatLaboCreateSerializer(serializers.ModelSerializer):
         return resultat_labo
 
 
+class LabResultBatchItemSerializer(serializers.Serializer):
+    # A plain UUID: the exams are looked up together by the service
+    examen = serializers.UUIDField()
+    resultat = serializers.CharField()
+    status = serializers.ChoiceField(choices=ResultatLabo.STATUS_CHOICES)
+    health_metrics = HealthMetricsCreateSerializer(many=True)
+
+
+class LabResultBatchSerializer(serializers.Serializer):
+    results = LabResultBatchItemSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_results(self, value):
+        exam_ids = [result['examen'] for result in value]
+        if len(set(exam_ids)) != len(exam_ids):
+            raise serializers.ValidationError("Each exam can only be submitted once per batch.")
+        return value
+
+
 class ResultatLaboHistorySerializer(serializers.ModelSerializer):
     health_metrics = HealthMetricsSerializer(many=True, read_only=True,source='healthmetrics_set')
     examenID = serializers.UUIDField(source='examen.examenID', read_only=True)
@@ -0,0 +1,84 @@
+# laborantin/services.py
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from healthhub_back.models import Examen, HealthMetrics, Laboratin, ResultatLabo
+from ..doctor.exam_assignment import schedule_load_change
+from ..patient.patient_service import schedule_consultations_refresh
+
+
+@transaction.atomic
+def submit_lab_results(laboratin, results):
+    """
+    Records the results of an analyzer run: one ResultatLabo with its health
+    metrics per exam, written with a constant number of queries.
+
+    Parameters:
+    - laboratin (Laboratin): lab technician submitting the results.
+    - results (list of dict): 'examen' (UUID), 'resultat', 'status' and
+      'health_metrics' of each exam.
+
+    Returns:
+    - (outcomes, remaining): outcomes maps each exam ID to 'submitted',
+      'not_found' or 'no_remaining_tests'; remaining is the number of tests
+      left to the technician.
+    """
+    # Lock the counter and the exams so concurrent runs cannot overdraw the
+    # counter
+    remaining = Laboratin.objects.select_for_update().values_list(
+        'nombreTests', flat=True
+    ).get(pk=laboratin.pk)
+    exams = Examen.objects.select_for_update().filter(
+        examenID__in=[result['examen'] for result in results],
+        type='labo',
+        laborantin=laboratin,
+        etat__in=['planifie', 'en_cours', 'termine'],
+    ).in_bulk()
+
+    outcomes = {}
+    accepted = []
+    for result in results:
+        examen = exams.get(result['examen'])
+        if examen is None:
+            outcomes[result['examen']] = 'not_found'
+        elif len(accepted) >= remaining:
+            outcomes[result['examen']] = 'no_remaining_tests'
+        else:
+            outcomes[result['examen']] = 'submitted'
+            accepted.append(result)
+
+    if not accepted:
+        return outcomes, remaining
+
+    analysed_at = timezone.now()
+    resultats = ResultatLabo.objects.bulk_create([
+        ResultatLabo(
+            examen_id=result['examen'],
+            # Copied from the locked exams rather than read again
+            patient_id=exams[result['examen']].patient_id,
+            centreHospitalier_id=exams[result['examen']].centreHospitalier_id,
+            laboratin=laboratin,
+            resultat=result['resultat'],
+            status=result['status'],
+            dateAnalyse=analysed_at,
+        )
+        for result in accepted
+    ])
+    HealthMetrics.objects.bulk_create([
+        HealthMetrics(resLabo=resultat, **metric)
+        for resultat, result in zip(resultats, accepted)
+        for metric in result['health_metrics']
+    ])
+
+    # The single submission moves each exam through 'en_cours'; within one
+    # transaction nobody can observe that state, so go straight to 'termine'
+    exam_ids = [result['examen'] for result in accepted]
+    Examen.objects.filter(examenID__in=exam_ids).update(etat='termine')
+    Laboratin.objects.filter(pk=laboratin.pk).update(nombreTests=F('nombreTests') - len(accepted))
+    schedule_load_change('labo', laboratin.pk, -len(accepted))
+
+    # Bulk writes skip the signals refreshing the medical file snapshots
+    schedule_consultations_refresh({exams[exam_id].consultation_id for exam_id in exam_ids})
+    return outcomes, remaining - len(accepted)
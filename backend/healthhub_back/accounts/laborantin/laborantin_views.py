@@ -1,13 +1,18 @@
 # views.py
-from django.db.models import F
+from django.db.models import Count, F
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from healthhub_back.accounts.patient.patient_serializers import ExamensSerializer
 from healthhub_back.models import Examen, ResultatLabo, Laboratin, Patient
 from .laborantin_serializers import (
-    ExamRequiredSerializer, ResultatLaboCreateSerializer, LabResultHistorySerializer, ResultatLaboHistorySerializer
+    ExamRequiredSerializer, ResultatLaboCreateSerializer, LabResultHistorySerializer, ResultatLaboHistorySerializer,
+    LabResultBatchSerializer
 )
+from .laborantin_service import submit_lab_results
+from ..doctor.exam_assignment import schedule_load_change
 from rest_framework.permissions import IsAuthenticated
+from healthhub_back.common.pagination import KeysetPagination
 
 # Custom permission to allow only lab technicians
 class IsLaborantin(permissions.BasePermission):
@@ -17,6 +22,50 @@ class IsLaborantin(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'laborantin'
 
+def lab_exam_queryset(laborantin):
+    """
+    Lab exams of a technician with everything ExamRequiredSerializer reads,
+    fetched in a constant number of queries.
+    """
+    return Examen.objects.filter(
+        type='labo',
+        laborantin=laborantin
+    ).select_related(
+        'patient'
+    ).only(
+        # Skip the patient's other columns
+        *(field.name for field in Examen._meta.concrete_fields),
+        'patient__nom',
+        'patient__prenom',
+        'patient__NSS',
+    ).prefetch_related(
+        'resultatlabo_set__healthmetrics_set'
+    )
+
+
+def lab_exam_counts(laborantin_id):
+    """
+    (etat, number of exams) rows of a technician's lab exams.
+    """
+    return Examen.objects.filter(
+        type='labo',
+        laborantin_id=laborantin_id
+    ).values_list('etat').annotate(count=Count('pk')).order_by()
+
+
+def lab_result_history(patient_nss):
+    """
+    Lab results of a patient, newest first, with their exam and metrics.
+    """
+    return ResultatLabo.objects.filter(
+        patient__NSS=patient_nss,
+        examen__type='labo'
+    ).select_related(
+        'examen'
+    ).prefetch_related(
+        'healthmetrics_set'
+    ).order_by('-dateAnalyse')
+
 class ExamListView(generics.ListAPIView):
     """
     GET: Retrieve a list of all exams required by the lab technician.
@@ -34,13 +83,47 @@ class ExamListView(generics.ListAPIView):
             return Examen.objects.none()
 
         # Filter exams of type 'labo' and associated with the hospital center
-        laboratin = self.request.user.laboratin
-        return Examen.objects.filter(
-            type='labo',
-            laborantin=laborantin,
+        return lab_exam_queryset(laborantin).filter(
             etat__in=['planifie', 'en_cours', 'termine']  # Include 'termine' to see results
         )
 
+
+class WorklistPagination(KeysetPagination):
+    ordering = ('prioriteRank', 'createdAt', 'pk')
+    page_size = 500
+    max_page_size = 1000
+
+
+class LabWorklistView(generics.ListAPIView):
+    """
+    GET: The lab technician's exams, most urgent first then oldest first,
+    with the number of exams in each state.
+    Query parameters: etat (repeatable, default planifie and en_cours), page_size, cursor.
+    """
+    serializer_class = ExamRequiredSerializer
+    permission_classes = [IsAuthenticated, IsLaborantin]
+    pagination_class = WorklistPagination
+
+    def get_queryset(self):
+        try:
+            laborantin = self.request.user.laboratin
+        except Laboratin.DoesNotExist:
+            return Examen.objects.none()
+
+        etats = self.request.query_params.getlist('etat') or ['planifie', 'en_cours']
+        return lab_exam_queryset(laborantin).filter(etat__in=etats)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        response.data['counts'] = self.get_counts()
+        return response
+
+    def get_counts(self):
+        counts = dict.fromkeys((etat for etat, _label in Examen.ETAT_CHOICES), 0)
+        counts.update(lab_exam_counts(self.request.user.pk))
+        return counts
+
 class SubmitLabTestView(generics.CreateAPIView):
     serializer_class = ResultatLaboCreateSerializer
     permission_classes = [IsAuthenticated, IsLaborantin]
@@ -75,10 +158,40 @@ class SubmitLabTestView(generics.CreateAPIView):
         examen.save()
 
         Laboratin.objects.filter(user_id=laboratin.user.id).update(nombreTests=F('nombreTests') - 1)
+        schedule_load_change('labo', laboratin.user_id, -1)
 
         return Response(ExamRequiredSerializer(examen).data, status=status.HTTP_201_CREATED)
     
 
+class SubmitLabTestBatchView(generics.GenericAPIView):
+    """
+    POST: Submit the results of an analyzer run for many exams at once.
+    Body: {"results": [{"examen", "resultat", "status", "health_metrics"}, ...]}.
+    Returns the outcome of every exam ('submitted', 'not_found' or
+    'no_remaining_tests') and the number of tests left.
+    """
+    serializer_class = LabResultBatchSerializer
+    permission_classes = [IsAuthenticated, IsLaborantin]
+
+    def post(self, request, *args, **kwargs):
+        try:
+            laboratin = request.user.laboratin
+        except Laboratin.DoesNotExist:
+            return Response({"detail": "Laborantin profile not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if laboratin.nombreTests <= 0:
+            return Response({"detail": "No remaining tests to perform."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        outcomes, remaining = submit_lab_results(laboratin, serializer.validated_data['results'])
+        return Response({
+            'outcomes': {str(examen_id): outcome for examen_id, outcome in outcomes.items()},
+            'nombreTests': remaining,
+        }, status=status.HTTP_200_OK)
+
+
 class LabResultHistoryView(generics.ListAPIView):
     """
     GET: Retrieve history of lab results for a given patient by patient NSS.
@@ -93,15 +206,7 @@ class LabResultHistoryView(generics.ListAPIView):
         if not Patient.objects.filter(NSS=patient_nss).exists():
             return ResultatLabo.objects.none()  # Alternatively, raise a 404 error
 
-        history = ResultatLabo.objects.filter(
-            examen__consultation__dossier__patient__NSS=patient_nss,
-            examen__type='labo'
-        ).select_related(
-            'examen'
-        ).prefetch_related(
-            'healthmetrics_set'  # Updated to use default reverse relationship
-        ).order_by('-dateAnalyse')
-        return history
+        return lab_result_history(patient_nss)
     
 
 class ExaminationDetailView(generics.RetrieveAPIView):
@@ -111,8 +216,7 @@ class ExaminationDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         return Examen.objects.select_related(
-            'consultation__dossier__patient__medecin__user',
-            'consultation__dossier__patient__centreHospitalier'
+            'consultation__dossier__patient__medecin__user'
         ).prefetch_related(
             'resultatlabo_set__healthmetrics_set',
             'resultatradio_set'
@@ -120,6 +224,6 @@ class ExaminationDetailView(generics.RetrieveAPIView):
 
     def get_object(self):
         obj = super().get_object()
-        if obj.consultation.dossier.patient.centreHospitalier != self.request.user.centreHospitalier:
+        if obj.centreHospitalier_id != self.request.user.centreHospitalier_id:
             raise PermissionDenied("Not authorized for this hospital's examinations")
         return obj
\ No newline at end of file
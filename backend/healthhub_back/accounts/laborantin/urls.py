@@ -1,11 +1,13 @@
 # urls.py
 
 from django.urls import path
-from .laborantin_views import ExamListView, ExaminationDetailView, SubmitLabTestView, LabResultHistoryView
+from .laborantin_views import ExamListView, LabWorklistView, ExaminationDetailView, SubmitLabTestView, SubmitLabTestBatchView, LabResultHistoryView
 
 urlpatterns = [
     path('exams/', ExamListView.as_view(), name='lab-exam-list'),
+    path('worklist/', LabWorklistView.as_view(), name='lab-worklist'),
     path('submit-test/', SubmitLabTestView.as_view(), name='submit-lab-test'),
+    path('submit-tests/batch/', SubmitLabTestBatchView.as_view(), name='submit-lab-tests-batch'),
     path('patient-history/<str:patient_nss>/', LabResultHistoryView.as_view(), name='lab-result-history'),
     path(
         'examinations/<uuid:examenID>/',
@@ -0,0 +1,38 @@
+from healthhub_back.common.events import get_broker, publish_on_commit
+from .nurse_serializers import NurseActivityDetailSerializer
+
+
+def nurse_channel(infermier_id):
+    """
+    Event channel of a nurse's worklist.
+    """
+    return f'nurse:{infermier_id}'
+
+
+def activity_row(activity):
+    """
+    Serializes an activity the way the nurse worklist lists it.
+    Expects consultation and patient to be loaded.
+    """
+    return NurseActivityDetailSerializer({
+        "patient": activity.patient,
+        "activities": [activity],
+        "consultation": activity.consultation,
+    }).data
+
+
+def publish_activity(activity, type_):
+    """
+    Sends the new state of an activity to its nurse's worklist once the
+    transaction commits. `type_` is 'activite_created', 'activite_started'
+    or 'activite_validated'.
+    """
+    publish_on_commit(nurse_channel(activity.infermier_id), type_, activity_row(activity))
+
+
+def worklist_position(infermier_id):
+    """
+    ID of the last event of a nurse's channel: listening from there after
+    reading the worklist misses no change.
+    """
+    return get_broker().last_id(nurse_channel(infermier_id))
@@ -1,6 +1,18 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from healthhub_back.models import Consultation, ActiviteInfermier
 from .nurse_serializers import  ValidateActiviteSerializer, NurseActivityDetailSerializer ,ActivitySerializer
 from rest_framework.views import APIView
@@ -8,7 +20,10 @@ from rest_framework.views import APIView
 from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter, OrderingFilter
 
-from django.db.models import Q
+from healthhub_back.common.events import get_broker
+from healthhub_back.common.pagination import KeysetPagination
+from healthhub_back.common.search.patient_index import filter_by_patient_search
+from .nurse_service import activity_row, nurse_channel, publish_activity, worklist_position
 
 
 
@@ -24,6 +39,10 @@ class IsInfermier(permissions.BasePermission):
         )
     
 
+def activity_queryset():
+    return ActiviteInfermier.objects.select_related('consultation', 'patient')
+
+
 class ActiviteFilter(filters.FilterSet):
     # Add filters for activity type and status
     status = filters.ChoiceFilter(choices=[
@@ -55,6 +74,7 @@ class NurseActiviteListView(generics.ListAPIView):
     serializer_class = NurseActivityDetailSerializer
 
     filter_backends = [filters.DjangoFilterBackend, SearchFilter]
+    pagination_class = KeysetPagination
     filterset_class = ActiviteFilter
 
     def get_queryset(self):
@@ -63,11 +83,7 @@ class NurseActiviteListView(generics.ListAPIView):
         """
         # Get nurse's activities that are associated with this nurse
         infermier = self.request.user.infermier
-        queryset = ActiviteInfermier.objects.filter(
-            infermier=infermier,
-        ).select_related(
-            'consultation__dossier__patient'
-        ).distinct()
+        queryset = activity_queryset().filter(infermier=infermier)
 
         # Apply filters from the request if they exist
         if self.request.GET.get('status'):
@@ -80,19 +96,18 @@ class NurseActiviteListView(generics.ListAPIView):
 
         if self.request.GET.get('search'):
             search_query = self.request.GET.get('search')
-            queryset = queryset.filter(
-                Q(consultation__dossier__patient__nom__icontains=search_query) |
-                Q(consultation__dossier__patient__prenom__icontains=search_query) |
-                Q(consultation__dossier__patient__NSS__icontains=search_query)
-            ).distinct()
+            queryset = filter_by_patient_search(queryset, search_query, 'patient')
 
         return queryset
 
     def list(self, request, *args, **kwargs):
-        # Apply filtering, searching, and ordering
-        queryset = self.get_queryset()
+        # Taken before the read so no change falls between the two
+        position = worklist_position(request.user.infermier.pk)
 
-        if not queryset.exists():
+        # Apply filtering and searching, then fetch one page
+        page = self.paginate_queryset(self.get_queryset())
+
+        if not page and not request.GET.get('cursor'):
             return Response(
                 {"message": "No activities found for this nurse using these search filters."},
                 status=status.HTTP_404_NOT_FOUND
@@ -100,20 +115,13 @@ class NurseActiviteListView(generics.ListAPIView):
 
         # Serialize data
         data = []
-        for activity in queryset:
-            # Get related consultation and patient details
-            consultation = activity.consultation
-            patient = consultation.dossier.patient
-
-            serialized_data = NurseActivityDetailSerializer({
-                "patient": patient,
-                "activities": [activity],
-                "consultation": consultation,
-            }).data
-
-            data.append(serialized_data)
+        for activity in page:
+            data.append(activity_row(activity))
 
-        return Response(data, status=status.HTTP_200_OK)
+        response = self.get_paginated_response(data)
+        # Where to listen from (events/) to hear of the changes after this read
+        response['Last-Event-ID'] = str(position)
+        return response
 
 
 class StartActiviteView(APIView):
@@ -124,11 +132,12 @@ class StartActiviteView(APIView):
 
     def patch(self, request, *args, **kwargs):
         activiteinfermier_id = kwargs.get("activiteinfermier_id")
-        activiteinfermier = get_object_or_404(ActiviteInfermier, id=activiteinfermier_id)
+        activiteinfermier = get_object_or_404(activity_queryset(), id=activiteinfermier_id)
 
         # Update the status
         activiteinfermier.status = "en_cours"
         activiteinfermier.save()
+        publish_activity(activiteinfermier, 'activite_started')
 
         return Response(
             {"message": f"Activity '{activiteinfermier.id}' updated to 'en_cours'."},
@@ -150,7 +159,7 @@ class ValidateActiviteView(generics.GenericAPIView):
 
         # Get the consultation object or return a 404
         activiteinfermier_id = kwargs.get('activiteinfermier_id')
-        activiteinfermier = get_object_or_404(ActiviteInfermier, id=activiteinfermier_id)
+        activiteinfermier = get_object_or_404(activity_queryset(), id=activiteinfermier_id)
 
         if not activiteinfermier:
             return Response(
@@ -161,6 +170,7 @@ class ValidateActiviteView(generics.GenericAPIView):
         activiteinfermier.status = "termine"
         activiteinfermier.nurse_observations = nurse_observations
         activiteinfermier.save()
+        publish_activity(activiteinfermier, 'activite_validated')
 
         return Response(
             {"message": f"Activity '{activiteinfermier.id}' validated."},
@@ -176,17 +186,16 @@ class HistoriqueActivitesView(generics.ListAPIView):
     serializer_class = ActivitySerializer
 
     filter_backends = [filters.DjangoFilterBackend, SearchFilter]
+    pagination_class = KeysetPagination
     filterset_class = HistoryActiviteFilter
 
     def get_queryset(self):
         # Get nurse's activities
         infermier = self.request.user.infermier
-        queryset = ActiviteInfermier.objects.filter(
+        queryset = activity_queryset().filter(
             infermier=infermier,
             status="termine"
-        ).select_related(
-            'consultation__dossier__patient'
-        ).distinct()
+        )
 
         if self.request.GET.get('type_activite'):
             type_activite = self.request.GET.get('type_activite')
@@ -194,16 +203,14 @@ class HistoriqueActivitesView(generics.ListAPIView):
 
         if self.request.GET.get('search'):
             search_query = self.request.GET.get('search')
-            queryset = queryset.filter(
-                Q(consultation__dossier__patient__nom__icontains=search_query) |
-                Q(consultation__dossier__patient__prenom__icontains=search_query) |
-                Q(consultation__dossier__patient__NSS__icontains=search_query)
-            ).distinct()
+            queryset = filter_by_patient_search(queryset, search_query, 'patient')
+
+        return queryset
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        page = self.paginate_queryset(self.get_queryset())
 
-        if not queryset.exists():
+        if not page and not request.GET.get('cursor'):
             return Response(
                 {"message": "No activities done found for this nurse."},
                 status=status.HTTP_404_NOT_FOUND
@@ -211,19 +218,84 @@ class HistoriqueActivitesView(generics.ListAPIView):
 
         # Prepare data for serialization
         data = []
-        for activity in queryset:
-            # Get related consultation and patient details
-                consultation = activity.consultation
-                patient = consultation.dossier.patient
+        for activity in page:
+            data.append(activity_row(activity))
 
-                serialized_data = NurseActivityDetailSerializer({
-                    "patient": patient,
-                    "activities": [activity],  
-                    "consultation": consultation,
-                }).data
+        return self.get_paginated_response(data)
 
-                data.append(serialized_data)
 
-        return Response(data, status=status.HTTP_200_OK)
-    
+class NurseActiviteEventsView(View):
+    """
+    Changes of the nurse's worklist after the event `last_event_id` (query
+    parameter or Last-Event-ID header, the current position by default):
+    created, started and validated activities, serialized like the rows of
+    activites/.
+
+    Answers as a long-poll, waiting up to `timeout` seconds for an event, or
+    as a server-sent event stream when the client accepts text/event-stream
+    and the project runs under ASGI. WSGI servers buffer the whole stream of
+    an asynchronous response, so there clients always get the long-poll.
+    `reset` tells the client it fell too far behind and must reload the list.
+
+    The view is asynchronous so that under ASGI waiting clients hold no
+    worker thread.
+    """
 
+    async def get(self, request, *args, **kwargs):
+        user = await sync_to_async(self.authenticate)(request)
+        if user is None or not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED)
+        if not IsInfermier().has_permission(request, self):
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=status.HTTP_403_FORBIDDEN)
+
+        broker = get_broker()
+        channel = nurse_channel(user.pk)
+        after = request.GET.get('last_event_id') or request.headers.get('Last-Event-ID')
+        if after is None:
+            after = broker.last_id(channel)
+        elif not after.isdigit():
+            return JsonResponse({"last_event_id": "Must be an event ID."}, status=status.HTTP_400_BAD_REQUEST)
+        after = int(after)
+
+        if isinstance(request, ASGIRequest) and 'text/event-stream' in request.headers.get('Accept', ''):
+            response = StreamingHttpResponse(self.stream(broker, channel, after), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            # Keep proxies from buffering the stream
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        try:
+            timeout = min(max(float(request.GET.get('timeout', settings.EVENTS_LONG_POLL_TIMEOUT)), 0), settings.EVENTS_LONG_POLL_TIMEOUT)
+        except ValueError:
+            return JsonResponse({"timeout": "Must be a number of seconds."}, status=status.HTTP_400_BAD_REQUEST)
+        events, reset = await broker.wait(channel, after, timeout)
+        if reset:
+            events, after = [], broker.last_id(channel)
+        elif events:
+            after = events[-1]['id']
+        return JsonResponse({"events": events, "last_event_id": after, "reset": reset})
+
+    def authenticate(self, request):
+        # DRF authentication (tokens, sessions) outside of an APIView
+        drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            request.user = drf_request.user
+        except APIException:
+            return None
+        return request.user
+
+    async def stream(self, broker, channel, after):
+        deadline = time.monotonic() + settings.EVENTS_STREAM_SECONDS
+        # Clients reconnect with Last-Event-ID once the stream closes
+        yield 'retry: 3000\n\n'
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, reset = await broker.wait(channel, after, min(remaining, settings.EVENTS_LONG_POLL_TIMEOUT))
+            if reset:
+                after = broker.last_id(channel)
+                yield f'id: {after}\nevent: reset\ndata: {{}}\n\n'
+                continue
+            for event in events:
+                after = event['id']
+                yield f"id: {after}\nevent: {event['type']}\ndata: {json.dumps(event['data'], cls=DjangoJSONEncoder)}\n\n"
+            if not events:
+                yield ': keepalive\n\n'
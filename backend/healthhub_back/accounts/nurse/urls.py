@@ -1,6 +1,7 @@
 from django.urls import path
 from .nurse_view import (
     NurseActiviteListView,
+    NurseActiviteEventsView,
     StartActiviteView,
     ValidateActiviteView,
     HistoriqueActivitesView,
@@ -10,5 +11,6 @@ urlpatterns = [
     path('activites/', NurseActiviteListView.as_view(), name='nurse_activites_list'), # Nurse can see the activities that are planned
     path('activites/<uuid:activiteinfermier_id>/start/', StartActiviteView.as_view(), name='start_activity'), # Nurse starts a activity which gonna update the status of the activity from planifie to en cours
     path('activites/<uuid:activiteinfermier_id>/validate/', ValidateActiviteView.as_view(), name='validate_activity'), # Nurse validates a activity which gonna update the status of the activity from en cours to termine and also save the results to the db
+    path('activites/events/', NurseActiviteEventsView.as_view(), name='nurse_activites_events'), # Long-poll / server-sent events with the changes of the nurse's worklist
     path('activites/historique/', HistoriqueActivitesView.as_view(), name='activity_history'),  # Historique des activités
 ]
\ No newline at end of file
@@ -0,0 +1,83 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from healthhub_back.models import (
+    ActiviteInfermier, Consultation, Examen, HealthMetrics, Ordonnance,
+    OrdonnanceMedicament, ResultatLabo, ResultatRadio,
+)
+from .patient_serializers import PatientsSerializer
+
+EXPORT_CHUNK_SIZE = 500
+
+# (record type, model, lookup from the model to the patient, exported columns)
+EXPORT_RECORDS = [
+    ('consultation', Consultation, 'patient', [
+        'consultationID', 'dossier_id', 'dateConsultation', 'diagnostic', 'resume', 'status',
+    ]),
+    ('ordonnance', Ordonnance, 'patient', [
+        'ordonnanceID', 'consultation_id', 'valide', 'dateCreation', 'dateExpiration',
+    ]),
+    ('ordonnance_medicament', OrdonnanceMedicament, 'ordonnance__patient', [
+        'ordonnanceMedicamentID', 'ordonnance_id', 'med_id', 'medicament', 'duree', 'dosage',
+        'frequence', 'instructions',
+    ]),
+    ('examen', Examen, 'patient', [
+        'examenID', 'consultation_id', 'type', 'doctor_details', 'createdAt', 'etat', 'priorite',
+        'laborantin_id', 'radiologue_id',
+    ]),
+    ('resultat_labo', ResultatLabo, 'patient', [
+        'resLaboID', 'examen_id', 'laboratin_id', 'resultat', 'dateAnalyse', 'status',
+    ]),
+    ('health_metric', HealthMetrics, 'resLabo__patient', [
+        'id', 'resLabo_id', 'metric_type', 'value', 'unit', 'measured_at',
+    ]),
+    ('resultat_radio', ResultatRadio, 'examen__patient', [
+        'resRadioID', 'examen_id', 'radioImgURL', 'uploadStatus', 'type', 'rapport', 'dateRealisation',
+    ]),
+    ('activite_infermier', ActiviteInfermier, 'patient', [
+        'id', 'consultation_id', 'infermier_id', 'typeActivite', 'doctors_details',
+        'nurse_observations', 'createdAt', 'status',
+    ]),
+]
+
+
+def _line(record, data):
+    return json.dumps({'record': record, 'data': data}, cls=DjangoJSONEncoder) + '\n'
+
+
+def _iter_chunks(queryset, chunk_size):
+    """
+    Walks a queryset in primary key order, one bounded query per chunk, so
+    neither the database driver nor Python holds more than `chunk_size` rows.
+    """
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk.order_by('pk')[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1]['pk']
+
+
+def iter_medical_file_ndjson(dossier, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields a dossier as newline-delimited JSON: a 'dossier' header record, then
+    one record per consultation, ordonnance, medicament line, examen, result,
+    health metric and nurse activity. Each record carries the IDs of its parents.
+    """
+    yield _line('dossier', {
+        'dossierID': dossier.dossierID,
+        'createdAt': dossier.createdAt,
+        'active': dossier.active,
+        'patient': PatientsSerializer(dossier.patient).data,
+    })
+
+    for record, model, patient_lookup, fields in EXPORT_RECORDS:
+        queryset = model.objects.filter(**{patient_lookup: dossier.patient_id})
+        if model is OrdonnanceMedicament:
+            queryset = queryset.annotate(medicament=F('med__nom'))
+        for row in _iter_chunks(queryset.values('pk', *fields), chunk_size):
+            yield _line(record, {field: row[field] for field in fields})
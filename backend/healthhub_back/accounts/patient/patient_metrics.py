@@ -0,0 +1,74 @@
+import math
+
+from django.db.models import Avg, Count, DateField, Max, Min
+from django.db.models.functions import Trunc
+
+from healthhub_back.models import HealthMetrics
+
+
+def _bucket_rows(patient_id, metric_type, bucket, start=None, end=None):
+    """
+    Aggregates the measurements of a patient per day, week or month in a
+    single GROUP BY query.
+    """
+    metrics = HealthMetrics.objects.filter(
+        resLabo__patient_id=patient_id,
+        metric_type=metric_type
+    )
+    if start is not None:
+        metrics = metrics.filter(measured_at__gte=start)
+    if end is not None:
+        metrics = metrics.filter(measured_at__lte=end)
+    return metrics.annotate(
+        period=Trunc('measured_at', bucket, output_field=DateField())
+    ).values('period').annotate(
+        first=Min('measured_at'),
+        last=Max('measured_at'),
+        min=Min('value'),
+        max=Max('value'),
+        mean=Avg('value'),
+        count=Count('id'),
+    ).order_by('period')
+
+
+def _merge(rows):
+    count = sum(row['count'] for row in rows)
+    return {
+        'start': rows[0]['first'],
+        'end': rows[-1]['last'],
+        'min': min(row['min'] for row in rows),
+        'max': max(row['max'] for row in rows),
+        'mean': sum(row['mean'] * row['count'] for row in rows) / count,
+        'count': count,
+    }
+
+
+def get_health_metric_series(patient_id, metric_type, bucket='day', start=None, end=None, points=None):
+    """
+    Returns the min/max/mean time series of one health metric of a patient.
+
+    The database aggregates the measurements per bucket; when more buckets
+    than `points` remain, consecutive buckets are merged so the series has at
+    most `points` points.
+
+    Parameters:
+    - patient_id (UUID): Patient user ID.
+    - metric_type (str): one of HealthMetrics.METRIC_TYPE_CHOICES.
+    - bucket (str): 'day', 'week' or 'month'.
+    - start, end (date): optional bounds of the measurement dates.
+    - points (int): optional maximum number of points.
+    """
+    rows = [
+        dict(row, min=float(row['min']), max=float(row['max']), mean=float(row['mean']))
+        for row in _bucket_rows(patient_id, metric_type, bucket, start, end)
+    ]
+    size = math.ceil(len(rows) / points) if points and len(rows) > points else 1
+    series = [_merge(rows[i:i + size]) for i in range(0, len(rows), size)]
+    for point in series:
+        point['mean'] = round(point['mean'], 2)
+    return {
+        'metric_type': metric_type,
+        'bucket': bucket,
+        'buckets_per_point': size,
+        'points': series,
+    }
@@ -87,6 +87,7 @@ class ResultatsRadioSerializer(serializers.ModelSerializer):
             'radiologue_name',
             'radiologue_specialite',
             'radioImgURL',
+            'uploadStatus',
             'type',
             'rapport',
             'dateRealisation'
@@ -176,6 +177,18 @@ class PatientsSerializer(serializers.ModelSerializer):
             'createdAt'
         ]
 
+class HealthMetricsSeriesQuerySerializer(serializers.Serializer):
+    metric_type = serializers.ChoiceField(choices=HealthMetrics.METRIC_TYPE_CHOICES)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    points = serializers.IntegerField(required=False, min_value=1, max_value=1000)
+
+    def validate(self, attrs):
+        if 'start' in attrs and 'end' in attrs and attrs['start'] > attrs['end']:
+            raise serializers.ValidationError("start must be before end.")
+        return attrs
+
 class DossierMedicalDetailSerializer(serializers.ModelSerializer):
     patient = PatientsSerializer(read_only=True)
     consultations = ConsultationsSerializer(source='consultation_set', many=True, read_only=True)
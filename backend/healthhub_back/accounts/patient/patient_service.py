@@ -0,0 +1,352 @@
+import logging
+import weakref
+
+from asgiref.local import Local
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from healthhub_back.common.qr import render_qr_code
+from healthhub_back.common.workers import run_in_background
+from healthhub_back.models import Consultation, DossierMedical, DossierSnapshot
+from .patient_serializers import ConsultationsSerializer, DossierMedicalDetailSerializer
+
+logger = logging.getLogger(__name__)
+
+
+FULL_REBUILD = None
+
+
+def medical_file_queryset():
+    """
+    DossierMedical queryset prefetching everything DossierMedicalDetailSerializer walks.
+    """
+    return DossierMedical.objects.select_related(
+        'patient',
+        'patient__medecin',
+        'patient__medecin__user',
+        'patient__centreHospitalier'
+    ).prefetch_related(
+        'consultation_set',
+        'consultation_set__ordonnance_set',
+        'consultation_set__ordonnance_set__ordonnancemedicament_set',
+        'consultation_set__ordonnance_set__ordonnancemedicament_set__med',
+        'consultation_set__examen_set',
+        'consultation_set__examen_set__radiologue__user',
+        'consultation_set__examen_set__resultatlabo_set',
+        'consultation_set__examen_set__resultatlabo_set__laboratin__user',
+        'consultation_set__examen_set__resultatlabo_set__healthmetrics_set',
+        'consultation_set__examen_set__resultatradio_set',
+        'consultation_set__activiteinfermier_set',
+        'consultation_set__activiteinfermier_set__infermier__user'
+    )
+
+
+def consultation_queryset():
+    """
+    Consultation queryset prefetching everything ConsultationsSerializer walks.
+    """
+    return Consultation.objects.select_related(
+        'dossier__patient__medecin__user',
+    ).prefetch_related(
+        'ordonnance_set',
+        'ordonnance_set__ordonnancemedicament_set',
+        'ordonnance_set__ordonnancemedicament_set__med',
+        'examen_set',
+        'examen_set__radiologue__user',
+        'examen_set__resultatlabo_set',
+        'examen_set__resultatlabo_set__laboratin__user',
+        'examen_set__resultatlabo_set__healthmetrics_set',
+        'examen_set__resultatradio_set',
+        'activiteinfermier_set',
+        'activiteinfermier_set__infermier__user'
+    )
+
+
+def serialize_medical_file(dossier):
+    return DossierMedicalDetailSerializer(dossier).data
+
+
+def get_dossier_by_qr_token(token):
+    """
+    Resolves a scanned QR token to its dossier (with patient and doctor) in one
+    indexed query. Raises DossierMedical.DoesNotExist for unknown tokens.
+    """
+    return DossierMedical.objects.select_related(
+        'patient',
+        'patient__medecin__user'
+    ).get(qrToken=token)
+
+
+def render_dossier_qr_code(dossier_id):
+    """
+    Renders the QR image of a dossier from its token and stores it. Returns the
+    base64 PNG, or None if the dossier no longer exists.
+
+    Uses queryset updates so the medical file signals are not triggered.
+    """
+    token = DossierMedical.objects.filter(pk=dossier_id).values_list('qrToken', flat=True).first()
+    if token is None:
+        return None
+    try:
+        qr_code = render_qr_code(token)
+    except Exception:
+        DossierMedical.objects.filter(pk=dossier_id).update(qrStatus='echec')
+        raise
+    DossierMedical.objects.filter(pk=dossier_id).update(qrCode=qr_code, qrStatus='pret')
+    return qr_code
+
+
+def schedule_qr_code(dossier):
+    """
+    Renders the dossier's QR image on the worker pool after the current transaction commits.
+    """
+    run_in_background(render_dossier_qr_code, dossier.pk)
+
+
+def ensure_qr_code(dossier):
+    """
+    Makes sure `dossier.qrCode` holds the rendered image when it can. A dossier
+    the background worker has not reached yet is rendered inline; one whose
+    rendering failed is retried on the worker pool and reported with the
+    'echec' status meanwhile.
+    """
+    if dossier.qrStatus == 'en_attente':
+        try:
+            qr_code = render_dossier_qr_code(dossier.pk)
+        except Exception:
+            # render_dossier_qr_code has stored the failure
+            logger.exception("QR code rendering failed for dossier %s", dossier.pk)
+            dossier.qrStatus = 'echec'
+        else:
+            if qr_code is not None:
+                dossier.qrCode = qr_code
+                dossier.qrStatus = 'pret'
+    elif dossier.qrStatus == 'echec':
+        schedule_qr_code(dossier)
+    return dossier
+
+
+def get_medical_file_data(patient_id):
+    """
+    Returns the serialized medical file of a patient.
+
+    Served from the patient's DossierSnapshot when it is up to date (a single
+    primary-key fetch). While a snapshot has pending updates the file is
+    serialized live.
+
+    A missing snapshot is built from that live result through a placeholder
+    row (empty data, one pending update) inserted before serializing: writes
+    committing meanwhile find the row and mark it, and the result is only
+    stored if none did.
+
+    Raises:
+    - DossierMedical.DoesNotExist if the patient has no dossier.
+    """
+    data = DossierSnapshot.objects.filter(
+        pk=patient_id,
+        pendingUpdates=0
+    ).values_list('data', flat=True).first()
+    if data is not None:
+        return data
+
+    dossier = medical_file_queryset().get(patient__user__id=patient_id)
+    placeholder, created = DossierSnapshot.objects.get_or_create(
+        patient_id=dossier.patient_id,
+        defaults={'dossier': dossier, 'data': {}, 'pendingUpdates': 1}
+    )
+    try:
+        data = serialize_medical_file(dossier)
+    except Exception:
+        if created:
+            DossierSnapshot.objects.filter(pk=placeholder.pk, updatedAt=placeholder.updatedAt).delete()
+        raise
+    if created:
+        # Refreshed, marked or dropped meanwhile: `data` may predate that write
+        DossierSnapshot.objects.filter(
+            pk=placeholder.pk,
+            pendingUpdates=1,
+            updatedAt=placeholder.updatedAt
+        ).update(data=data, pendingUpdates=0, updatedAt=timezone.now())
+    return data
+
+
+def rebuild_snapshot(dossier):
+    """
+    Rebuilds the whole snapshot of a dossier fetched with medical_file_queryset().
+    """
+    snapshot, _ = DossierSnapshot.objects.update_or_create(
+        patient_id=dossier.patient_id,
+        defaults={
+            'dossier': dossier,
+            'data': serialize_medical_file(dossier),
+            'pendingUpdates': 0,
+        }
+    )
+    return snapshot
+
+
+def _splice_consultation(data, consultation_id, consultation_data):
+    consultations = data.setdefault('consultations', [])
+    for index, existing in enumerate(consultations):
+        if existing['consultationID'] == consultation_id:
+            if consultation_data is None:
+                del consultations[index]
+            else:
+                consultations[index] = consultation_data
+            return
+    if consultation_data is not None:
+        consultations.append(consultation_data)
+
+
+@transaction.atomic
+def refresh_snapshot(dossier_id, consultation_ids=FULL_REBUILD):
+    """
+    Applies one pending update to a dossier snapshot.
+
+    Only the given consultation subtrees are re-serialized and spliced into the
+    stored payload; consultation_ids=FULL_REBUILD re-serializes the whole file.
+    Snapshots that were never built are left for the next read to create. A
+    reader's placeholder (see get_medical_file_data) is rebuilt whole, and its
+    own pending update is applied along with this one.
+    """
+    snapshot = DossierSnapshot.objects.select_for_update().filter(dossier_id=dossier_id).first()
+    if snapshot is None:
+        return
+
+    applied = 1
+    if not snapshot.data:
+        consultation_ids = FULL_REBUILD
+        applied = 2
+
+    if consultation_ids is FULL_REBUILD:
+        dossier = medical_file_queryset().filter(pk=dossier_id).first()
+        if dossier is None:
+            return
+        snapshot.data = serialize_medical_file(dossier)
+    else:
+        consultations = {
+            str(consultation.consultationID): consultation
+            for consultation in consultation_queryset().filter(
+                dossier_id=dossier_id,
+                consultationID__in=consultation_ids
+            )
+        }
+        for consultation_id in map(str, consultation_ids):
+            consultation = consultations.get(consultation_id)
+            _splice_consultation(
+                snapshot.data,
+                consultation_id,
+                ConsultationsSerializer(consultation).data if consultation else None
+            )
+
+    # pendingUpdates is UNSIGNED on MySQL: 0 - 1 fails before any GREATEST()
+    snapshot.pendingUpdates = Case(
+        When(pendingUpdates__gt=applied, then=F('pendingUpdates') - applied),
+        default=Value(0),
+    )
+    snapshot.save(update_fields=['data', 'pendingUpdates', 'updatedAt'])
+
+
+class _SnapshotRefreshBatch:
+    """
+    on_commit callback collecting the snapshot updates of one transaction, so a
+    dossier touched by many writes is marked stale and refreshed only once.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.dossiers = {}
+        self.done = False
+
+    def add(self, dossier_id, consultation_id=FULL_REBUILD):
+        if dossier_id not in self.dossiers:
+            DossierSnapshot.objects.using(self.using).filter(dossier_id=dossier_id).update(
+                pendingUpdates=F('pendingUpdates') + 1
+            )
+            self.dossiers[dossier_id] = set()
+
+        consultation_ids = self.dossiers[dossier_id]
+        if consultation_ids is FULL_REBUILD:
+            return
+        if consultation_id is FULL_REBUILD:
+            self.dossiers[dossier_id] = FULL_REBUILD
+        else:
+            consultation_ids.add(consultation_id)
+
+    def add_many(self, rows):
+        """
+        Same as add for (consultation_id, dossier_id) pairs, marking all the
+        newly touched dossiers stale in one UPDATE.
+        """
+        new_dossiers = {dossier_id for _consultation_id, dossier_id in rows if dossier_id not in self.dossiers}
+        if new_dossiers:
+            DossierSnapshot.objects.using(self.using).filter(dossier_id__in=new_dossiers).update(
+                pendingUpdates=F('pendingUpdates') + 1
+            )
+            for dossier_id in new_dossiers:
+                self.dossiers[dossier_id] = set()
+        for consultation_id, dossier_id in rows:
+            self.add(dossier_id, consultation_id)
+
+    def __call__(self):
+        self.done = True
+        for dossier_id, consultation_ids in self.dossiers.items():
+            refresh_snapshot(dossier_id, consultation_ids)
+
+
+# Weak reference to the batch of each connection's current transaction. Only
+# the on_commit queue holds the batch, so a rollback (of the transaction or of
+# the savepoint it was registered in) drops it along with the queue.
+_pending_batches = Local()
+
+
+def _current_batch(using=None):
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return _SnapshotRefreshBatch(using)
+
+    pending = getattr(_pending_batches, connection.alias, None)
+    batch = pending() if pending is not None else None
+    if batch is None or batch.done:
+        batch = _SnapshotRefreshBatch(using)
+        transaction.on_commit(batch, using=using)
+        setattr(_pending_batches, connection.alias, weakref.ref(batch))
+    return batch
+
+
+def schedule_snapshot_refresh(dossier_id, consultation_id=FULL_REBUILD, using=None):
+    """
+    Marks a dossier snapshot stale and refreshes it once the current
+    transaction commits (immediately when running in autocommit mode).
+    """
+    batch = _current_batch(using)
+    batch.add(dossier_id, consultation_id)
+    if not transaction.get_connection(using).in_atomic_block:
+        batch()
+
+
+def schedule_snapshot_drop(dossiers, using=None):
+    """
+    Deletes the snapshots of `dossiers` (a DossierMedical queryset) once the
+    current transaction commits; the next read of each file rebuilds it. For
+    changes reaching too many dossiers to refresh them one by one, like a
+    doctor or a hospital being renamed.
+    """
+    def drop():
+        DossierSnapshot.objects.using(using).filter(dossier__in=dossiers.values('pk')).delete()
+    transaction.on_commit(drop, using=using)
+
+
+def schedule_consultations_refresh(consultation_ids, using=None):
+    """
+    Same as schedule_snapshot_refresh for a set of consultations, resolving
+    their dossiers in one query. Used by bulk writes that bypass model signals.
+    """
+    rows = list(Consultation.objects.using(using).filter(
+        consultationID__in=consultation_ids
+    ).values_list('consultationID', 'dossier_id'))
+    batch = _current_batch(using)
+    batch.add_many(rows)
+    if not transaction.get_connection(using).in_atomic_block:
+        batch()
@@ -4,9 +4,13 @@ from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from healthhub_back.models import Patient, DossierMedical
-from .patient_serializers import DossierMedicalDetailSerializer
+from .patient_serializers import DossierMedicalDetailSerializer, HealthMetricsSeriesQuerySerializer
+from .patient_service import ensure_qr_code, get_medical_file_data, medical_file_queryset
+from .patient_export import iter_medical_file_ndjson
+from .patient_metrics import get_health_metric_series
 from rest_framework.views import APIView
 
 
@@ -15,23 +19,7 @@ class PatientMedicalFileView(generics.RetrieveAPIView):
     serializer_class = DossierMedicalDetailSerializer
 
     def get_queryset(self):
-        return DossierMedical.objects.select_related(
-            'patient',
-            'patient__medecin',
-            'patient__medecin__user',
-            'patient__centreHospitalier'
-        ).prefetch_related(
-            'consultation_set',
-            'consultation_set__ordonnance_set',
-            'consultation_set__ordonnance_set__ordonnancemedicament_set',
-            'consultation_set__ordonnance_set__ordonnancemedicament_set__med',
-            'consultation_set__examen_set',
-            'consultation_set__examen_set__resultatlabo_set',
-            'consultation_set__examen_set__resultatlabo_set__healthmetrics_set',
-            'consultation_set__examen_set__resultatradio_set',
-            'consultation_set__activiteinfermier_set',
-            'consultation_set__activiteinfermier_set__infermier'
-        )
+        return medical_file_queryset()
 
     def get(self, request, patient_id):
         if not self.has_permission_to_access(request.user, patient_id):
@@ -40,12 +28,11 @@ class PatientMedicalFileView(generics.RetrieveAPIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        dossier = get_object_or_404(
-            self.get_queryset(), 
-            patient__user__id=patient_id
-        )
-        serializer = self.serializer_class(dossier)
-        return Response(serializer.data)
+        try:
+            data = get_medical_file_data(patient_id)
+        except DossierMedical.DoesNotExist:
+            raise Http404("No DossierMedical matches the given query.")
+        return Response(data)
 
     def has_permission_to_access(self, user, patient_id):
         # If user is the patient
@@ -60,6 +47,47 @@ class PatientMedicalFileView(generics.RetrieveAPIView):
 
         return False
 
+class PatientMedicalFileExportView(PatientMedicalFileView):
+    """
+    Streams the complete medical file as newline-delimited JSON, one record per
+    line, without building the whole payload in memory.
+    """
+
+    def get(self, request, patient_id):
+        if not self.has_permission_to_access(request.user, patient_id):
+            return Response(
+                {"error": "You don't have permission to access this medical file"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        dossier = get_object_or_404(
+            DossierMedical.objects.select_related('patient__medecin', 'patient__centreHospitalier'),
+            patient__user__id=patient_id
+        )
+        response = StreamingHttpResponse(
+            iter_medical_file_ndjson(dossier),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="dossier-{dossier.dossierID}.ndjson"'
+        return response
+
+class PatientHealthMetricsView(PatientMedicalFileView):
+    """
+    Time series of one health metric of a patient, aggregated per day, week or
+    month and optionally downsampled to at most `points` points.
+    """
+
+    def get(self, request, patient_id, metric_type):
+        if not self.has_permission_to_access(request.user, patient_id):
+            return Response(
+                {"error": "You don't have permission to access this medical file"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        query = HealthMetricsSeriesQuerySerializer(data={**request.query_params.dict(), 'metric_type': metric_type})
+        query.is_valid(raise_exception=True)
+        return Response(get_health_metric_series(patient_id, **query.validated_data))
+
 class RetrieveQRCodeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -74,8 +102,9 @@ class RetrieveQRCodeView(APIView):
                 status=403
             )
 
-        # Return the QR code
-        return Response({"qrCode": dossier.qrCode})
+        # Return the QR code, rendering it now if the worker has not reached it yet
+        ensure_qr_code(dossier)
+        return Response({"qrCode": dossier.qrCode, "qrToken": dossier.qrToken, "qrStatus": dossier.qrStatus})
 
     def has_permission_to_access(self, user, patient_id):
         # If user is the patient
@@ -104,8 +133,9 @@ class RetrieveQRCodeViewNSS(APIView):
                 status=403
             )
 
-        # Return the QR code
-        return Response({"qrCode": dossier.qrCode})
+        # Return the QR code, rendering it now if the worker has not reached it yet
+        ensure_qr_code(dossier)
+        return Response({"qrCode": dossier.qrCode, "qrToken": dossier.qrToken, "qrStatus": dossier.qrStatus})
 
     def has_permission_to_access(self, user, patient_id):
         # If user is the patient
@@ -1,12 +1,18 @@
 # urls.py
 
 from django.urls import path
-from .patient_view import PatientMedicalFileView, RetrieveQRCodeView, RetrieveQRCodeViewNSS
+from .patient_view import PatientMedicalFileView, PatientMedicalFileExportView, PatientHealthMetricsView, RetrieveQRCodeView, RetrieveQRCodeViewNSS
 
 urlpatterns = [
     path('medical-file/<uuid:patient_id>/', 
          PatientMedicalFileView.as_view(), 
          name='patient-medical-file'),
+    path('medical-file/<uuid:patient_id>/export/', 
+         PatientMedicalFileExportView.as_view(), 
+         name='patient-medical-file-export'),
+    path('medical-file/<uuid:patient_id>/metrics/<str:metric_type>/', 
+         PatientHealthMetricsView.as_view(), 
+         name='patient-health-metrics'),
     # RetrieveQRCodeView
     path('qr-code/<uuid:patient_id>/', 
          RetrieveQRCodeView.as_view(), 
@@ -42,8 +42,8 @@ class ResultatRadioSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = ResultatRadio
-        fields = ('resRadioID','radioImgURL', 'type', 'rapport')
-        read_only_fields = ['resRadioID']
+        fields = ('resRadioID','radioImgURL', 'type', 'rapport', 'uploadStatus')
+        read_only_fields = ['resRadioID', 'radioImgURL', 'uploadStatus']
 
 
 class RadiologueExamenDetailSerializer(serializers.Serializer):
@@ -1,10 +1,27 @@
 from decouple import config
+import base64
+import binascii
 import logging
+import mimetypes
+import uuid
+from datetime import timedelta
+from pathlib import Path
 
 
 import cloudinary
 import cloudinary.uploader
 from cloudinary.utils import cloudinary_url
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import Q
+from django.utils import timezone
+
+from healthhub_back.common.tracing import span, start_trace
+from healthhub_back.common.workers import run_in_background
+from healthhub_back.models import ResultatRadio
+from .radiologue_storage import get_storage_backend, is_remote
+
+logger = logging.getLogger(__name__)
 
 
 # Configuration       
@@ -25,6 +42,111 @@ def upload_image(image):
         resource_type="image")
     return upload['secure_url']
 
+
+def stage_image(image):
+    """
+    Writes an uploaded radiology image to the staging area so the request can
+    return before it reaches the storage backend.
+
+    Parameters:
+    - image: uploaded file, base64 data URI, or http(s) URL of a remote image.
+
+    Returns:
+    - str: path of the staged file, or the URL itself for remote images.
+
+    Raises:
+    - ValueError: for anything else, local paths included.
+    """
+    if isinstance(image, UploadedFile):
+        extension = Path(image.name or '').suffix
+        chunks = image.chunks()
+    elif isinstance(image, str) and image.startswith('data:'):
+        header, _, payload = image.partition(',')
+        extension = mimetypes.guess_extension(header[5:].split(';')[0]) or ''
+        try:
+            chunks = [base64.b64decode(payload, validate=True)]
+        except binascii.Error:
+            raise ValueError("Invalid base64 image.")
+    elif isinstance(image, str) and is_remote(image):
+        return image
+    elif image:
+        raise ValueError("Expected an image file, a base64 data URI or an http(s) URL.")
+    else:
+        raise ValueError("No radiology image provided.")
+
+    staging_dir = Path(settings.RADIOLOGY_STAGING_DIR)
+    staging_dir.mkdir(parents=True, exist_ok=True)
+    path = staging_dir / f"{uuid.uuid4().hex}{extension}"
+    with open(path, 'wb') as staged:
+        for chunk in chunks:
+            staged.write(chunk)
+    return str(path)
+
+
+def upload_staged_image(resultat_id):
+    """
+    Pushes the staged image of a radiology result to the storage backend and
+    stores its URL. On failure the result is marked 'echec' and the staged file
+    is kept for a later retry.
+    """
+    with start_trace('radiology.upload', resultat=str(resultat_id)):
+        _upload_staged_image(resultat_id)
+
+
+def retryable_uploads(statuses=('en_attente', 'echec')):
+    """
+    Condition matching the results whose upload is in one of `statuses`, or
+    was claimed more than RADIOLOGY_UPLOAD_STALE_SECONDS ago by a worker that
+    never finished it (the process died or was restarted mid-upload).
+    """
+    stale = timezone.now() - timedelta(seconds=settings.RADIOLOGY_UPLOAD_STALE_SECONDS)
+    abandoned = Q(uploadStartedAt__lt=stale) | Q(uploadStartedAt__isnull=True)
+    return Q(uploadStatus__in=statuses) | (Q(uploadStatus='en_cours') & abandoned)
+
+
+def _upload_staged_image(resultat_id):
+    claimed = ResultatRadio.objects.filter(
+        retryable_uploads(),
+        pk=resultat_id,
+    ).update(uploadStatus='en_cours', uploadStartedAt=timezone.now())
+    if not claimed:
+        return
+
+    resultat = ResultatRadio.objects.get(pk=resultat_id)
+    backend = get_storage_backend()
+    try:
+        with span('upload.storage', backend=type(backend).__name__):
+            url = backend.upload(resultat.stagedImage)
+    except Exception:
+        logger.exception("Upload of radiology result %s failed", resultat_id)
+        resultat.uploadStatus = 'echec'
+        resultat.save(update_fields=['uploadStatus'])
+        return
+
+    staged = resultat.stagedImage
+    resultat.radioImgURL = url
+    resultat.uploadStatus = 'televerse'
+    resultat.stagedImage = ''
+    resultat.save(update_fields=['radioImgURL', 'uploadStatus', 'stagedImage'])
+    discard_staged_image(staged)
+
+
+def discard_staged_image(staged):
+    """
+    Deletes a file written by stage_image. Remote URLs and paths outside the
+    staging area are left alone.
+    """
+    path = Path(staged)
+    if path.is_file() and path.parent == Path(settings.RADIOLOGY_STAGING_DIR):
+        path.unlink()
+
+
+def schedule_image_upload(resultat):
+    """
+    Queues the upload of a result's staged image once the current transaction commits.
+    """
+    run_in_background(upload_staged_image, resultat.pk, pool='radiology_uploads')
+
     
 async def delete_image_from_cloudinary(self, image_url: str) -> None:
     """
@@ -0,0 +1,72 @@
+import shutil
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def is_remote(source):
+    return source.startswith(('http://', 'https://'))
+
+
+def staged_path(source):
+    """
+    The file `source` names when it was staged by stage_image (directly in
+    RADIOLOGY_STAGING_DIR), None otherwise: results only ever hold staged
+    paths and remote URLs, never paths of the client's choosing.
+    """
+    if is_remote(source):
+        return None
+    path = Path(source).resolve()
+    if path.parent != Path(settings.RADIOLOGY_STAGING_DIR).resolve() or not path.is_file():
+        return None
+    return path
+
+
+def resolve_source(source):
+    """
+    The staged file or remote URL to upload for `source`.
+    """
+    if is_remote(source):
+        return source
+    path = staged_path(source)
+    if path is None:
+        raise ValueError(f"{source!r} is neither a staged image nor a remote URL.")
+    return str(path)
+
+
+class CloudinaryStorage:
+    """
+    Pushes radiology images to Cloudinary (TP-IGL/Resultat-Radiologie).
+    """
+
+    def upload(self, source):
+        from .radiologue_service import upload_image
+        return upload_image(resolve_source(source))
+
+
+class LocalStorage:
+    """
+    Stand-in backend copying images to RADIOLOGY_LOCAL_STORAGE_DIR, for
+    development and offline tests. Remote URLs are kept as they are.
+    """
+
+    def __init__(self, root=None, base_url=None):
+        self.root = Path(root or settings.RADIOLOGY_LOCAL_STORAGE_DIR)
+        self.base_url = base_url or settings.RADIOLOGY_LOCAL_STORAGE_URL
+
+    def upload(self, source):
+        source = resolve_source(source)
+        if is_remote(source):
+            return source
+        path = Path(source)
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(path, self.root / path.name)
+        return f"{self.base_url}{path.name}"
+
+
+def get_storage_backend():
+    """
+    Instantiates the backend configured in RADIOLOGY_STORAGE_BACKEND.
+    """
+    return import_string(settings.RADIOLOGY_STORAGE_BACKEND)()
@@ -1,5 +1,6 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Prefetch
+from django.db.models import Prefetch
 from django_filters import rest_framework as filters
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
@@ -8,7 +9,10 @@ from rest_framework.filters import SearchFilter
 
 from healthhub_back.models import ResultatRadio, Examen
 from .radiologue_serializers import RadiologueExamenDetailSerializer, ResultatRadioSerializer
-from .radiologue_service import upload_image
+from .radiologue_service import discard_staged_image, schedule_image_upload, stage_image
+from healthhub_back.common.pagination import KeysetPagination
+from healthhub_back.common.tracing import span
+from healthhub_back.common.search.patient_index import filter_by_patient_search
 
 
 
@@ -25,6 +29,20 @@ class IsRadiologue(permissions.BasePermission):
             request.user.is_authenticated and 
             (request.user.role == 'radiologue' or request.user.role == 'Radiologue') 
         )
+
+
+def radiologue_exam_queryset(radiologue):
+    """
+    Exams of a radiologist with everything RadiologueExamenDetailSerializer reads.
+    """
+    return Examen.objects.filter(
+        radiologue=radiologue
+    ).select_related(
+        'consultation', 'patient'
+    ).prefetch_related(
+        Prefetch('resultatradio_set', queryset=ResultatRadio.objects.all())
+    )
+
     
 class ExamenFilter(filters.FilterSet):
     status = filters.ChoiceFilter(choices=[
@@ -66,6 +84,7 @@ class RadiologueExamenListView(generics.ListAPIView):
     serializer_class = RadiologueExamenDetailSerializer
 
     filter_backends = [filters.DjangoFilterBackend, SearchFilter]
+    pagination_class = KeysetPagination
     filterset_class = ExamenFilter
 
     def get_queryset(self):
@@ -74,13 +93,7 @@ class RadiologueExamenListView(generics.ListAPIView):
         """
         # Get nurse's activities that are associated with this nurse
         radiologue = self.request.user.radiologue
-        queryset = Examen.objects.filter(
-            radiologue=radiologue
-        ).select_related(
-            'consultation__dossier__patient'
-        ).prefetch_related(
-            Prefetch('resultatradio_set', queryset=ResultatRadio.objects.all())
-        ).distinct()
+        queryset = radiologue_exam_queryset(radiologue)
 
 
         if self.request.GET.get('status'):
@@ -89,22 +102,18 @@ class RadiologueExamenListView(generics.ListAPIView):
 
         if self.request.GET.get('type_radio'):
             type_radio = self.request.GET.get('type_radio')
-            queryset = queryset.filter(resultatradio__type=type_radio)
+            queryset = queryset.filter(resultatradio__type=type_radio).distinct()
 
         if self.request.GET.get('search'):
             search_query = self.request.GET.get('search')
-            queryset = queryset.filter(
-                Q(consultation__dossier__patient__nom__icontains=search_query) |
-                Q(consultation__dossier__patient__prenom__icontains=search_query) |
-                Q(consultation__dossier__patient__NSS__icontains=search_query)
-            ).distinct()
+            queryset = filter_by_patient_search(queryset, search_query, 'patient')
 
         return queryset
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        page = self.paginate_queryset(self.get_queryset())
 
-        if not queryset.exists():
+        if not page and not request.GET.get('cursor'):
             return Response(
                 {'message': 'No examens found using these search filters.'},
                 status=status.HTTP_404_NOT_FOUND
@@ -112,9 +121,9 @@ class RadiologueExamenListView(generics.ListAPIView):
         
         data = []
         
-        for examen in queryset:
+        for examen in page:
             consultation = examen.consultation
-            patient = consultation.dossier.patient
+            patient = examen.patient
 
             # Serialize multiple ResultatRadio objects if they exist
             serialized_data = RadiologueExamenDetailSerializer({
@@ -126,7 +135,7 @@ class RadiologueExamenListView(generics.ListAPIView):
 
             data.append(serialized_data)
 
-        return Response(data, status=status.HTTP_200_OK)
+        return self.get_paginated_response(data)
     
 
 class StartExamenView(APIView):
@@ -168,20 +177,55 @@ class CreateResultatRadioView(generics.CreateAPIView):
             )
         
 
-        data = request.data
-        print(data["radioImgURL"])
-        data['radioImgURL'] = upload_image(request.data['radioImgURL'])
-
-        serializer = self.get_serializer(data=data)
+        serializer = self.get_serializer(data={
+            'type': request.data.get('type'),
+            'rapport': request.data.get('rapport'),
+        })
         serializer.is_valid(raise_exception=True)
-        serializer.save(examen_id=examen.examenID)
+
+        # The image is only staged here; the upload runs in the background
+        try:
+            with span('upload.stage'):
+                staged = stage_image(request.data.get('radioImgURL'))
+        except ValueError as e:
+            return Response({'radioImgURL': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                resultat = serializer.save(
+                    examen_id=examen.examenID,
+                    uploadStatus='en_attente',
+                    stagedImage=staged
+                )
+                schedule_image_upload(resultat)
+        except Exception:
+            # No result points to the staged file any more
+            discard_staged_image(staged)
+            raise
         
         return Response(
-            {'message': 'Radiology result created successfully.'},
+            {
+                'message': 'Radiology result created successfully.',
+                'resRadioID': str(resultat.resRadioID),
+                'uploadStatus': resultat.uploadStatus,
+            },
             status=status.HTTP_201_CREATED
         )
 
 
+class ResultatRadioDetailView(generics.RetrieveAPIView):
+    """
+    Returns a radiology result, including the progress of its image upload.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsRadiologue]
+    serializer_class = ResultatRadioSerializer
+    lookup_field = 'resRadioID'
+    lookup_url_kwarg = 'resultat_id'
+
+    def get_queryset(self):
+        return ResultatRadio.objects.filter(examen__radiologue__user=self.request.user)
+
+
 
 
 class ValidateExamenView(APIView):
@@ -212,54 +256,47 @@ class HistoriqueExamenView (generics.ListAPIView):
     serializer_class = RadiologueExamenDetailSerializer
 
     filter_backends = [filters.DjangoFilterBackend, SearchFilter]
+    pagination_class = KeysetPagination
     filterset_class = HistoryExamenFilter
 
     def get_queryset(self):
         # Get nurse's activities
         radiologue = self.request.user.radiologue
-        queryset = Examen.objects.filter(
-            radiologue=radiologue,
-            etat='termine'
-        ).select_related(
-            'consultation__dossier__patient'
-        ).distinct()
+        queryset = radiologue_exam_queryset(radiologue).filter(etat='termine')
     
         if self.request.GET.get('type_radio'):
             type_radio = self.request.GET.get('type_radio')
-            queryset = queryset.filter(resultatradio__type=type_radio)
+            queryset = queryset.filter(resultatradio__type=type_radio).distinct()
 
         if self.request.GET.get('search'):
             search_query = self.request.GET.get('search')
-            queryset = queryset.filter(
-                Q(consultation__dossier__patient__nom__icontains=search_query) |
-                Q(consultation__dossier__patient__prenom__icontains=search_query) |
-                Q(consultation__dossier__patient__NSS__icontains=search_query)
-            ).distinct()
+            queryset = filter_by_patient_search(queryset, search_query, 'patient')
 
+        return queryset
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
+        page = self.paginate_queryset(self.get_queryset())
 
-        if not queryset.exists():
+        if not page and not request.GET.get('cursor'):
             return Response(
                 {'message': 'No examens found for this radiologist.'},
                 status=status.HTTP_404_NOT_FOUND
             )
         
         data = []
-        for examen in queryset:
+        for examen in page:
             consultation = examen.consultation
-            patient = consultation.dossier.patient
+            patient = examen.patient
 
             serialized_data = RadiologueExamenDetailSerializer({
                 'patient': patient,
                 'examen': examen,
-                'resultatRadio': examen.resultatRadio if hasattr(examen, 'resultatRadio') else None,
+                'resultatRadio': examen.resultatradio_set.all(),
                 'consultation': consultation,
             }).data
 
             data.append(serialized_data)
 
-        return Response(data, status=status.HTTP_200_OK)
+        return self.get_paginated_response(data)
     
     
\ No newline at end of file
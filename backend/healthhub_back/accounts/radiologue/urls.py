@@ -5,6 +5,7 @@ from .radiologue_view import (
     CreateResultatRadioView,
     ValidateExamenView,
     HistoriqueExamenView,
+    ResultatRadioDetailView,
 )
 
 urlpatterns = [
@@ -13,4 +14,5 @@ urlpatterns = [
     path('examens/<uuid:examen_id>/create-resultat-radio/', CreateResultatRadioView.as_view(), name='create_resultat_radio'),
     path('examens/<uuid:examen_id>/validate/', ValidateExamenView.as_view(), name='validate_examensy'), 
     path('examens/historique/', HistoriqueExamenView.as_view(), name='examens_history'),  
+    path('resultats-radio/<uuid:resultat_id>/', ResultatRadioDetailView.as_view(), name='resultat_radio_detail'),
 ]
\ No newline at end of file
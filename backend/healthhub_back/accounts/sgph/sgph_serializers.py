@@ -0,0 +1,38 @@
+# sgph/serializers.py
+
+from rest_framework import serializers
+
+from healthhub_back.models import Ordonnance
+from ..patient.patient_serializers import OrdonnancesMedicamentSerializer
+
+
+class SGPHOrdonnanceSerializer(serializers.ModelSerializer):
+    """
+    Ordonnance as seen by the pharmacy system, with its lines and change timestamp.
+    Expects `ordonnancemedicament_set__med` to be prefetched.
+    """
+    medicaments = OrdonnancesMedicamentSerializer(
+        source='ordonnancemedicament_set',
+        many=True,
+        read_only=True
+    )
+
+    class Meta:
+        model = Ordonnance
+        fields = [
+            'ordonnanceID',
+            'consultation',
+            'valide',
+            'dateCreation',
+            'dateExpiration',
+            'updatedAt',
+            'medicaments'
+        ]
+
+
+class OrdonnanceBatchValidateSerializer(serializers.Serializer):
+    ordonnance_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=1000
+    )
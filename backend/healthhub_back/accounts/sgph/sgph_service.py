@@ -0,0 +1,49 @@
+# sgph/services.py
+
+from django.db import transaction
+from django.utils import timezone
+
+from healthhub_back.models import Ordonnance
+from ..patient.patient_service import schedule_consultations_refresh
+
+
+@transaction.atomic
+def validate_ordonnances(ordonnance_ids):
+    """
+    Validates a batch of ordonnances with a single conditional UPDATE.
+
+    Parameters:
+    - ordonnance_ids (list of UUID): ordonnances to validate.
+
+    Returns:
+    - dict mapping each requested ID to 'validated', 'already_valid' or 'not_found'.
+    """
+    ordonnance_ids = set(ordonnance_ids)
+    # Lock the rows so the outcomes match what the UPDATE below changes
+    current = dict(
+        Ordonnance.objects.select_for_update().filter(
+            ordonnanceID__in=ordonnance_ids
+        ).values_list('ordonnanceID', 'valide')
+    )
+    pending = [ordonnance_id for ordonnance_id, valide in current.items() if not valide]
+
+    if pending:
+        # Queryset updates skip the model signals: bump updatedAt for the SGPH
+        # feed and refresh the medical file snapshots explicitly
+        Ordonnance.objects.filter(ordonnanceID__in=pending, valide=False).update(
+            valide=True,
+            updatedAt=timezone.now()
+        )
+        schedule_consultations_refresh(
+            Ordonnance.objects.filter(ordonnanceID__in=pending).values('consultation_id')
+        )
+
+    outcomes = {}
+    for ordonnance_id in ordonnance_ids:
+        if ordonnance_id not in current:
+            outcomes[ordonnance_id] = 'not_found'
+        elif current[ordonnance_id]:
+            outcomes[ordonnance_id] = 'already_valid'
+        else:
+            outcomes[ordonnance_id] = 'validated'
+    return outcomes
@@ -1,13 +1,31 @@
 # sgbh/views.py
 
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework_api_key.permissions import HasAPIKey
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 
+from healthhub_back.common.pagination import ChangeFeedPagination
 from healthhub_back.models import Ordonnance
 from ..patient.patient_serializers import OrdonnancesSerializer
+from .sgph_serializers import OrdonnanceBatchValidateSerializer, SGPHOrdonnanceSerializer
+from .sgph_service import validate_ordonnances
+
+
+def ordonnance_queryset():
+    return Ordonnance.objects.prefetch_related('ordonnancemedicament_set__med')
+
+
+def pending_ordonnances():
+    return ordonnance_queryset().filter(valide=False)
+
 
 @api_view(["GET"])
 @permission_classes([HasAPIKey])
@@ -16,7 +34,7 @@ def get_ordonnances(request):
     Allow SGPH service to retrieve non-validated ordonnances
     """
     # get all ordonnance
-    ordonnances = Ordonnance.objects.filter(valide=False)
+    ordonnances = pending_ordonnances()
     serializer = OrdonnancesSerializer(ordonnances, many=True)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -26,10 +44,43 @@ def get_ordonnance(request, ordonnance_id):
     """
     Allow SGPH service to retrieve an ordonnance by ID
     """
-    ordonnance = get_object_or_404(Ordonnance, ordonnanceID=ordonnance_id)
+    ordonnance = get_object_or_404(ordonnance_queryset(), ordonnanceID=ordonnance_id)
     serializer = OrdonnancesSerializer(instance=ordonnance)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+@api_view(["GET"])
+@permission_classes([HasAPIKey])
+def get_ordonnances_feed(request):
+    """
+    Allow SGPH service to poll the ordonnances created or changed since its last cursor.
+
+    Query parameters:
+    - cursor: the `cursor` of the previous response (omit on the first poll).
+    - limit: page size (default PAGE_SIZE, at most 500).
+
+    Changes younger than SGPH_FEED_SETTLE_SECONDS are held back, so a
+    transaction committing late cannot slip in behind a cursor already served.
+    The response carries an ETag; an unchanged feed answers 304 Not Modified.
+    """
+    settled = timezone.now() - timedelta(seconds=settings.SGPH_FEED_SETTLE_SECONDS)
+    ordonnances = Ordonnance.objects.filter(updatedAt__lte=settled)
+
+    latest = ordonnances.aggregate(latest=Max('updatedAt'))['latest']
+    etag = '"%s"' % hashlib.md5(
+        f"{latest}|{request.query_params.get('cursor')}|{request.query_params.get('limit')}".encode()
+    ).hexdigest()
+    if etag in request.headers.get('If-None-Match', ''):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    paginator = ChangeFeedPagination()
+    page = paginator.paginate_queryset(
+        ordonnances.prefetch_related('ordonnancemedicament_set__med'),
+        request
+    )
+    response = paginator.get_paginated_response(SGPHOrdonnanceSerializer(page, many=True).data)
+    response['ETag'] = etag
+    return response
+
 @api_view(["POST"])
 @permission_classes([HasAPIKey])
 def validate_ordonnance(request, ordonnance_id):
@@ -41,4 +92,25 @@ def validate_ordonnance(request, ordonnance_id):
     ordonnance.save()
 
     serializer = OrdonnancesSerializer(instance=ordonnance)
-    return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+@api_view(["POST"])
+@permission_classes([HasAPIKey])
+def validate_ordonnances_batch(request):
+    """
+    Allow SGPH service to validate many ordonnances at once.
+
+    Body: {"ordonnance_ids": [...]}. Returns the outcome of every ID
+    ('validated', 'already_valid' or 'not_found') and the found ordonnances.
+    """
+    serializer = OrdonnanceBatchValidateSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    outcomes = validate_ordonnances(serializer.validated_data['ordonnance_ids'])
+    found = [ordonnance_id for ordonnance_id, outcome in outcomes.items() if outcome != 'not_found']
+    ordonnances = ordonnance_queryset().filter(ordonnanceID__in=found)
+
+    return Response({
+        'outcomes': {str(ordonnance_id): outcome for ordonnance_id, outcome in outcomes.items()},
+        'ordonnances': SGPHOrdonnanceSerializer(ordonnances, many=True).data,
+    }, status=status.HTTP_200_OK)
@@ -5,6 +5,8 @@ from . import sgph_view as views
 
 urlpatterns = [
     path('ordonnances/', views.get_ordonnances, name='get_ordonnances'),
+    path('ordonnances/feed/', views.get_ordonnances_feed, name='get_ordonnances_feed'),
+    path('ordonnances/validate/', views.validate_ordonnances_batch, name='validate_ordonnances_batch'),
     path('ordonnances/<uuid:ordonnance_id>/', views.get_ordonnance, name='get_ordonnance'),
     path('ordonnances/<uuid:ordonnance_id>/validate/', views.validate_ordonnance, name='validate_ordonnance'),
 ]
\ No newline at end of file
@@ -21,6 +21,7 @@ from .models import (
     HealthMetrics,
     Examen,
     ResultatRadio,
+    DossierSnapshot,
 )
 
 from rest_framework_api_key.models import APIKey
@@ -58,3 +59,4 @@ admin.site.register(ResultatLabo)
 admin.site.register(HealthMetrics)
 admin.site.register(Examen)
 admin.site.register(ResultatRadio)
+admin.site.register(DossierSnapshot)
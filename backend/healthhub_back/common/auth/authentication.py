@@ -0,0 +1,123 @@
+# common/auth/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class TokenCache:
+    """
+    Thread-safe LRU cache of token key -> (user, token) with a TTL.
+
+    The cache lives in each worker process, so invalidations only reach the
+    process they run in; the TTL bounds how long other processes may keep
+    serving a revoked token. A TTL of a few seconds keeps that window short
+    and still absorbs the bursts of requests a client sends with one token.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        user, _token = value
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._keys_by_user.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[1][0].pk
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+token_cache = TokenCache(max_size=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication answering repeated tokens from `token_cache` instead of
+    querying Token and User on every request.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            try:
+                # From the primary: a replica may not have a token created at login yet
+                token = Token.objects.using(DEFAULT_DB_ALIAS).select_related('user', 'user__centreHospitalier').get(key=key)
+            except Token.DoesNotExist:
+                raise AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise AuthenticationFailed(_('User inactive or deleted.'))
+            cached = (token.user, token)
+            token_cache.set(key, cached)
+
+        # Views may modify request.user; hand out copies of the cached instances
+        user, token = cached
+        return copy.copy(user), copy.copy(token)
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class InMemoryBroker:
+    """
+    Per-process event broker: each channel keeps its last EVENTS_BACKLOG
+    events, numbered from 1, and wakes the coroutines waiting on it.
+
+    Waiters only see the events published by their own process, so a
+    deployment running several worker processes must point EVENTS_BROKER at
+    a shared backend implementing the same methods (publish, last_id, since
+    and the coroutine wait).
+    """
+
+    def __init__(self, backlog=None):
+        self.backlog = backlog or settings.EVENTS_BACKLOG
+        self._lock = threading.Lock()
+        # channel -> deque of events, channel -> ID of the last event
+        self._events = {}
+        self._last_ids = {}
+        # channel -> set of (event loop, future) to wake on publish
+        self._waiters = {}
+
+    def publish(self, channel, type_, data):
+        """
+        Appends an event to `channel` and wakes its waiters. Safe to call from
+        any thread. Returns the event ID.
+        """
+        with self._lock:
+            event_id = self._last_ids.get(channel, 0) + 1
+            self._last_ids[channel] = event_id
+            events = self._events.setdefault(channel, deque(maxlen=self.backlog))
+            events.append({'id': event_id, 'type': type_, 'data': data})
+            waiters = self._waiters.pop(channel, ())
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's loop is closed; nobody is listening anymore
+                pass
+        return event_id
+
+    def last_id(self, channel):
+        with self._lock:
+            return self._last_ids.get(channel, 0)
+
+    def since(self, channel, after):
+        """
+        Returns (events, reset): the events of `channel` published after the
+        event ID `after`, and whether some of them already left the backlog,
+        in which case the client must reload its state.
+        """
+        with self._lock:
+            return self._since(channel, after)
+
+    async def wait(self, channel, after, timeout):
+        """
+        Like `since`, but waits up to `timeout` seconds for an event when
+        there is none yet.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            events, reset = self._since(channel, after)
+            if events or reset:
+                return events, reset
+            waiter = (loop, loop.create_future())
+            self._waiters.setdefault(channel, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(channel)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[channel]
+        return self.since(channel, after)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+            self._last_ids.clear()
+
+    def _since(self, channel, after):
+        events = self._events.get(channel)
+        if not events or after >= events[-1]['id']:
+            # An ID ahead of ours comes from before a restart
+            return [], after > self._last_ids.get(channel, 0)
+        first_id = events[0]['id']
+        return list(events)[max(after - first_id + 1, 0):], after < first_id - 1
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Process-wide instance of the broker configured in EVENTS_BROKER.
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.EVENTS_BROKER)()
+        return _broker
+
+
+def publish_on_commit(channel, type_, data):
+    """
+    Publishes an event once the current transaction commits, so listeners
+    never hear of rows they cannot read yet (immediately outside a
+    transaction).
+    """
+    transaction.on_commit(lambda: get_broker().publish(channel, type_, data))
@@ -0,0 +1,54 @@
+"""
+MySQL backend (mysqlclient) drawing its connections from a process-wide pool.
+
+Django opens a connection per request and closes it when the request ends
+(CONN_MAX_AGE = 0); here opening checks a connection out of the pool and
+closing returns it, so requests skip the TCP and authentication handshake.
+The pool is configured with OPTIONS["pool"], see ConnectionPool.
+"""
+import functools
+
+from django.db.backends.mysql.base import Database
+from django.db.backends.mysql.base import DatabaseWrapper as MySQLDatabaseWrapper
+from django.utils.asyncio import async_unsafe
+
+from .pool import PoolTimeout, get_pool
+
+
+class DatabaseWrapper(MySQLDatabaseWrapper):
+    pool = None
+    reused = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        self.pool_options = params.pop('pool', {})
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        # The pool opens its connections the way the MySQL backend does
+        target = (conn_params.get('host'), conn_params.get('port'), conn_params.get('unix_socket'), conn_params.get('database'), conn_params.get('user'))
+        self.pool = get_pool(self.alias, functools.partial(super().get_new_connection, conn_params), self.pool_options, target)
+        try:
+            connection, opened = self.pool.checkout()
+        except PoolTimeout as e:
+            raise Database.OperationalError(str(e))
+        self.reused = not opened
+        return connection
+
+    def init_connection_state(self):
+        # The session settings (isolation level...) outlive the checkout
+        if not self.reused:
+            super().init_connection_state()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps using the connection until the block exits
+                self.pool.discard(self.connection)
+                return
+            if not self.autocommit:
+                self.connection.rollback()
+            self.pool.checkin(self.connection)
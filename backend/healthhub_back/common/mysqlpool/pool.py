@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections opened by `connect()`.
+
+    - At most `max_size` connections are open; checkouts beyond wait up to
+      `timeout` seconds for one to come back, then raise PoolTimeout.
+    - Idle connections above `min_size` are closed after `max_idle` seconds,
+      and every connection once it is `max_lifetime` seconds old.
+    - With `check`, idle connections are pinged on checkout and replaced when
+      the server dropped them.
+
+    Connections are handed out most recently returned first, so a quiet pool
+    keeps reusing the same warm connections and lets the others expire.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, max_lifetime=1800, max_idle=600, timeout=10, check=True):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.check = check
+        # (connection, opened at, returned at), most recently returned last
+        self.idle = deque()
+        self.opened_at = {}
+        self.size = 0
+        self.condition = threading.Condition()
+        self.counters = dict.fromkeys(
+            ('checkouts', 'opened', 'reused', 'closed', 'failed_checks', 'waits', 'timeouts'), 0
+        )
+        self.wait_time = 0.0
+        self.target = None
+
+    def checkout(self):
+        """
+        A connection for the caller's exclusive use, and whether it was just
+        opened (False when reused from the pool).
+        """
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, opened_at = self._take(deadline)
+            if connection is None:
+                return self._open(), True
+            if time.monotonic() - opened_at >= self.max_lifetime:
+                self._close(connection)
+                continue
+            if self.check and not self._alive(connection):
+                self._count('failed_checks')
+                self._close(connection)
+                continue
+            self._count('reused')
+            return connection, False
+
+    def checkin(self, connection):
+        """
+        Returns a checked out connection to the pool.
+        """
+        now = time.monotonic()
+        opened_at = self.opened_at.get(id(connection), now)
+        if now - opened_at >= self.max_lifetime:
+            self._close(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, opened_at, now))
+            expired = self._expired_idle(now)
+            self.condition.notify()
+        for stale in expired:
+            self._close(stale)
+
+    def discard(self, connection):
+        """
+        Closes a checked out connection instead of returning it.
+        """
+        self._close(connection)
+
+    def fill(self):
+        """
+        Opens connections until `min_size` are idle or checked out.
+        """
+        while True:
+            with self.condition:
+                if self.size >= self.min_size:
+                    return
+                self.size += 1
+            self.checkin(self._open())
+
+    def stats(self):
+        with self.condition:
+            size, idle = self.size, len(self.idle)
+            counters, wait_time = dict(self.counters), self.wait_time
+        return {
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            **counters,
+            'wait_ms': round(wait_time * 1000, 2),
+        }
+
+    def close_all(self):
+        with self.condition:
+            idle = [connection for connection, _opened, _returned in self.idle]
+            self.idle.clear()
+        for connection in idle:
+            self._close(connection)
+
+    def _take(self, deadline):
+        # Reserves an idle connection, or room to open one (None)
+        with self.condition:
+            self.counters['checkouts'] += 1
+            waited_since = None
+            while not self.idle and self.size >= self.max_size:
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self.counters['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    if not self.idle and self.size >= self.max_size:
+                        self.counters['timeouts'] += 1
+                        self.wait_time += time.monotonic() - waited_since
+                        raise PoolTimeout(
+                            f"No database connection came back within {self.timeout}s "
+                            f"({self.max_size} in use)"
+                        )
+            if waited_since is not None:
+                self.wait_time += time.monotonic() - waited_since
+            if self.idle:
+                connection, opened_at, _returned = self.idle.pop()
+                return connection, opened_at
+            self.size += 1
+            return None, None
+
+    def _open(self):
+        # The caller reserved room for the connection in self.size
+        try:
+            return self._connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+
+    def _connect(self):
+        connection = self.connect()
+        self.opened_at[id(connection)] = time.monotonic()
+        self._count('opened')
+        return connection
+
+    def _count(self, counter):
+        with self.condition:
+            self.counters[counter] += 1
+
+    def _alive(self, connection):
+        try:
+            connection.ping()
+        except Exception:
+            return False
+        return True
+
+    def _expired_idle(self, now):
+        # Least recently returned first; called with the condition held
+        expired = []
+        while self.idle and self.size - len(expired) > self.min_size:
+            connection, _opened, returned = self.idle[0]
+            if now - returned < self.max_idle:
+                break
+            self.idle.popleft()
+            expired.append(connection)
+        return expired
+
+    def _close(self, connection):
+        with self.condition:
+            self.size -= 1
+            self.counters['closed'] += 1
+            self.condition.notify()
+        self.opened_at.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            logger.debug("Closing a pooled connection failed", exc_info=True)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, connect, options, target=None):
+    """
+    Process-wide pool of the `alias` database, created on first use and
+    filled to its min_size. A pool opened for another `target` (the test
+    runner switching to the test database) is closed and replaced.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool.target == target:
+            return pool
+        stale = pool
+        pool = _pools[alias] = ConnectionPool(connect, **options)
+        pool.target = target
+    if stale is not None:
+        stale.close_all()
+    pool.fill()
+    return pool
+
+
+def pool_stats():
+    """
+    Metrics of every pool of this process, by database alias.
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items()}
@@ -0,0 +1,160 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .search.patient_index import SEARCH_RANK
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination seeking past the last row of the previous page on a
+    stable, unique ordering (the primary key breaks ties), so every page costs
+    one indexed range query however deep the client goes.
+
+    Views may set `keyset_ordering`; the default lists the newest rows first.
+    Search results (annotated with SEARCH_RANK) keep their relevance order.
+    The response is {'next': <url or null>, 'results': [...]}.
+    """
+    ordering = ('-createdAt', '-pk')
+    page_size = api_settings.PAGE_SIZE or 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(queryset, view)
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request, queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._after(self.cursor))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_ordering(self, queryset, view):
+        if SEARCH_RANK in queryset.query.annotations:
+            return ('-' + SEARCH_RANK, 'pk')
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(isinstance(value, str) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        # Tampered values would otherwise fail in the query, as a server error
+        try:
+            return [
+                self._field(queryset, field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row):
+        values = [str(getattr(row, field.lstrip('-'))) for field in self.ordering]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def _field(self, queryset, field):
+        name = field.lstrip('-')
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        opts = queryset.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _after(self, values):
+        """
+        Rows strictly after `values` in the ordering:
+        (a > x) OR (a = x AND b > y) OR ... with the comparison flipped for descending fields.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ChangeFeedPagination(KeysetPagination):
+    """
+    Keyset pagination over rows in modification order, for clients polling a
+    change feed. The response always carries the cursor to resume from, even on
+    the last page: {'cursor': ..., 'has_more': bool, 'results': [...]}.
+    """
+    ordering = ('updatedAt', 'pk')
+    page_size_query_param = 'limit'
+    max_page_size = 500
+
+    def get_cursor(self):
+        if self.page:
+            return self.encode_cursor(self.page[-1])
+        return self.request.query_params.get(self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'cursor': self.get_cursor(),
+            'has_more': self.has_next,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['cursor', 'has_more', 'results'],
+            'properties': {
+                'cursor': {'type': 'string', 'nullable': True},
+                'has_more': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,170 @@
+import contextvars
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request being handled, if it is sampled
+_current = contextvars.ContextVar('request_profile', default=None)
+
+# Placeholder lists of IN clauses vary with the number of values
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Identifies a query up to its parameters and the length of its IN lists.
+    """
+    return _IN_LIST.sub('(%s...)', _SPACES.sub(' ', sql).strip())
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_time = 0.0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.queries = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # Execute wrapper of the connections: times every query
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[fingerprint(sql)] += 1
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        stack.callback(_current.reset, _current.set(self))
+        return stack
+
+    def duplicates(self):
+        return [
+            {'fingerprint': hashlib.md5(sql.encode()).hexdigest()[:12], 'count': count, 'sql': sql[:300]}
+            for sql, count in self.queries.most_common()
+            if count > 1
+        ]
+
+    def record(self, request, response, role):
+        total = time.perf_counter() - self.started
+        return {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'role': role,
+            'total_ms': round(total * 1000, 2),
+            'view_ms': round(self.view_time * 1000, 2),
+            'db_ms': round(self.db_time * 1000, 2),
+            'queries': sum(self.queries.values()),
+            'duplicates': self.duplicates(),
+            'serializer_ms': round(self.serializer_time * 1000, 2),
+        }
+
+
+def _timed_data(data):
+    # Serializers call each other's .data; only the outermost call is timed
+    def wrapper(self):
+        profile = _current.get()
+        if profile is None or profile.serializing:
+            return data(self)
+        profile.serializing = True
+        start = time.perf_counter()
+        try:
+            return data(self)
+        finally:
+            profile.serializer_time += time.perf_counter() - start
+            profile.serializing = False
+    wrapper.timed = True
+    return wrapper
+
+
+def _time_serializers():
+    # Serializer.data and ListSerializer.data both go through BaseSerializer.data
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = property(_timed_data(BaseSerializer.data.fget))
+
+
+class ProfilingMiddleware:
+    """
+    Samples PROFILING_SAMPLE_RATE of the requests and reports, for those made
+    by the PROFILING_ROLES (all when empty), the number of SQL queries, the
+    database, serializer, view and total times and the queries run more than
+    once, as a Server-Timing header and a JSON log line on the
+    healthhub_back.common.profiling logger.
+
+    Requests left out of the sample only cost a random draw.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _time_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+        profile = RequestProfile()
+        with profile.capture():
+            response = self.get_response(request)
+        return self.report(request, response, profile)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+        profile = RequestProfile()
+        with profile.capture():
+            response = await self.get_response(request)
+        return self.report(request, response, profile)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def sampled(self):
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def report(self, request, response, profile):
+        if profile.view_started is not None:
+            profile.view_time = time.perf_counter() - profile.view_started
+        # DRF authenticates inside the view and sets request.user
+        user = getattr(request, 'user', None)
+        role = getattr(user, 'role', None) or 'anonymous'
+        if settings.PROFILING_ROLES and role not in settings.PROFILING_ROLES:
+            return response
+
+        record = profile.record(request, response, role)
+        logger.info('request_profile %s', json.dumps(record), extra={'profile': record})
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.2f;desc="%d queries (%d duplicated)"' % (
+                record['db_ms'], record['queries'], len(record['duplicates'])
+            ),
+            'serializer;dur=%.2f' % record['serializer_ms'],
+            'view;dur=%.2f' % record['view_ms'],
+            'total;dur=%.2f' % record['total_ms'],
+        ])
+        return response
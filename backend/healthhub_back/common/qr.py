@@ -0,0 +1,23 @@
+import base64
+import io
+
+import qrcode
+
+
+def render_qr_code(data):
+    """
+    Renders `data` as a QR code and returns the PNG as a base64 string.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    qr_image = qr.make_image(fill_color="black", back_color="white")
+
+    buffer = io.BytesIO()
+    qr_image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
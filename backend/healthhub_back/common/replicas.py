@@ -0,0 +1,214 @@
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Cache backends that only reach the process they run in
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Apps always read from the primary: the cache table of DatabaseCache, which
+# holds the write pins
+PRIMARY_APP_LABELS = ('django_cache',)
+
+# Routing state of the request being handled (None outside requests)
+_current = contextvars.ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, replica):
+        # Alias reads go to, None for the primary
+        self.replica = replica
+        self.wrote = False
+
+
+class ReplicaSet:
+    """
+    The replicas of DATABASE_REPLICAS that answer and lag the primary by at
+    most REPLICA_MAX_LAG seconds, checked at most every
+    REPLICA_CHECK_INTERVAL seconds by the request that finds the last check
+    stale (the others keep using its result meanwhile).
+    """
+
+    def __init__(self):
+        self.healthy = []
+        self.checked_at = None
+        self.lock = threading.Lock()
+
+    def choose(self):
+        """
+        A healthy replica to read from, or None to read from the primary.
+        """
+        aliases = settings.DATABASE_REPLICAS
+        if not aliases:
+            return None
+        if self.checked_at is None or time.monotonic() - self.checked_at >= settings.REPLICA_CHECK_INTERVAL:
+            # Only the first check makes the other requests wait
+            if self.lock.acquire(blocking=self.checked_at is None):
+                try:
+                    self.check(aliases)
+                finally:
+                    self.lock.release()
+        healthy = self.healthy
+        return random.choice(healthy) if healthy else None
+
+    def check(self, aliases):
+        healthy = []
+        for alias in aliases:
+            try:
+                lag = self.lag(alias)
+            except DatabaseError:
+                logger.warning("Replica %s is unreachable, reading from the primary", alias, exc_info=True)
+                continue
+            if lag is None or lag > settings.REPLICA_MAX_LAG:
+                logger.warning("Replica %s lags by %s seconds, reading from the primary", alias, lag)
+                continue
+            healthy.append(alias)
+        self.healthy = healthy
+        self.checked_at = time.monotonic()
+
+    def lag(self, alias):
+        """
+        Seconds the `alias` database is behind the primary, None when it does
+        not replicate.
+        """
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor != 'mysql':
+                cursor.execute('SELECT 1')
+                return 0
+            try:
+                cursor.execute('SHOW REPLICA STATUS')
+            except DatabaseError:
+                # MySQL before 8.0.22
+                cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            status = dict(zip([column[0] for column in cursor.description], row))
+            return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+    def reset(self):
+        self.healthy = []
+        self.checked_at = None
+
+
+replica_set = ReplicaSet()
+
+
+class ReplicaRouter:
+    """
+    Sends the reads of safe-method requests to the replica chosen by
+    ReplicaMiddleware, and everything else to the primary: writes, reads
+    following a write or inside a transaction, and work done outside requests
+    (background tasks, management commands).
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or state.replica is None or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_APP_LABELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or Django would save instances read from a replica there
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def client_key(request):
+    """
+    Identifies the client by its credentials (token or session), None for
+    anonymous requests.
+    """
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'replica-pin:' + hashlib.sha256(credentials.encode()).hexdigest()[:32]
+
+
+class ReplicaMiddleware:
+    """
+    Routes the reads of safe-method requests to a healthy replica, except for
+    clients that wrote during the last REPLICA_PIN_SECONDS: those read from
+    the primary so they see their own writes (a doctor listing the
+    consultation they just created).
+
+    Pins live in the default cache, which must be shared by the processes
+    (not LocMemCache) once replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        if settings.DATABASE_REPLICAS and settings.CACHES['default']['BACKEND'] in PER_PROCESS_CACHES:
+            raise ImproperlyConfigured(
+                "DATABASE_REPLICAS needs a cache shared by all processes (CACHE_BACKEND) "
+                "to pin clients to the primary after they write."
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state, key = self.route(request)
+        token = _current.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.pin(state, key)
+
+    async def __acall__(self, request):
+        if settings.DATABASE_REPLICAS:
+            # The health check queries the replicas
+            state, key = await sync_to_async(self.route)(request)
+        else:
+            state, key = self.route(request)
+        token = _current.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _current.reset(token)
+            self.pin(state, key)
+
+    def route(self, request):
+        key = client_key(request)
+        if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS or (key and cache.get(key)):
+            return RoutingState(None), key
+        return RoutingState(replica_set.choose()), key
+
+    def pin(self, state, key):
+        if state.wrote and key and settings.DATABASE_REPLICAS:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
@@ -0,0 +1,32 @@
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+from .patient_index import SEARCH_RANK, filter_by_patient_search
+
+
+class PatientIndexSearchFilter(BaseFilterBackend):
+    """
+    Search backend answering `?search=` from the patient search index.
+
+    Views set `patient_search_field` to the lookup leading from their model to
+    the patient primary key (defaults to 'pk', for Patient querysets).
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        patient_field = getattr(view, 'patient_search_field', 'pk')
+        return filter_by_patient_search(queryset, query, patient_field)
+
+
+class SearchRankOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter leaving search results in relevance order unless the client
+    asks for another ordering. Goes after PatientIndexSearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if SEARCH_RANK in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            return queryset
+        return super().filter_queryset(request, queryset, view)
@@ -0,0 +1,189 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from healthhub_back.models import Medicament
+from .text import tokenize, trigrams
+
+# Upper bound on the number of medicaments a search returns
+MAX_SEARCH_RESULTS = 100
+
+# A medicament's rank for a query, best first
+EXACT_RANK = 0
+NAME_PREFIX_RANK = 1
+WORD_PREFIX_RANK = 2
+INFIX_RANK = 3
+
+
+class MedicamentIndex:
+    """
+    Thread-safe in-memory autocomplete index of the medicament catalog.
+
+    The index is loaded from the database on first use and then kept up to
+    date by the Medicament writes of its own process; the TTL bounds how long
+    writes made by other processes stay invisible.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._expires_at = None
+        self._entries = {}
+        # Sorted (word, pk) pairs for prefix lookups
+        self._words = []
+        self._grams = defaultdict(set)
+
+    def search(self, query='', type_=None, limit=MAX_SEARCH_RESULTS):
+        """
+        Returns the medicaments whose name matches every token of `query`, as
+        dicts of medicamentID, nom, type and description, best match first.
+
+        Parameters:
+        - query (str): prefix or infix of the name words, accents and case are ignored.
+        - type_ (str): optional medicament type.
+        - limit (int): maximum number of medicaments returned, None for all.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            tokens = tokenize(query)
+            if tokens:
+                ranks = self._match(tokens)
+            else:
+                ranks = dict.fromkeys(self._entries, EXACT_RANK)
+
+            def sort_key(pk):
+                entry = self._entries[pk]
+                return ranks[pk], len(entry['name']), entry['name'], str(pk)
+
+            candidates = [pk for pk in ranks if type_ is None or self._entries[pk]['type'] == type_]
+            if limit is None:
+                ranked = sorted(candidates, key=sort_key)
+            else:
+                ranked = heapq.nsmallest(limit, candidates, key=sort_key)
+            return [self._entries[pk]['data'] for pk in ranked]
+
+    def update(self, medicaments):
+        with self._lock:
+            if self._expires_at is None:
+                return
+            for medicament in medicaments:
+                self._remove(medicament.pk)
+                self._add(medicament.pk, medicament.nom, medicament.type, medicament.description)
+
+    def remove(self, medicament_ids):
+        with self._lock:
+            for pk in medicament_ids:
+                self._remove(pk)
+
+    def clear(self):
+        with self._lock:
+            self._expires_at = None
+            self._reset()
+
+    def _ensure_loaded(self):
+        if self._expires_at is not None and self._expires_at > time.monotonic():
+            return
+        self._expires_at = None
+        self._reset()
+        rows = Medicament.objects.values_list('medicamentID', 'nom', 'type', 'description')
+        for pk, nom, type_, description in rows:
+            self._add(pk, nom, type_, description)
+        self._words.sort()
+        self._expires_at = time.monotonic() + self.ttl
+
+    def _reset(self):
+        self._entries = {}
+        self._words = []
+        self._grams = defaultdict(set)
+
+    def _add(self, pk, nom, type_, description):
+        words = tokenize(nom)
+        self._entries[pk] = {
+            'name': ' '.join(words),
+            'type': type_,
+            'words': words,
+            'data': {'medicamentID': pk, 'nom': nom, 'type': type_, 'description': description},
+        }
+        for word in set(words):
+            if self._expires_at is None:
+                self._words.append((word, pk))
+            else:
+                bisect.insort(self._words, (word, pk))
+            for gram in trigrams(word):
+                self._grams[gram].add(pk)
+
+    def _remove(self, pk):
+        entry = self._entries.pop(pk, None)
+        if entry is None:
+            return
+        for word in set(entry['words']):
+            position = bisect.bisect_left(self._words, (word, pk))
+            if position < len(self._words) and self._words[position] == (word, pk):
+                del self._words[position]
+            for gram in trigrams(word):
+                pks = self._grams.get(gram)
+                if pks is not None:
+                    pks.discard(pk)
+                    if not pks:
+                        del self._grams[gram]
+
+    def _prefixed(self, token):
+        start = bisect.bisect_left(self._words, (token,))
+        pks = set()
+        for word, pk in self._words[start:]:
+            if not word.startswith(token):
+                break
+            pks.add(pk)
+        return pks
+
+    def _infixed(self, token):
+        if len(token) < 3:
+            return set()
+        grams = [self._grams.get(gram, set()) for gram in trigrams(token)]
+        candidates = set.intersection(*grams) if grams else set()
+        # Trigrams may come from different words: check the token itself
+        return {pk for pk in candidates if any(token in word for word in self._entries[pk]['words'])}
+
+    def _match(self, tokens):
+        ranks = None
+        for token in set(tokens):
+            prefixed = self._prefixed(token)
+            token_ranks = dict.fromkeys(self._infixed(token) - prefixed, INFIX_RANK)
+            token_ranks.update(dict.fromkeys(prefixed, WORD_PREFIX_RANK))
+            if ranks is None:
+                ranks = token_ranks
+            else:
+                ranks = {pk: max(rank, token_ranks[pk]) for pk, rank in ranks.items() if pk in token_ranks}
+            if not ranks:
+                return {}
+
+        name_query = ' '.join(tokens)
+        for pk, rank in ranks.items():
+            name = self._entries[pk]['name']
+            if name == name_query:
+                ranks[pk] = EXACT_RANK
+            elif name.startswith(name_query):
+                ranks[pk] = NAME_PREFIX_RANK
+        return ranks
+
+
+medicament_index = MedicamentIndex(ttl=settings.MEDICAMENT_INDEX_TTL)
+
+
+def schedule_index_update(medicaments=(), removed_ids=()):
+    """
+    Applies Medicament writes to the index once the transaction commits.
+    """
+    medicaments = list(medicaments)
+    removed_ids = list(removed_ids)
+
+    def apply():
+        medicament_index.remove(removed_ids)
+        medicament_index.update(medicaments)
+
+    transaction.on_commit(apply)
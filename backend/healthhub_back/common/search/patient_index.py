@@ -0,0 +1,176 @@
+import math
+
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, FloatField, Max, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Cast
+
+from healthhub_back.models import Patient, PatientSearchTerm
+from .text import tokenize, trigrams
+
+# Share of a token's trigrams a name must contain to match it as an infix
+TRIGRAM_THRESHOLD = 1.0
+# Default number of patient IDs search_patient_ids returns, best matches first
+MAX_SEARCH_RESULTS = 200
+# Annotation holding the match score of each row's patient (higher is better)
+SEARCH_RANK = 'search_rank'
+
+EXACT_SCORE = 3
+PREFIX_SCORE = 2
+TERM_MAX_LENGTH = PatientSearchTerm._meta.get_field('term').max_length
+
+
+def build_terms(nom, prenom, nss):
+    """
+    Returns the (kind, term) pairs indexed for a patient.
+    """
+    terms = {('nss', str(nss))}
+    for word in tokenize(f"{nom} {prenom}"):
+        word = word[:TERM_MAX_LENGTH]
+        terms.add(('mot', word))
+        terms.update(('trigramme', gram) for gram in trigrams(word))
+    return terms
+
+
+def _term_rows(patient):
+    return [
+        PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+        for kind, term in build_terms(patient.nom, patient.prenom, patient.NSS)
+    ]
+
+
+@transaction.atomic
+def index_patient(patient):
+    """
+    Brings the indexed terms of a patient up to date, writing only the terms
+    that changed (nothing when the name and NSS did not).
+    """
+    indexed = PatientSearchTerm.objects.filter(patient_id=patient.pk)
+    current = set(indexed.values_list('kind', 'term'))
+    terms = build_terms(patient.nom, patient.prenom, patient.NSS)
+    stale = current - terms
+    if stale:
+        removed = Q(pk__in=[])
+        for kind, term in stale:
+            removed |= Q(kind=kind, term=term)
+        indexed.filter(removed).delete()
+    PatientSearchTerm.objects.bulk_create([
+        PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+        for kind, term in terms - current
+    ])
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuilds the whole patient search index. Returns the number of patients indexed.
+    """
+    indexed = 0
+    with transaction.atomic():
+        PatientSearchTerm.objects.all().delete()
+        rows = []
+        patients = Patient.objects.only('pk', 'nom', 'prenom', 'NSS').order_by('pk')
+        for patient in patients.iterator(chunk_size=batch_size):
+            rows.extend(_term_rows(patient))
+            indexed += 1
+            if len(rows) >= batch_size:
+                PatientSearchTerm.objects.bulk_create(rows)
+                rows = []
+        PatientSearchTerm.objects.bulk_create(rows)
+    return indexed
+
+
+def _token_score(n, token):
+    """
+    Annotations scoring the patients on one query token (exact word or NSS >
+    prefix > trigram (infix) match), the score expression, and the condition a
+    patient must meet to match the token at all.
+    """
+    kind = 'nss' if token.isdigit() else 'mot'
+    prefix = Q(kind=kind, term__startswith=token)
+    prefix_score = f'prefix_{n}'
+    annotations = {
+        prefix_score: Max(Case(
+            When(kind=kind, term=token, then=Value(EXACT_SCORE)),
+            When(prefix, then=Value(PREFIX_SCORE)),
+            default=Value(0),
+        )),
+    }
+    if kind == 'nss' or len(token) < 3:
+        return prefix, annotations, Cast(prefix_score, FloatField()), Q(**{f'{prefix_score}__gt': 0})
+
+    grams = trigrams(token)
+    infix = Q(kind='trigramme', term__in=grams)
+    hits = f'infix_{n}'
+    annotations[hits] = Count('term', filter=infix, distinct=True)
+    needed = Q(**{f'{hits}__gte': math.ceil(len(grams) * TRIGRAM_THRESHOLD)})
+    score = Case(
+        When(**{f'{prefix_score}__gt': 0}, then=Cast(prefix_score, FloatField())),
+        When(needed, then=Cast(hits, FloatField()) / len(grams)),
+        default=Value(0.0),
+    )
+    return prefix | infix, annotations, score, Q(**{f'{prefix_score}__gt': 0}) | needed
+
+
+def _ranked_patients(tokens, terms):
+    """
+    Grouped query scoring the patients of `terms` matching every token, best
+    match first: {'patient_id': ..., 'score': ...} rows.
+    """
+    matched, annotations, scores, required = Q(pk__in=[]), {}, [], Q()
+    for n, token in enumerate(tokens):
+        token_terms, token_annotations, score, token_required = _token_score(n, token)
+        matched |= token_terms
+        annotations.update(token_annotations)
+        scores.append(score)
+        required &= token_required
+
+    return terms.filter(matched).values('patient_id').annotate(**annotations).filter(required).annotate(
+        score=ExpressionWrapper(sum(scores[1:], scores[0]), output_field=FloatField())
+    ).order_by('-score', 'patient_id')
+
+
+def search_patient_ids(query, patients=None, limit=None):
+    """
+    Returns the IDs of the best matching patients of `query` (each token must
+    match), best match first. Scoring, ranking and the limit all run in one
+    grouped query; listings use filter_by_patient_search instead, which keeps
+    every match.
+
+    Parameters:
+    - query (str): names and/or NSS prefix, accents and case are ignored.
+    - patients (QuerySet): optional queryset of patient IDs restricting the search.
+    - limit (int): maximum number of IDs returned, MAX_SEARCH_RESULTS by default.
+    """
+    tokens = sorted(set(tokenize(query)))
+    if not tokens:
+        return []
+
+    terms = PatientSearchTerm.objects.all()
+    if patients is not None:
+        terms = terms.filter(patient_id__in=patients)
+    ranked = _ranked_patients(tokens, terms)
+    return [row['patient_id'] for row in ranked[:limit or MAX_SEARCH_RESULTS]]
+
+
+def filter_by_patient_search(queryset, query, patient_field='pk'):
+    """
+    Restricts a queryset to the rows whose patient matches `query` in the index
+    (all of them: pagination applies afterwards), annotated with the match
+    score as SEARCH_RANK and ordered best match first. A query without any
+    word or number leaves the queryset as it is.
+
+    Parameters:
+    - queryset (QuerySet): queryset to filter.
+    - query (str): search string.
+    - patient_field (str): lookup from the queryset model to the patient primary key.
+    """
+    tokens = sorted(set(tokenize(query)))
+    if not tokens:
+        return queryset
+
+    ranked = _ranked_patients(tokens, PatientSearchTerm.objects.all())
+    score = ranked.filter(patient_id=OuterRef(patient_field)).values('score')[:1]
+    return queryset.filter(
+        **{f'{patient_field}__in': ranked.values('patient_id')}
+    ).annotate(
+        **{SEARCH_RANK: Subquery(score, output_field=FloatField())}
+    ).order_by(f'-{SEARCH_RANK}', 'pk')
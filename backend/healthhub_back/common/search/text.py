@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """
+    Accent-folds and lower-cases a string: 'Hélène Dupré' -> 'helene dupre'.
+    """
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def trigrams(word):
+    """
+    Trigrams of a normalized word; words shorter than three characters are kept whole.
+    """
+    if len(word) < 3:
+        return {word}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
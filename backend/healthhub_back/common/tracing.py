@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.generics import GenericAPIView
+from rest_framework.serializers import BaseSerializer
+from rest_framework.views import APIView
+
+# Innermost open span of the trace being recorded, if it is sampled
+_current = contextvars.ContextVar('trace_span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'trace', 'span_id', 'parent_id', 'attributes', 'started', 'duration', 'error')
+
+    def __init__(self, name, trace, parent_id, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        self.duration = time.perf_counter() - self.started
+        self.trace.spans.append(self)
+
+    def to_dict(self, origin):
+        return {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.started - origin) * 1000, 3),
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.timestamp = datetime.now(timezone.utc)
+        self.spans = []
+
+    def to_dict(self, root):
+        return {
+            'trace_id': self.trace_id,
+            'name': root.name,
+            'timestamp': self.timestamp.isoformat(),
+            'duration_ms': round(root.duration * 1000, 3),
+            'attributes': root.attributes,
+            'error': root.error,
+            'spans': [span.to_dict(root.started) for span in self.spans if span is not root],
+        }
+
+
+class RingBufferExporter:
+    """
+    Keeps the last TRACING_BUFFER_SIZE finished traces of this process in
+    memory, for the admin trace endpoint; no collector is involved.
+    """
+
+    def __init__(self, size=None):
+        self.traces = deque(maxlen=size or settings.TRACING_BUFFER_SIZE)
+        self.lock = threading.Lock()
+
+    def export(self, trace):
+        with self.lock:
+            self.traces.append(trace)
+
+    def dump(self):
+        """
+        Buffered traces, most recent first.
+        """
+        with self.lock:
+            return list(reversed(self.traces))
+
+    def clear(self):
+        with self.lock:
+            self.traces.clear()
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter():
+    """
+    Process-wide instance of the exporter configured in TRACING_EXPORTER.
+    """
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = import_string(settings.TRACING_EXPORTER)()
+        return _exporter
+
+
+def sampled():
+    rate = settings.TRACING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+@contextmanager
+def _open(span):
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+@contextmanager
+def start_trace(name, **attributes):
+    """
+    Opens the root span of a new trace when TRACING_SAMPLE_RATE draws it (a
+    child span inside a trace already recording), and exports the trace when
+    the root closes. Yields the span, or None when the trace is not sampled.
+    """
+    parent = _current.get()
+    if parent is not None:
+        with span(name, **attributes) as child:
+            yield child
+        return
+    if not sampled():
+        yield None
+        return
+
+    root = Span(name, Trace(), None, attributes)
+    try:
+        with _open(root):
+            yield root
+    finally:
+        get_exporter().export(root.trace.to_dict(root))
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Times the enclosed block as a child of the current span. Outside a sampled
+    trace it does nothing and yields None.
+    """
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    with _open(Span(name, parent.trace, parent.span_id, attributes)) as child:
+        yield child
+
+
+def traced(name, attributes=None):
+    """
+    Decorates a method so its calls are spans; `attributes(self)` adds to them.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if _current.get() is None:
+                return method(self, *args, **kwargs)
+            with span(name, **(attributes(self) if attributes else {})):
+                return method(self, *args, **kwargs)
+        wrapper.traced = True
+        return wrapper
+    return decorate
+
+
+def _class_name(obj):
+    return {'class': type(obj).__name__}
+
+
+def _instrument_rest_framework():
+    # Every DRF view goes through dispatch, check_permissions and, to render
+    # its serializers, BaseSerializer.data (ListSerializer included). Generic
+    # views run their queries in filter_queryset (search), paginate_queryset
+    # and get_object; get_queryset only builds them and is overridden anyway
+    if getattr(APIView.dispatch, 'traced', False):
+        return
+    APIView.dispatch = traced('view', _class_name)(APIView.dispatch)
+    APIView.check_permissions = traced('permissions', _class_name)(APIView.check_permissions)
+    GenericAPIView.filter_queryset = traced('queryset.filter')(GenericAPIView.filter_queryset)
+    GenericAPIView.paginate_queryset = traced('queryset.page')(GenericAPIView.paginate_queryset)
+    GenericAPIView.get_object = traced('queryset.get')(GenericAPIView.get_object)
+    BaseSerializer.data = property(traced('serializer', _class_name)(BaseSerializer.data.fget))
+
+
+class TracingMiddleware:
+    """
+    Records a trace for TRACING_SAMPLE_RATE of the requests: a root span for
+    the request, and spans for the DRF view, its permission checks, the
+    queries of generic views, the serializers it renders and the blocks the
+    code wraps in `span()`.
+    Finished traces go to the TRACING_EXPORTER, by default a ring buffer
+    served at /api/admin/metrics/traces/.
+
+    Requests left out of the sample only cost a random draw.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        _instrument_rest_framework()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with start_trace('request', method=request.method, path=request.path) as root:
+            response = self.get_response(request)
+            if root is not None:
+                self.annotate(root, request, response)
+        return response
+
+    async def __acall__(self, request):
+        with start_trace('request', method=request.method, path=request.path) as root:
+            response = await self.get_response(request)
+            if root is not None:
+                self.annotate(root, request, response)
+        return response
+
+    def annotate(self, root, request, response):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        root.set(
+            route=match.route if match else None,
+            status=response.status_code,
+            role=getattr(user, 'role', None) or 'anonymous',
+        )
@@ -0,0 +1,54 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(pool='default'):
+    """
+    Process-wide thread pool running background tasks, created on first use.
+    Each named pool gets its own size from BACKGROUND_POOL_SIZES, which bounds
+    the concurrency of that kind of task (BACKGROUND_WORKERS by default).
+    """
+    with _executors_lock:
+        if pool not in _executors:
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_POOL_SIZES.get(pool, settings.BACKGROUND_WORKERS),
+                thread_name_prefix=f'healthhub-{pool}',
+            )
+        return _executors[pool]
+
+
+def _run(func, args, kwargs):
+    # Worker threads open their own DB connections; release them after each task
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, '__name__', func))
+        raise
+    finally:
+        close_old_connections()
+
+
+def run_in_background(func, *args, pool='default', **kwargs):
+    """
+    Runs `func(*args, **kwargs)` on the `pool` worker pool once the current
+    transaction commits (immediately outside a transaction). With
+    BACKGROUND_TASKS_EAGER the task runs inline at commit time instead, which
+    tests and scripts rely on.
+    """
+    def dispatch():
+        if settings.BACKGROUND_TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            get_executor(pool).submit(_run, func, args, kwargs)
+
+    transaction.on_commit(dispatch)
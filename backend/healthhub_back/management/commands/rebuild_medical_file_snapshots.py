@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from healthhub_back.accounts.patient.patient_service import medical_file_queryset, rebuild_snapshot
+from healthhub_back.models import DossierSnapshot
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the materialized medical file snapshots (DossierSnapshot)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patient',
+            action='append',
+            dest='patients',
+            help="Only rebuild the snapshot of this patient (user id). Can be repeated.",
+        )
+        parser.add_argument(
+            '--stale-only',
+            action='store_true',
+            help="Only rebuild missing snapshots and snapshots with pending updates.",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help="Number of dossiers loaded per query batch.",
+        )
+
+    def handle(self, *args, **options):
+        dossiers = medical_file_queryset().order_by('pk')
+        if options['patients']:
+            dossiers = dossiers.filter(patient__user__id__in=options['patients'])
+        if options['stale_only']:
+            fresh = DossierSnapshot.objects.filter(pendingUpdates=0).values('dossier_id')
+            dossiers = dossiers.exclude(pk__in=fresh)
+
+        rebuilt = 0
+        for dossier in dossiers.iterator(chunk_size=options['chunk_size']):
+            rebuild_snapshot(dossier)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rebuilt} medical file snapshot(s)."))
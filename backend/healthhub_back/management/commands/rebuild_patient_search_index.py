@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from healthhub_back.common.search.patient_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the patient search index (PatientSearchTerm) from the Patient table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Number of index rows written per insert.",
+        )
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} patient(s)."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from healthhub_back.accounts.patient.patient_service import render_dossier_qr_code
+from healthhub_back.models import DossierMedical
+
+
+class Command(BaseCommand):
+    help = "Renders the QR images of the dossiers that are still pending or whose rendering failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--failed-only',
+            action='store_true',
+            help="Only retry the dossiers whose rendering failed.",
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['echec'] if options['failed_only'] else ['en_attente', 'echec']
+        dossiers = list(DossierMedical.objects.filter(qrStatus__in=statuses).values_list('pk', flat=True))
+
+        for dossier_id in dossiers:
+            try:
+                render_dossier_qr_code(dossier_id)
+            except Exception:
+                # Stored as 'echec'; the next run retries it
+                continue
+
+        rendered = DossierMedical.objects.filter(pk__in=dossiers, qrStatus='pret').count()
+        self.stdout.write(self.style.SUCCESS(f"Rendered {rendered} QR code(s)."))
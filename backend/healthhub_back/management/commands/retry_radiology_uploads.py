@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from healthhub_back.accounts.radiologue.radiologue_service import retryable_uploads, upload_staged_image
+from healthhub_back.models import ResultatRadio
+
+
+class Command(BaseCommand):
+    help = (
+        "Uploads the staged radiology images that are still pending, failed, "
+        "or were left 'en_cours' by a worker that stopped mid-upload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--failed-only',
+            action='store_true',
+            help="Only retry the uploads that failed or were abandoned.",
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['echec'] if options['failed_only'] else ['en_attente', 'echec']
+        resultats = list(ResultatRadio.objects.filter(retryable_uploads(statuses)).values_list('pk', flat=True))
+
+        for resultat_id in resultats:
+            upload_staged_image(resultat_id)
+
+        uploaded = ResultatRadio.objects.filter(pk__in=resultats, uploadStatus='televerse').count()
+        self.stdout.write(self.style.SUCCESS(f"Uploaded {uploaded} radiology image(s)."))
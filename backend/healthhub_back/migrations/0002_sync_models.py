@@ -0,0 +1,122 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="pharmacienhospitalier",
+            name="user",
+        ),
+        migrations.AddField(
+            model_name="examen",
+            name="laborantin",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="healthhub_back.laboratin",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="activiteinfermier",
+            name="createdAt",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="consultation",
+            name="dateConsultation",
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name="dossiermedical",
+            name="createdAt",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="examen",
+            name="createdAt",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="healthmetrics",
+            name="measured_at",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="healthmetrics",
+            name="medical_record_id",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="healthmetrics",
+            name="metric_type",
+            field=models.CharField(
+                choices=[
+                    ("pression_arterielle", "Pression Artérielle"),
+                    ("glycemie", "Glycémie"),
+                    ("niveaux_cholesterol", "Niveaux de Cholestérol"),
+                    ("autre", "Autre"),
+                ],
+                max_length=30,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="healthmetrics",
+            name="recorded_by",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="ordonnance",
+            name="dateCreation",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="ordonnance",
+            name="dateExpiration",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="ordonnance",
+            name="valide",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name="patient",
+            name="createdAt",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="patient",
+            name="dateNaissance",
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name="resultatlabo",
+            name="dateAnalyse",
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name="resultatradio",
+            name="dateRealisation",
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name="resultatradio",
+            name="radioImgURL",
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.DeleteModel(
+            name="Facture",
+        ),
+        migrations.DeleteModel(
+            name="PharmacienHospitalier",
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:01
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0002_sync_models"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DossierSnapshot",
+            fields=[
+                (
+                    "patient",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to="healthhub_back.patient",
+                    ),
+                ),
+                (
+                    "data",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                ("pendingUpdates", models.PositiveIntegerField(default=0)),
+                ("updatedAt", models.DateTimeField(auto_now=True)),
+                (
+                    "dossier",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="healthhub_back.dossiermedical",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:08
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copies of healthhub_back.common.search.text as of this migration
+
+
+def tokenize(text):
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return re.findall(r"[a-z0-9]+", folded)
+
+
+def trigrams(word):
+    if len(word) < 3:
+        return {word}
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def index_existing_patients(apps, schema_editor):
+    Patient = apps.get_model("healthhub_back", "Patient")
+    PatientSearchTerm = apps.get_model("healthhub_back", "PatientSearchTerm")
+    rows = []
+    for patient in Patient.objects.only("pk", "nom", "prenom", "NSS").iterator():
+        terms = {("nss", str(patient.NSS))}
+        for word in tokenize(f"{patient.nom} {patient.prenom}"):
+            word = word[:64]
+            terms.add(("mot", word))
+            terms.update(("trigramme", gram) for gram in trigrams(word))
+        rows.extend(
+            PatientSearchTerm(patient_id=patient.pk, kind=kind, term=term)
+            for kind, term in terms
+        )
+        if len(rows) >= 1000:
+            PatientSearchTerm.objects.bulk_create(rows)
+            rows = []
+    PatientSearchTerm.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0003_dossiersnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatientSearchTerm",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("mot", "Mot"),
+                            ("trigramme", "Trigramme"),
+                            ("nss", "NSS"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("term", models.CharField(max_length=64)),
+                (
+                    "patient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="healthhub_back.patient",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "term", "patient"],
+                        name="patient_search_term_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(index_existing_patients, migrations.RunPython.noop),
+    ]
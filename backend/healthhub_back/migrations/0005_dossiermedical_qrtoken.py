@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:20
+
+import secrets
+
+from django.db import migrations, models
+
+import healthhub_back.models
+
+
+def backfill_qr_tokens(apps, schema_editor):
+    # Existing QR images encode the patient details: drop them, they are
+    # rendered around the token on first access or by `render_qr_codes`
+    DossierMedical = apps.get_model("healthhub_back", "DossierMedical")
+    for dossier in DossierMedical.objects.filter(qrToken__isnull=True).iterator():
+        dossier.qrToken = secrets.token_urlsafe(12)
+        dossier.qrCode = ""
+        dossier.save(update_fields=["qrToken", "qrCode"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0004_patientsearchterm"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dossiermedical",
+            name="qrToken",
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+        migrations.RunPython(backfill_qr_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="dossiermedical",
+            name="qrToken",
+            field=models.CharField(
+                default=healthhub_back.models.generate_qr_token,
+                editable=False,
+                max_length=32,
+                unique=True,
+            ),
+        ),
+    ]
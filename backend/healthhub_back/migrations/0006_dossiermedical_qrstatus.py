@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+def mark_rendered_qr_codes(apps, schema_editor):
+    DossierMedical = apps.get_model("healthhub_back", "DossierMedical")
+    DossierMedical.objects.exclude(qrCode="").update(qrStatus="pret")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0005_dossiermedical_qrtoken"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="dossiermedical",
+            name="qrStatus",
+            field=models.CharField(
+                choices=[
+                    ("en_attente", "En Attente"),
+                    ("pret", "Prêt"),
+                    ("echec", "Échec"),
+                ],
+                default="en_attente",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dossiermedical",
+            name="qrCode",
+            field=models.CharField(blank=True, default="", max_length=10000),
+        ),
+        migrations.RunPython(mark_rendered_qr_codes, migrations.RunPython.noop),
+    ]
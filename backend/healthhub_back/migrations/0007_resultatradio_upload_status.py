@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0006_dossiermedical_qrstatus"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resultatradio",
+            name="stagedImage",
+            field=models.CharField(blank=True, default="", max_length=500),
+        ),
+        migrations.AddField(
+            model_name="resultatradio",
+            name="uploadStatus",
+            field=models.CharField(
+                choices=[
+                    ("en_attente", "En Attente"),
+                    ("en_cours", "En Cours"),
+                    ("televerse", "Téléversé"),
+                    ("echec", "Échec"),
+                ],
+                default="televerse",
+                max_length=20,
+            ),
+        ),
+    ]
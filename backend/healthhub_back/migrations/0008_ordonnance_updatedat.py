@@ -0,0 +1,24 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0007_resultatradio_upload_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ordonnance",
+            name="updatedAt",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="ordonnance",
+            index=models.Index(
+                fields=["updatedAt", "ordonnanceID"], name="ordonnance_feed_idx"
+            ),
+        ),
+    ]
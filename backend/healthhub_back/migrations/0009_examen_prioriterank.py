@@ -0,0 +1,33 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0008_ordonnance_updatedat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="examen",
+            name="prioriteRank",
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=models.Case(
+                    models.When(priorite="tres_urgent", then=models.Value(0)),
+                    models.When(priorite="urgent", then=models.Value(1)),
+                    default=models.Value(2),
+                ),
+                output_field=models.PositiveSmallIntegerField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="examen",
+            index=models.Index(
+                fields=["laborantin", "etat", "prioriteRank", "createdAt"],
+                name="examen_lab_worklist_idx",
+            ),
+        ),
+    ]
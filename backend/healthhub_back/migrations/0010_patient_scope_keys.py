@@ -0,0 +1,145 @@
+# Generated by Django 5.1.4 on 2026-10-18 11:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def _copy_scope(model, parent_model, parent_field, lookups):
+    # One UPDATE per table; queryset updates leave Ordonnance.updatedAt alone
+    parents = parent_model.objects.filter(pk=OuterRef(parent_field))
+    model.objects.update(
+        patient=Subquery(parents.values(lookups[0])[:1]),
+        centreHospitalier=Subquery(parents.values(lookups[1])[:1]),
+    )
+
+
+def backfill_scope_keys(apps, schema_editor):
+    def get(name):
+        return apps.get_model("healthhub_back", name)
+
+    _copy_scope(get("Consultation"), get("DossierMedical"), "dossier", ("patient", "patient__centreHospitalier"))
+    for name in ("Ordonnance", "Examen", "ActiviteInfermier"):
+        _copy_scope(get(name), get("Consultation"), "consultation", ("patient", "centreHospitalier"))
+    _copy_scope(get("ResultatLabo"), get("Examen"), "examen", ("patient", "centreHospitalier"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0009_examen_prioriterank"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="activiteinfermier",
+            name="centreHospitalier",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.centrehospitalier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="activiteinfermier",
+            name="patient",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="consultation",
+            name="centreHospitalier",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.centrehospitalier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="consultation",
+            name="patient",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="examen",
+            name="centreHospitalier",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.centrehospitalier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="examen",
+            name="patient",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ordonnance",
+            name="centreHospitalier",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.centrehospitalier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ordonnance",
+            name="patient",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.patient",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resultatlabo",
+            name="centreHospitalier",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.centrehospitalier",
+            ),
+        ),
+        migrations.AddField(
+            model_name="resultatlabo",
+            name="patient",
+            field=models.ForeignKey(
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="healthhub_back.patient",
+            ),
+        ),
+        migrations.RunPython(backfill_scope_keys, migrations.RunPython.noop),
+    ]
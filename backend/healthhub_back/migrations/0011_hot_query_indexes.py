@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0010_patient_scope_keys"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="activiteinfermier",
+            index=models.Index(
+                fields=["infermier", "status", "createdAt"], name="activite_nurse_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="examen",
+            index=models.Index(
+                fields=["laborantin", "type", "etat"], name="examen_lab_state_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="examen",
+            index=models.Index(
+                fields=["radiologue", "etat", "createdAt"],
+                name="examen_radio_worklist_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ordonnance",
+            index=models.Index(
+                fields=["valide", "dateCreation"], name="ordonnance_pending_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patient",
+            index=models.Index(
+                fields=["medecin", "nom"], name="patient_medecin_nom_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="resultatlabo",
+            index=models.Index(
+                fields=["patient", "dateAnalyse"], name="resultatlabo_history_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("healthhub_back", "0011_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resultatradio",
+            name="uploadStartedAt",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
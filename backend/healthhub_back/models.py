@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+import secrets
 import uuid
 
 class CentreHospitalier(models.Model):
@@ -133,21 +135,117 @@ class Patient(models.Model):
     createdAt = models.DateField(auto_now_add=True)
     centreHospitalier = models.ForeignKey(CentreHospitalier, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # A doctor's patients, by name
+            models.Index(fields=['medecin', 'nom'], name='patient_medecin_nom_idx'),
+        ]
+
     def __str__(self):
         return f"{self.prenom} {self.nom}"
 
+def generate_qr_token():
+    """
+    Short random token encoded in a dossier's QR code (16 URL-safe characters).
+    """
+    return secrets.token_urlsafe(12)
+
+
 # DossierMedical Model
 class DossierMedical(models.Model):
+    QR_STATUS_CHOICES = [
+        ('en_attente', 'En Attente'),
+        ('pret', 'Prêt'),
+        ('echec', 'Échec'),
+    ]
+
     dossierID = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     patient = models.OneToOneField(Patient, on_delete=models.CASCADE)
     createdAt = models.DateField(auto_now_add=True)
     active = models.BooleanField(default=True)
-    qrCode = models.CharField(max_length=10000)
+    qrCode = models.CharField(max_length=10000, blank=True, default='')
+    qrToken = models.CharField(max_length=32, unique=True, default=generate_qr_token, editable=False)
+    qrStatus = models.CharField(max_length=20, choices=QR_STATUS_CHOICES, default='en_attente')
 
     def __str__(self):
         return f"Dossier de {self.patient}"
+
+class ScopedQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # Bulk inserts skip save(): copy the patient and hospital keys here
+        objs = list(objs)
+        self.model.fill_scopes(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class PatientScopedModel(models.Model):
+    """
+    Clinical record carrying copies of the keys of its patient and of the
+    patient's hospital, so role-scoped queries and permission checks filter
+    the table itself instead of walking consultation__dossier__patient.
+
+    The keys are copied from the `scope_parent` record when the row is
+    created, by save() and bulk_create(); moving a patient to another
+    hospital updates them (see signals).
+    """
+    patient = models.ForeignKey('Patient', on_delete=models.CASCADE, null=True, editable=False, related_name='+')
+    centreHospitalier = models.ForeignKey(CentreHospitalier, on_delete=models.CASCADE, null=True, editable=False, related_name='+')
+
+    # Foreign key the keys are copied from, and the lookups reading them from
+    # the model it points to
+    scope_parent = 'consultation'
+    scope_lookups = ('patient_id', 'centreHospitalier_id')
+
+    objects = ScopedQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def scope_of(cls, parent):
+        """
+        (patient_id, centreHospitalier_id) of an already loaded parent, or
+        None when reading them would take a query.
+        """
+        if parent.patient_id is None:
+            return None
+        return parent.patient_id, parent.centreHospitalier_id
+
+    @classmethod
+    def fill_scopes(cls, objs):
+        """
+        Copies the keys of the parents of `objs` that lack them, reading the
+        parents that are not loaded in a single query.
+        """
+        parent_field = cls._meta.get_field(cls.scope_parent)
+        to_python = parent_field.target_field.to_python
+        missing = {}
+        for obj in objs:
+            if obj.patient_id is not None:
+                continue
+            parent = parent_field.get_cached_value(obj, None)
+            scope = cls.scope_of(parent) if parent is not None else None
+            if scope is None:
+                missing.setdefault(to_python(getattr(obj, parent_field.attname)), []).append(obj)
+            else:
+                obj.patient_id, obj.centreHospitalier_id = scope
+        if not missing:
+            return
+        rows = parent_field.related_model.objects.filter(pk__in=missing).values_list('pk', *cls.scope_lookups)
+        for parent_id, patient_id, centre_id in rows:
+            for obj in missing[parent_id]:
+                obj.patient_id, obj.centreHospitalier_id = patient_id, centre_id
+
+    def save(self, *args, **kwargs):
+        if self.patient_id is None:
+            self.fill_scopes([self])
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'patient', 'centreHospitalier'}
+        super().save(*args, **kwargs)
+
+
 # Consultation Model
-class Consultation(models.Model):
+class Consultation(PatientScopedModel):
     STATUS_CHOICES = [
         ('planifie', 'Planifiée'),
         ('en_cours', 'En Cours'),
@@ -162,16 +260,35 @@ class Consultation(models.Model):
     resume = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
 
+    scope_parent = 'dossier'
+    scope_lookups = ('patient_id', 'patient__centreHospitalier_id')
+
+    @classmethod
+    def scope_of(cls, dossier):
+        patient = DossierMedical._meta.get_field('patient').get_cached_value(dossier, None)
+        if patient is None:
+            return None
+        return patient.pk, patient.centreHospitalier_id
+
     def __str__(self):
         return f"Consultation {self.consultationID} - {self.status}"
 
 # Ordonnance Model
-class Ordonnance(models.Model):
+class Ordonnance(PatientScopedModel):
     ordonnanceID = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     consultation = models.ForeignKey(Consultation, on_delete=models.CASCADE)
     valide = models.BooleanField(default=False)
     dateCreation = models.DateField(auto_now_add=True)
     dateExpiration = models.DateField(null=True, blank=True)
+    # Bumped on every change to the ordonnance or its lines; drives the SGPH change feed
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updatedAt', 'ordonnanceID'], name='ordonnance_feed_idx'),
+            # Ordonnances waiting for the pharmacy
+            models.Index(fields=['valide', 'dateCreation'], name='ordonnance_pending_idx'),
+        ]
 
     def __str__(self):
         return f"Ordonnance {self.ordonnanceID}"
@@ -218,7 +335,7 @@ class OrdonnanceMedicament(models.Model):
 
 
 # ActiviteInfermier Model
-class ActiviteInfermier(models.Model):
+class ActiviteInfermier(PatientScopedModel):
     TYPE_ACTIVITE_CHOICES = [
         ('administration_medicament', 'Administration de Médicament'),
         ('soins', 'Soins'),
@@ -243,13 +360,19 @@ class ActiviteInfermier(models.Model):
     createdAt = models.DateField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
 
+    class Meta:
+        indexes = [
+            # A nurse's worklist and history, newest first
+            models.Index(fields=['infermier', 'status', 'createdAt'], name='activite_nurse_idx'),
+        ]
+
     def __str__(self):
         return f"Activité {self.typeActivite} pour {self.infermier}"
 
 
 
 # ResultatLabo Model
-class ResultatLabo(models.Model):
+class ResultatLabo(PatientScopedModel):
     STATUS_CHOICES = [
         ('en_cours', 'En Cours'),
         ('termine', 'Terminé'),
@@ -263,6 +386,14 @@ class ResultatLabo(models.Model):
     dateAnalyse = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES)
 
+    scope_parent = 'examen'
+
+    class Meta:
+        indexes = [
+            # A patient's lab history, latest analysis first
+            models.Index(fields=['patient', 'dateAnalyse'], name='resultatlabo_history_idx'),
+        ]
+
     def __str__(self):
         return f"Résultat Labo {self.resLaboID} - {self.status}"
 
@@ -288,7 +419,7 @@ class HealthMetrics(models.Model):
         return f"{self.metric_type} - {self.value} {self.unit}"
 
 # Examen Model
-class Examen(models.Model):
+class Examen(PatientScopedModel):
     TYPE_CHOICES = [
         ('labo', 'Laboratoire'),
         ('radio', 'Radiologie'),
@@ -313,12 +444,31 @@ class Examen(models.Model):
     # to be updated later , with radiologue_id in ResultatRadio not here , i did null here cz it may be null in case of labo
     radiologue = models.ForeignKey(Radiologue, on_delete=models.CASCADE, null=True, blank=True)
     laborantin = models.ForeignKey(Laboratin, on_delete=models.CASCADE, null=True, blank=True)
-    # patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     doctor_details = models.TextField(blank=True, null=True)
     type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     createdAt = models.DateField(auto_now_add=True)
     etat = models.CharField(max_length=20, choices=ETAT_CHOICES)
     priorite = models.CharField(max_length=20, choices=PRIORITE_CHOICES)
+    # Sort key of priorite for the worklists, most urgent first; computed by
+    # the database so bulk writes keep it in sync
+    prioriteRank = models.GeneratedField(
+        expression=models.Case(
+            models.When(priorite='tres_urgent', then=models.Value(0)),
+            models.When(priorite='urgent', then=models.Value(1)),
+            default=models.Value(2),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['laborantin', 'etat', 'prioriteRank', 'createdAt'], name='examen_lab_worklist_idx'),
+            # Lab exam lists and the per-state counts of the worklist
+            models.Index(fields=['laborantin', 'type', 'etat'], name='examen_lab_state_idx'),
+            # A radiologist's exams and history, newest first
+            models.Index(fields=['radiologue', 'etat', 'createdAt'], name='examen_radio_worklist_idx'),
+        ]
 
     def __str__(self):
         return f"Examen {self.type} pour {self.consultation.dossier.patient}"
@@ -335,10 +485,22 @@ class ResultatRadio(models.Model):
         ('irm', 'IRM'),
     ]
 
+    UPLOAD_STATUS_CHOICES = [
+        ('en_attente', 'En Attente'),
+        ('en_cours', 'En Cours'),
+        ('televerse', 'Téléversé'),
+        ('echec', 'Échec'),
+    ]
+
     resRadioID = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     # radiologue = models.ForeignKey(Radiologue, on_delete=models.CASCADE)
     examen = models.ForeignKey(Examen, on_delete=models.CASCADE)
     radioImgURL = models.TextField(blank=True, null=True)
+    uploadStatus = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES, default='televerse')
+    # Staged file (or remote URL) waiting to be pushed to the storage backend
+    stagedImage = models.CharField(max_length=500, blank=True, default='')
+    # When the current upload attempt claimed the result ('en_cours')
+    uploadStartedAt = models.DateTimeField(blank=True, null=True)
     type = models.CharField(max_length=20, choices=RESRADIO_TYPE_CHOICES)
     rapport = models.TextField()
     dateRealisation = models.DateField(auto_now_add=True)
@@ -349,3 +511,45 @@ class ResultatRadio(models.Model):
 
 
     
+
+
+# DossierSnapshot Model
+class DossierSnapshot(models.Model):
+    """
+    Materialized DossierMedicalDetailSerializer payload of a dossier, keyed by
+    patient so the medical file is served with a single primary-key fetch.
+    """
+    patient = models.OneToOneField(Patient, on_delete=models.CASCADE, primary_key=True)
+    dossier = models.OneToOneField(DossierMedical, on_delete=models.CASCADE)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # number of committed writes whose refresh has not been applied yet
+    pendingUpdates = models.PositiveIntegerField(default=0)
+    updatedAt = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot du {self.dossier}"
+
+
+# PatientSearchTerm Model
+class PatientSearchTerm(models.Model):
+    """
+    Search index over normalized patient names and NSS, maintained on Patient writes.
+    """
+    KIND_CHOICES = [
+        ('mot', 'Mot'),
+        ('trigramme', 'Trigramme'),
+        ('nss', 'NSS'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term', 'patient'], name='patient_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.term} -> {self.patient_id}"
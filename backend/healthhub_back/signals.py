@@ -0,0 +1,225 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from healthhub_back.models import (
+    ActiviteInfermier,
+    CentreHospitalier,
+    Consultation,
+    DossierMedical,
+    Examen,
+    HealthMetrics,
+    Laboratin,
+    Medecin,
+    Medicament,
+    Ordonnance,
+    OrdonnanceMedicament,
+    Patient,
+    Radiologue,
+    ResultatLabo,
+    ResultatRadio,
+    User,
+)
+from healthhub_back.accounts.doctor.exam_assignment import exam_board
+from healthhub_back.accounts.patient.patient_service import schedule_snapshot_drop, schedule_snapshot_refresh
+from healthhub_back.common.auth.authentication import token_cache
+from healthhub_back.common.search.medicament_index import schedule_index_update
+from healthhub_back.common.search.patient_index import index_patient
+
+
+########################### Medical file snapshots ############################
+
+# How to reach the owning consultation from each model of the medical file:
+# (foreign key attribute, model it points to, lookup prefix from that model)
+CONSULTATION_PATHS = {
+    Ordonnance: ('consultation_id', Consultation, ''),
+    Examen: ('consultation_id', Consultation, ''),
+    ActiviteInfermier: ('consultation_id', Consultation, ''),
+    OrdonnanceMedicament: ('ordonnance_id', Ordonnance, 'consultation__'),
+    ResultatLabo: ('examen_id', Examen, 'consultation__'),
+    ResultatRadio: ('examen_id', Examen, 'consultation__'),
+    HealthMetrics: ('resLabo_id', ResultatLabo, 'examen__consultation__'),
+}
+
+
+def _owning_consultation(instance):
+    """
+    Returns (consultationID, dossier_id) of the consultation a record belongs to.
+    """
+    if isinstance(instance, Consultation):
+        return instance.consultationID, instance.dossier_id
+
+    attname, parent_model, prefix = CONSULTATION_PATHS[type(instance)]
+    parent_id = getattr(instance, attname)
+    if parent_id is None:
+        return None
+    return parent_model.objects.filter(pk=parent_id).values_list(
+        f'{prefix}pk', f'{prefix}dossier_id'
+    ).first()
+
+
+@receiver([post_save, post_delete], sender=Consultation)
+@receiver([post_save, post_delete], sender=Ordonnance)
+@receiver([post_save, post_delete], sender=OrdonnanceMedicament)
+@receiver([post_save, post_delete], sender=Examen)
+@receiver([post_save, post_delete], sender=ResultatLabo)
+@receiver([post_save, post_delete], sender=HealthMetrics)
+@receiver([post_save, post_delete], sender=ResultatRadio)
+@receiver([post_save, post_delete], sender=ActiviteInfermier)
+def refresh_consultation_snapshot(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    owner = _owning_consultation(instance)
+    if owner is None:
+        return
+    consultation_id, dossier_id = owner
+    schedule_snapshot_refresh(dossier_id, consultation_id, using=using)
+
+
+@receiver(post_save, sender=DossierMedical)
+def refresh_dossier_snapshot(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    schedule_snapshot_refresh(instance.dossierID, using=using)
+
+
+@receiver(post_save, sender=Patient)
+def refresh_patient_snapshot(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    dossier_id = DossierMedical.objects.filter(patient=instance).values_list('pk', flat=True).first()
+    if dossier_id is not None:
+        schedule_snapshot_refresh(dossier_id, using=using)
+
+
+@receiver(post_save, sender=Medicament)
+def refresh_medicament_snapshots(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw or created:
+        return
+    consultations = Consultation.objects.filter(
+        ordonnance__ordonnancemedicament__med=instance
+    ).values_list('consultationID', 'dossier_id').distinct()
+    for consultation_id, dossier_id in consultations:
+        schedule_snapshot_refresh(dossier_id, consultation_id, using=using)
+
+
+# Fields of the staff and hospital records the snapshots embed (names,
+# specialites, contact), and the lookup from DossierMedical to those records
+EMBEDDED_RECORDS = {
+    Medecin: ({'specialite', 'telephone', 'user'}, 'patient__medecin'),
+    Laboratin: ({'specialite'}, 'consultation__examen__resultatlabo__laboratin'),
+    Radiologue: ({'specialite'}, 'consultation__examen__radiologue'),
+    CentreHospitalier: ({'nom', 'place'}, 'patient__centreHospitalier'),
+}
+
+# Staff names come from their User, by role
+EMBEDDED_USER_FIELDS = {'first_name', 'last_name'}
+EMBEDDED_USER_LOOKUPS = {
+    'medecin': 'patient__medecin__user',
+    'infermier': 'consultation__activiteinfermier__infermier__user',
+    'laborantin': 'consultation__examen__resultatlabo__laboratin__user',
+    'radiologue': 'consultation__examen__radiologue__user',
+}
+
+
+@receiver(post_save, sender=Medecin)
+@receiver(post_save, sender=Laboratin)
+@receiver(post_save, sender=Radiologue)
+@receiver(post_save, sender=CentreHospitalier)
+def drop_embedding_snapshots(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    fields, lookup = EMBEDDED_RECORDS[sender]
+    if raw or created or (update_fields is not None and fields.isdisjoint(update_fields)):
+        return
+    schedule_snapshot_drop(DossierMedical.objects.filter(**{lookup: instance.pk}), using=using)
+
+
+@receiver(post_save, sender=User)
+def drop_staff_name_snapshots(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+    # Logins only save last_login
+    lookup = EMBEDDED_USER_LOOKUPS.get(instance.role)
+    if raw or created or lookup is None:
+        return
+    if update_fields is not None and EMBEDDED_USER_FIELDS.isdisjoint(update_fields):
+        return
+    schedule_snapshot_drop(DossierMedical.objects.filter(**{lookup: instance.pk}), using=using)
+
+
+########################### Denormalized patient keys #########################
+
+SCOPED_MODELS = [Consultation, Ordonnance, Examen, ActiviteInfermier, ResultatLabo]
+
+
+@receiver(post_save, sender=Patient)
+def follow_patient_transfer(sender, instance, created, raw=False, **kwargs):
+    # Clinical records copy the patient's hospital; move them with the patient
+    if raw or created:
+        return
+    moved = Consultation.objects.filter(patient=instance).exclude(centreHospitalier=instance.centreHospitalier_id)
+    if not moved.exists():
+        return
+    for model in SCOPED_MODELS:
+        model.objects.filter(patient=instance).update(centreHospitalier=instance.centreHospitalier_id)
+
+
+########################### Patient search index ##############################
+
+# Patient fields the search index is built from
+INDEXED_PATIENT_FIELDS = {'nom', 'prenom', 'NSS'}
+
+
+@receiver(post_save, sender=Patient)
+def index_patient_search_terms(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and INDEXED_PATIENT_FIELDS.isdisjoint(update_fields)):
+        return
+    index_patient(instance)
+
+
+########################### Medicament autocomplete index #####################
+
+@receiver(post_save, sender=Medicament)
+def index_medicament(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_index_update(medicaments=[instance])
+
+
+@receiver(post_delete, sender=Medicament)
+def unindex_medicament(sender, instance, **kwargs):
+    schedule_index_update(removed_ids=[instance.pk])
+
+
+########################### Exam assignment board ############################
+
+@receiver([post_save, post_delete], sender=Laboratin)
+@receiver([post_save, post_delete], sender=Radiologue)
+def invalidate_exam_board(sender, instance, raw=False, **kwargs):
+    # Staff changes are rare: reload the loads instead of patching the heaps
+    if raw:
+        return
+    transaction.on_commit(exam_board.invalidate)
+
+
+########################### SGPH change feed ##################################
+
+@receiver([post_save, post_delete], sender=OrdonnanceMedicament)
+def touch_ordonnance(sender, instance, raw=False, **kwargs):
+    # A changed line is a change of the ordonnance for the pharmacy feed
+    if raw:
+        return
+    Ordonnance.objects.filter(pk=instance.ordonnance_id).update(updatedAt=timezone.now())
+
+
+########################### Token authentication cache ########################
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    # Logout and password changes delete the token
+    token_cache.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user_tokens(sender, instance, **kwargs):
+    # Role, hospital or activation changes must not be served from the cache
+    token_cache.invalidate_user(instance.pk)
@@ -0,0 +1,149 @@
+import sys
+from collections import defaultdict
+from contextlib import ExitStack
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from rest_framework.serializers import Serializer
+from healthhub_back.common.profiling import fingerprint
+from healthhub_back.models import CentreHospitalier, Consultation, DossierMedical, Medecin, Patient
+
+User = get_user_model()
+
+# Serializer fields known to run one query per row, as reported by the N+1
+# detector ("SerializerClass.field.subfield"). Prefer fixing the queryset.
+N_PLUS_ONE_ALLOWLIST = set()
+
+_TO_REPRESENTATION = Serializer.to_representation.__code__
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'allow_repeated_queries(*paths): let the listed serializer field paths, '
+        'or every query when none is given, repeat within a request',
+    )
+
+
+def serializer_field_path():
+    """
+    Path of the serializer field being rendered, from the outermost
+    serializer class down ("DossierMedicalDetailSerializer.consultations.examens"),
+    or None outside of serializers.
+    """
+    fields = []
+    owner = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code is _TO_REPRESENTATION:
+            field = frame.f_locals.get('field')
+            if field is not None:
+                fields.append(field.field_name)
+            owner = type(frame.f_locals['self']).__name__
+        frame = frame.f_back
+    if owner is None:
+        return None
+    return '.'.join([owner, *reversed(fields)])
+
+
+class QueryShapeRecorder:
+    """
+    Groups the queries of each request handled by the test client by shape,
+    with the serializer field paths that ran them.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.current = None
+
+    def start(self, **kwargs):
+        self.current = defaultdict(list)
+        self.requests.append(self.current)
+
+    def finish(self, **kwargs):
+        self.current = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.current is not None:
+            self.current[fingerprint(sql)].append(serializer_field_path())
+        return execute(sql, params, many, context)
+
+    def repeated(self, allowed):
+        """
+        (field path, query shape, count) of the shapes a request ran more than
+        once from the same serializer field.
+        """
+        found = []
+        for shapes in self.requests:
+            for sql, paths in shapes.items():
+                for path in set(paths) - {None} - allowed:
+                    count = paths.count(path)
+                    if count > 1:
+                        found.append((path, sql, count))
+        return found
+
+
+@pytest.fixture(autouse=True)
+def detect_n_plus_one(request):
+    """
+    Fails a test when a request it makes runs the same query shape several
+    times from the same serializer field: the signature of a query per row.
+    """
+    marker = request.node.get_closest_marker('allow_repeated_queries')
+    if marker is not None and not marker.args:
+        yield
+        return
+
+    recorder = QueryShapeRecorder()
+    request_started.connect(recorder.start)
+    request_finished.connect(recorder.finish)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        try:
+            yield
+        finally:
+            request_started.disconnect(recorder.start)
+            request_finished.disconnect(recorder.finish)
+
+    repeated = recorder.repeated(N_PLUS_ONE_ALLOWLIST | set(marker.args if marker else ()))
+    if repeated:
+        pytest.fail('Repeated queries (N+1) in a request:\n' + '\n'.join(
+            f'  {path}: {count}x {sql[:200]}' for path, sql, count in repeated
+        ), pytrace=False)
+
+
+@pytest.fixture
+def medical_file():
+    """
+    (patient, dossier, consultation): a patient of the "medecin" doctor, both
+    logging in with password 1234, with a medical file and one consultation.
+    """
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    medecin_user = User.objects.create_user(username="medecin", password="1234", email="medecin@example.com", role="medecin", centreHospitalier=centre)
+    medecin = Medecin.objects.create(user=medecin_user, specialite="generaliste", telephone="123456789")
+    patient_user = User.objects.create_user(username="patient", password="1234", email="patient@example.com", role="patient", centreHospitalier=centre)
+    patient = Patient.objects.create(
+        user=patient_user,
+        NSS=123456789,
+        nom="Doe",
+        prenom="John",
+        dateNaissance="1990-01-01",
+        adresse="123 Test Street",
+        telephone="123456789",
+        mutuelle="Mutuelle Test",
+        contactUrgence="Emergency Contact",
+        medecin=medecin,
+        centreHospitalier=centre
+    )
+    dossier = DossierMedical.objects.create(patient=patient)
+    consultation = Consultation.objects.create(
+        dossier=dossier,
+        dateConsultation="2025-01-01",
+        diagnostic="Test Diagnostic",
+        resume="Test Resume",
+        status="planifie"
+    )
+    return patient, dossier, consultation
@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.common.mysqlpool import pool as pools
+from healthhub_back.common.mysqlpool.pool import ConnectionPool, PoolTimeout, get_pool
+from healthhub_back.models import CentreHospitalier, User
+
+
+class FakeConnection:
+    """
+    Stands for a mysqlclient connection: the pool only pings and closes them.
+    """
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError("MySQL server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("healthhub_back.common.mysqlpool.pool.time.monotonic", lambda: now[0])
+    return now
+
+
+def test_connections_are_reused():
+    pool = ConnectionPool(FakeConnection, max_size=2)
+    first, opened = pool.checkout()
+    assert opened
+    pool.checkin(first)
+
+    assert pool.checkout() == (first, False)
+    stats = pool.stats()
+    assert stats["opened"] == 1 and stats["reused"] == 1
+    assert stats["size"] == 1 and stats["in_use"] == 1
+
+
+def test_checkouts_wait_for_a_free_connection():
+    pool = ConnectionPool(FakeConnection, max_size=1, timeout=0.05)
+    connection, _opened = pool.checkout()
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+
+    pool.timeout = 5
+    threading.Timer(0.05, pool.checkin, [connection]).start()
+    assert pool.checkout() == (connection, False)
+    stats = pool.stats()
+    assert stats["waits"] == 2 and stats["timeouts"] == 1 and stats["opened"] == 1
+
+
+def test_dead_and_old_connections_are_replaced(clock):
+    pool = ConnectionPool(FakeConnection, max_size=1, max_lifetime=60)
+    dead, _opened = pool.checkout()
+    pool.checkin(dead)
+    dead.alive = False
+
+    fresh, opened = pool.checkout()
+    assert opened and fresh is not dead and dead.closed
+    pool.checkin(fresh)
+
+    clock[0] += 60
+    old = fresh
+    fresh, opened = pool.checkout()
+    assert opened and old.closed
+    assert pool.stats()["failed_checks"] == 1 and pool.stats()["closed"] == 2
+
+
+def test_idle_connections_above_min_size_are_closed(clock):
+    pool = ConnectionPool(FakeConnection, min_size=1, max_size=3, max_idle=30)
+    pool.fill()
+    connections = [pool.checkout()[0] for _ in range(3)]
+    for connection in connections:
+        pool.checkin(connection)
+    assert pool.stats()["idle"] == 3
+
+    clock[0] += 30
+    busy, _opened = pool.checkout()
+    pool.checkin(busy)
+    # The least recently returned go first; min_size stay open
+    assert pool.stats()["size"] == 1
+    assert [connection.closed for connection in connections] == [True, True, False]
+
+
+@pytest.mark.django_db
+def test_admins_read_the_pool_metrics(monkeypatch):
+    monkeypatch.setattr(pools, "_pools", {})
+    pool = get_pool("default", FakeConnection, {"min_size": 2, "max_size": 5})
+    assert pool.stats()["idle"] == 2
+
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    User.objects.create_user(username="admin", password="1234", email="admin@example.com", role="admin", centreHospitalier=centre)
+    client = APIClient()
+    client.login(username="admin", password="1234")
+    response = client.get(reverse("db-pool-metrics"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["default"]["size"] == 2 and response.data["default"]["max_size"] == 5
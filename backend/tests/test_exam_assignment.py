@@ -0,0 +1,114 @@
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import CentreHospitalier, Examen, Radiologue, User
+from healthhub_back.accounts.doctor.exam_assignment import exam_board, schedule_load_change
+
+
+@pytest.fixture(autouse=True)
+def fresh_board():
+    # The board is per process and outlives the rolled back test transactions
+    exam_board.invalidate()
+    yield
+    exam_board.invalidate()
+
+
+def create_radiologue(username, centre, specialite="scanner", shift="jour", nombre_tests=0):
+    user = User.objects.create_user(username=username, password="1234", email=f"{username}@example.com", role="radiologue", centreHospitalier=centre)
+    return Radiologue.objects.create(user=user, specialite=specialite, shift=shift, telephone="123456789", nombreTests=nombre_tests)
+
+
+@pytest.mark.django_db
+def test_board_picks_least_loaded_match(django_assert_num_queries):
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    busy = create_radiologue("busy", centre, nombre_tests=5)
+    idle = create_radiologue("idle", centre, nombre_tests=3)
+    night = create_radiologue("night", centre, shift="nuit", nombre_tests=0)
+    irm = create_radiologue("irm", centre, specialite="irm", nombre_tests=0)
+
+    assert exam_board.assign("radio", centre.pk, specialite="scanner", shift="jour") == idle.pk
+    # Loaded once per hospital, then answered from memory
+    with django_assert_num_queries(0):
+        # Assigning counts the exam right away
+        assert exam_board.load_of("radio", idle.pk) == 4
+        exam_board.adjust("radio", idle.pk, 2)
+        assert exam_board.assign("radio", centre.pk, specialite="scanner", shift="jour") == busy.pk
+        assert exam_board.assign("radio", centre.pk, specialite="scanner") == night.pk
+        assert exam_board.assign("radio", centre.pk, specialite="irm") == irm.pk
+        assert exam_board.assign("radio", centre.pk, specialite="echographie") is None
+        assert exam_board.load_of("radio", busy.pk) == 6
+
+
+@pytest.mark.django_db
+def test_uncommitted_assignments_spread_over_the_technicians():
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    first = create_radiologue("first", centre, nombre_tests=1)
+    second = create_radiologue("second", centre, nombre_tests=1)
+    third = create_radiologue("third", centre, nombre_tests=2)
+
+    # A burst of orders inside one transaction, nothing committed yet
+    with transaction.atomic():
+        assigned = [exam_board.assign("radio", centre.pk) for _ in range(5)]
+    assert sorted(assigned) == sorted([first.pk, first.pk, second.pk, second.pk, third.pk])
+    assert [exam_board.load_of("radio", staff.pk) for staff in (first, second, third)] == [3, 3, 3]
+
+
+@pytest.mark.django_db
+def test_rolled_back_exams_leave_the_load_unchanged(django_capture_on_commit_callbacks):
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    radiologue = create_radiologue("solo", centre, nombre_tests=2)
+    other = create_radiologue("other", centre, nombre_tests=5)
+
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with pytest.raises(RuntimeError), transaction.atomic():
+            for _ in range(2):
+                assert exam_board.assign("radio", centre.pk) == radiologue.pk
+            assert exam_board.load_of("radio", radiologue.pk) == 4
+            raise RuntimeError
+    assert callbacks == []
+    assert exam_board.load_of("radio", radiologue.pk) == 2
+
+    # Committed reservations stay counted
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            assert exam_board.assign("radio", centre.pk) == radiologue.pk
+    assert exam_board.load_of("radio", radiologue.pk) == 3
+    assert exam_board.load_of("radio", other.pk) == 5
+
+    schedule_load_change("radio", other.pk, -1)
+    with django_capture_on_commit_callbacks(execute=True):
+        with transaction.atomic():
+            schedule_load_change("radio", other.pk, -1)
+    assert exam_board.load_of("radio", other.pk) == 4
+
+
+@pytest.mark.django_db
+def test_exam_is_assigned_to_least_loaded_radiologue(django_capture_on_commit_callbacks, medical_file):
+    patient, dossier, consultation = medical_file
+    centre = patient.centreHospitalier
+    other_centre = CentreHospitalier.objects.create(nom="Autre Centre", place="Elsewhere")
+    create_radiologue("elsewhere", other_centre, nombre_tests=0)
+    first = create_radiologue("first", centre, nombre_tests=2)
+    second = create_radiologue("second", centre, nombre_tests=1)
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("examination-create", kwargs={"consultation_id": consultation.pk})
+    payload = {"type": "radio", "priorite": "urgent", "doctor_details": "Scanner thoracique", "auto_assign": True, "specialite": "scanner"}
+
+    for _ in range(3):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client.post(url, payload, format="json")
+        assert response.status_code == status.HTTP_201_CREATED
+    assigned = list(Examen.objects.values_list("radiologue_id", flat=True))
+    assert sorted(assigned) == sorted([second.pk, first.pk, second.pk])
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.nombreTests, second.nombreTests) == (3, 3)
+
+    response = client.post(url, {**payload, "specialite": "irm"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "radiologue_id" in response.data
+    assert client.post(url, {**payload, "specialite": "biochimie"}, format="json").status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Examen, HealthMetrics, Laboratin, ResultatLabo, User
+
+
+def create_series(consultation, start, values, metric_type="glycemie"):
+    """
+    One measurement per day from `start`, written in bulk (measured_at is auto_now_add).
+    """
+    user = User.objects.create_user(username=f"labo-{metric_type}", password="1234", email=f"labo-{metric_type}@example.com", role="laborantin", centreHospitalier=consultation.dossier.patient.centreHospitalier)
+    laborantin = Laboratin.objects.create(user=user, shift="jour", specialite="biochimie", telephone="123456789")
+    examen = Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="termine", priorite="normal")
+    resultat = ResultatLabo.objects.create(examen=examen, laboratin=laborantin, resultat="RAS", dateAnalyse=start, status="termine")
+    metrics = HealthMetrics.objects.bulk_create([
+        HealthMetrics(resLabo=resultat, metric_type=metric_type, value=Decimal(value), unit="g/L")
+        for value in values
+    ])
+    for day, metric in enumerate(metrics):
+        metric.measured_at = start + timedelta(days=day)
+    HealthMetrics.objects.bulk_update(metrics, ["measured_at"])
+
+
+@pytest.fixture
+def patient_client(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    return client, patient, consultation
+
+
+@pytest.mark.django_db
+def test_weekly_series_aggregates_in_one_query(patient_client, django_assert_max_num_queries):
+    client, patient, consultation = patient_client
+    # Monday 2024-01-01, two full weeks
+    create_series(consultation, date(2024, 1, 1), ["1.00", "2.00", "3.00", "4.00", "5.00", "6.00", "7.00"] + ["10.00"] * 7)
+    create_series(consultation, date(2024, 1, 1), ["99.00"], metric_type="niveaux_cholesterol")
+    url = reverse("patient-health-metrics", kwargs={"patient_id": patient.pk, "metric_type": "glycemie"})
+
+    # Session, user, series
+    with django_assert_max_num_queries(3):
+        response = client.get(url, {"bucket": "week"})
+
+    assert response.status_code == status.HTTP_200_OK
+    first, second = response.data["points"]
+    assert (first["start"], first["end"]) == (date(2024, 1, 1), date(2024, 1, 7))
+    assert (first["min"], first["max"], first["mean"], first["count"]) == (1.0, 7.0, 4.0, 7)
+    assert (second["min"], second["max"], second["mean"], second["count"]) == (10.0, 10.0, 10.0, 7)
+
+
+@pytest.mark.django_db
+def test_series_is_downsampled_and_bounded(patient_client):
+    client, patient, consultation = patient_client
+    create_series(consultation, date(2024, 1, 1), [f"{day}.00" for day in range(1, 11)])
+    url = reverse("patient-health-metrics", kwargs={"patient_id": patient.pk, "metric_type": "glycemie"})
+
+    response = client.get(url, {"points": 3, "start": "2024-01-02"})
+    assert response.data["buckets_per_point"] == 3
+    assert [(p["min"], p["max"], p["mean"], p["count"]) for p in response.data["points"]] == [
+        (2.0, 4.0, 3.0, 3), (5.0, 7.0, 6.0, 3), (8.0, 10.0, 9.0, 3),
+    ]
+
+    assert client.get(url, {"bucket": "year"}).status_code == status.HTTP_400_BAD_REQUEST
+    unknown = reverse("patient-health-metrics", kwargs={"patient_id": patient.pk, "metric_type": "poids"})
+    assert client.get(unknown).status_code == status.HTTP_400_BAD_REQUEST
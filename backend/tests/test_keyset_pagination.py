@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import date, timedelta
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from healthhub_back.models import (
+    CentreHospitalier, Medecin, Infermier, Patient, DossierMedical, Consultation, ActiviteInfermier
+)
+
+User = get_user_model()
+
+
+def create_activities(count):
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    medecin_user = User.objects.create_user(username="medecin", password="1234", email="medecin@example.com", role="medecin", centreHospitalier=centre)
+    medecin = Medecin.objects.create(user=medecin_user, specialite="generaliste", telephone="123456789")
+    infermier_user = User.objects.create_user(username="infermier", password="1234", email="infermier@example.com", role="infermier", centreHospitalier=centre)
+    infermier = Infermier.objects.create(user=infermier_user, shift="jour", specialite="generale", telephone="123456789")
+    patient_user = User.objects.create_user(username="patient", password="1234", email="patient@example.com", role="patient", centreHospitalier=centre)
+    patient = Patient.objects.create(
+        user=patient_user,
+        NSS=123456789,
+        nom="Doe",
+        prenom="John",
+        dateNaissance="1990-01-01",
+        adresse="123 Test Street",
+        telephone="123456789",
+        mutuelle="Mutuelle Test",
+        contactUrgence="Emergency Contact",
+        medecin=medecin,
+        centreHospitalier=centre
+    )
+    dossier = DossierMedical.objects.create(patient=patient)
+    consultation = Consultation.objects.create(
+        dossier=dossier,
+        dateConsultation="2025-01-01",
+        diagnostic="Test Diagnostic",
+        resume="Test Resume",
+        status="planifie"
+    )
+    activities = ActiviteInfermier.objects.bulk_create([
+        ActiviteInfermier(
+            consultation=consultation,
+            infermier=infermier,
+            typeActivite="soins",
+            doctors_details="Pansement",
+            nurse_observations="",
+            status="termine",
+        )
+        for _ in range(count)
+    ])
+    # Several activities share each date, so the primary key has to break ties
+    for n, activity in enumerate(activities):
+        ActiviteInfermier.objects.filter(pk=activity.pk).update(createdAt=date(2025, 1, 1) + timedelta(days=n // 4))
+    return activities
+
+
+@pytest.mark.django_db
+def test_nurse_history_pages_with_keyset_cursor():
+    activities = create_activities(23)
+    client = APIClient()
+    client.login(username="infermier", password="1234")
+
+    seen = []
+    url = reverse("activity_history") + "?page_size=10"
+    while url:
+        response = client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data["results"]) <= 10
+        seen.extend(row["activities"][0]["id"] for row in response.data["results"])
+        url = response.data["next"]
+
+    assert len(seen) == len(set(seen)) == 23
+    newest = ActiviteInfermier.objects.order_by("-createdAt", "-pk").values_list("pk", flat=True)
+    assert seen == [str(pk) for pk in newest]
+
+
+@pytest.mark.django_db
+def test_invalid_cursor_is_rejected():
+    create_activities(3)
+    client = APIClient()
+    client.login(username="infermier", password="1234")
+
+    response = client.get(reverse("activity_history"), {"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_tampered_cursor_values_are_rejected():
+    create_activities(3)
+    client = APIClient()
+    client.login(username="infermier", password="1234")
+
+    for values in (["garbage", "x"], ["2025-01-01 00:00:00+00:00", "x"], [1, 2]):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get(reverse("activity_history"), {"cursor": cursor})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
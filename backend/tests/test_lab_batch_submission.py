@@ -0,0 +1,87 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Examen, HealthMetrics, Laboratin, ResultatLabo, User
+
+
+def create_laborantin(consultation, nombre_tests):
+    user = User.objects.create_user(username="laborantin", password="1234", email="laborantin@example.com", role="laborantin", centreHospitalier=consultation.dossier.patient.centreHospitalier)
+    return Laboratin.objects.create(user=user, shift="jour", specialite="biochimie", telephone="123456789", nombreTests=nombre_tests)
+
+
+def result(examen, value="0.95"):
+    return {
+        "examen": str(examen.pk),
+        "resultat": "Glycémie normale",
+        "status": "termine",
+        "health_metrics": [
+            {"metric_type": "glycemie", "value": value, "unit": "g/L"},
+            {"metric_type": "niveaux_cholesterol", "value": "1.80", "unit": "g/L"},
+        ],
+    }
+
+
+@pytest.fixture
+def laborantin_client(medical_file):
+    patient, dossier, consultation = medical_file
+    laborantin = create_laborantin(consultation, nombre_tests=3)
+    client = APIClient()
+    client.login(username="laborantin", password="1234")
+    return client, laborantin, consultation
+
+
+@pytest.mark.django_db
+def test_batch_submission_reports_each_exam(laborantin_client):
+    client, laborantin, consultation = laborantin_client
+    exams = [
+        Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="planifie", priorite="normal")
+        for _ in range(4)
+    ]
+    radio = Examen.objects.create(consultation=consultation, type="radio", etat="planifie", priorite="normal")
+
+    response = client.post(reverse("submit-lab-tests-batch"), {
+        "results": [result(examen) for examen in exams] + [result(radio)],
+    }, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["outcomes"] == {
+        str(exams[0].pk): "submitted",
+        str(exams[1].pk): "submitted",
+        str(exams[2].pk): "submitted",
+        str(exams[3].pk): "no_remaining_tests",
+        str(radio.pk): "not_found",
+    }
+    assert response.data["nombreTests"] == 0
+    laborantin.refresh_from_db()
+    assert laborantin.nombreTests == 0
+    assert set(Examen.objects.filter(type="labo", etat="termine")) == set(exams[:3])
+    assert ResultatLabo.objects.count() == 3
+    assert HealthMetrics.objects.filter(resLabo__examen=exams[0]).count() == 2
+
+
+@pytest.mark.django_db
+def test_batch_submission_runs_in_constant_queries(laborantin_client, django_assert_max_num_queries):
+    client, laborantin, consultation = laborantin_client
+    Laboratin.objects.filter(pk=laborantin.pk).update(nombreTests=50)
+    exams = [
+        Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="planifie", priorite="normal")
+        for _ in range(20)
+    ]
+
+    with django_assert_max_num_queries(12):
+        response = client.post(reverse("submit-lab-tests-batch"), {
+            "results": [result(examen) for examen in exams],
+        }, format="json")
+    assert set(response.data["outcomes"].values()) == {"submitted"}
+    assert HealthMetrics.objects.count() == 40
+
+
+@pytest.mark.django_db
+def test_batch_submission_rejects_duplicate_exams(laborantin_client):
+    client, laborantin, consultation = laborantin_client
+    examen = Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="planifie", priorite="normal")
+
+    response = client.post(reverse("submit-lab-tests-batch"), {"results": [result(examen), result(examen)]}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not ResultatLabo.objects.exists()
@@ -0,0 +1,63 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Examen, HealthMetrics, Laboratin, ResultatLabo, User
+
+
+@pytest.fixture
+def laborantin_client(medical_file):
+    patient, dossier, consultation = medical_file
+    user = User.objects.create_user(username="laborantin", password="1234", email="laborantin@example.com", role="laborantin", centreHospitalier=patient.centreHospitalier)
+    laborantin = Laboratin.objects.create(user=user, shift="jour", specialite="biochimie", telephone="123456789")
+    client = APIClient()
+    client.login(username="laborantin", password="1234")
+    return client, laborantin, consultation
+
+
+def create_exam(consultation, laborantin, priorite, etat="planifie", age=0):
+    examen = Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat=etat, priorite=priorite)
+    # createdAt is auto_now_add
+    Examen.objects.filter(pk=examen.pk).update(createdAt=date.today() - timedelta(days=age))
+    return examen
+
+
+@pytest.mark.django_db
+def test_worklist_orders_by_priority_then_age(laborantin_client):
+    client, laborantin, consultation = laborantin_client
+    normal_old = create_exam(consultation, laborantin, "normal", age=5)
+    urgent_new = create_exam(consultation, laborantin, "urgent", age=0)
+    tres_urgent = create_exam(consultation, laborantin, "tres_urgent", etat="en_cours", age=1)
+    urgent_old = create_exam(consultation, laborantin, "urgent", age=3)
+    create_exam(consultation, laborantin, "tres_urgent", etat="termine")
+
+    response = client.get(reverse("lab-worklist"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["examenID"] for row in response.data["results"]] == [
+        str(tres_urgent.pk), str(urgent_old.pk), str(urgent_new.pk), str(normal_old.pk),
+    ]
+    assert response.data["counts"] == {"planifie": 3, "en_cours": 1, "termine": 1, "annule": 0}
+    assert response.data["next"] is None
+
+    first_page = client.get(reverse("lab-worklist"), {"page_size": 2})
+    second_page = client.get(first_page.data["next"])
+    assert [row["examenID"] for row in second_page.data["results"]] == [str(urgent_new.pk), str(normal_old.pk)]
+
+
+@pytest.mark.django_db
+def test_worklist_loads_in_constant_queries(laborantin_client, django_assert_max_num_queries):
+    client, laborantin, consultation = laborantin_client
+    for _ in range(30):
+        examen = create_exam(consultation, laborantin, "urgent", etat="termine")
+        resultat = ResultatLabo.objects.create(examen=examen, laboratin=laborantin, resultat="RAS", dateAnalyse=date.today(), status="termine")
+        HealthMetrics.objects.create(resLabo=resultat, metric_type="glycemie", value=Decimal("0.95"), unit="g/L")
+
+    # Session, user, laborantin, page, results, metrics, counts
+    with django_assert_max_num_queries(7):
+        response = client.get(reverse("lab-worklist"), {"etat": "termine"})
+    assert len(response.data["results"]) == 30
+    assert all(row["health_metrics"][0]["metric_type"] == "glycemie" for row in response.data["results"])
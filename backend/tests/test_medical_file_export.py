@@ -0,0 +1,52 @@
+import json
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Consultation, Examen, Medicament, Ordonnance, OrdonnanceMedicament
+from healthhub_back.accounts.patient.patient_export import iter_medical_file_ndjson
+
+
+@pytest.mark.django_db
+def test_medical_file_export_streams_one_record_per_line(medical_file):
+    patient, dossier, consultation = medical_file
+    Consultation.objects.create(
+        dossier=dossier, dateConsultation="2025-02-01", diagnostic="Suivi", resume="Suivi", status="termine"
+    )
+    ordonnance = Ordonnance.objects.create(consultation=consultation)
+    medicament = Medicament.objects.create(nom="Doliprane", type="comprime", description="Paracetamol")
+    for _ in range(3):
+        OrdonnanceMedicament.objects.create(
+            ordonnance=ordonnance, med=medicament, duree="7 jours", dosage="moyen",
+            frequence="3 fois par jour", instructions="Pendant les repas"
+        )
+    Examen.objects.create(consultation=consultation, type="labo", etat="planifie", priorite="urgent")
+
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    response = client.get(reverse("patient-medical-file-export", kwargs={"patient_id": patient.user.id}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson"
+    assert response.streaming
+
+    records = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert records[0]["record"] == "dossier"
+    assert records[0]["data"]["patient"]["NSS"] == 123456789
+    kinds = [record["record"] for record in records[1:]]
+    assert kinds == ["consultation"] * 2 + ["ordonnance"] + ["ordonnance_medicament"] * 3 + ["examen"]
+    line = next(record["data"] for record in records if record["record"] == "ordonnance_medicament")
+    assert line["medicament"] == "Doliprane"
+    assert line["ordonnance_id"] == str(ordonnance.pk)
+
+    # Small chunks page through the rows without dropping or repeating any
+    chunked = list(iter_medical_file_ndjson(dossier, chunk_size=2))
+    assert [json.loads(line) for line in chunked] == records
+
+
+@pytest.mark.django_db
+def test_medical_file_export_requires_access(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    response = client.get(reverse("patient-medical-file-export", kwargs={"patient_id": patient.user.id}))
+    assert response.status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,175 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import DossierSnapshot, Examen
+from healthhub_back.accounts.patient import patient_service
+from healthhub_back.accounts.patient.patient_service import refresh_snapshot
+
+
+@pytest.mark.django_db
+def test_medical_file_is_served_from_snapshot(django_assert_num_queries, medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+
+    # First read serializes live and stores the snapshot
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.data == response.json()
+
+    # Later reads: session + user lookups, then a single snapshot fetch
+    with django_assert_num_queries(3):
+        cached = client.get(url)
+    assert cached.json() == response.json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_refreshes_consultation_subtree_on_commit(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+    client.get(url)
+
+    with transaction.atomic():
+        examen = Examen.objects.create(
+            consultation=consultation, type="labo", etat="planifie", priorite="urgent"
+        )
+        Examen.objects.create(
+            consultation=consultation, type="radio", etat="planifie", priorite="normal"
+        )
+        # Stale until the write commits: reads fall back to live serialization
+        assert DossierSnapshot.objects.get(pk=patient.pk).pendingUpdates == 1
+        live = client.get(url)
+        assert len(live.data["consultations"][0]["examens"]) == 2
+
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.pendingUpdates == 0
+    assert str(examen.examenID) in [e["examenID"] for e in snapshot.data["consultations"][0]["examens"]]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_write_committed_while_the_first_read_serializes_is_not_lost(medical_file, monkeypatch):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+    serialize = patient_service.serialize_medical_file
+    written = []
+
+    def serialize_then_write(dossier):
+        data = serialize(dossier)
+        if not written:
+            # Commits, and runs its snapshot refresh, before the reader stores `data`
+            with transaction.atomic():
+                written.append(Examen.objects.create(consultation=consultation, type="labo", etat="planifie", priorite="urgent"))
+        return data
+
+    monkeypatch.setattr(patient_service, "serialize_medical_file", serialize_then_write)
+    assert client.get(url).data["consultations"][0]["examens"] == []
+
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.pendingUpdates == 0
+    assert [e["examenID"] for e in snapshot.data["consultations"][0]["examens"]] == [str(written[0].examenID)]
+    assert client.get(url).json() == snapshot.data
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_writes_leave_no_batch_behind(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    client.get(reverse("patient-medical-file", kwargs={"patient_id": patient.user.id}))
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        Examen.objects.create(consultation=consultation, type="labo", etat="planifie", priorite="urgent")
+        raise RuntimeError
+
+    # The next transaction marks the snapshot stale and refreshes it again
+    with transaction.atomic():
+        examen = Examen.objects.create(consultation=consultation, type="radio", etat="planifie", priorite="normal")
+        assert DossierSnapshot.objects.get(pk=patient.pk).pendingUpdates == 1
+
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.pendingUpdates == 0
+    assert [e["examenID"] for e in snapshot.data["consultations"][0]["examens"]] == [str(examen.examenID)]
+
+
+@pytest.mark.django_db
+def test_rebuild_command_clears_pending_updates(medical_file):
+    patient, dossier, consultation = medical_file
+    DossierSnapshot.objects.create(patient=patient, dossier=dossier, data={}, pendingUpdates=2)
+
+    call_command("rebuild_medical_file_snapshots", "--stale-only")
+
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.pendingUpdates == 0
+    assert snapshot.data["consultations"][0]["consultationID"] == str(consultation.consultationID)
+
+
+@pytest.mark.django_db
+def test_refresh_of_an_up_to_date_snapshot_keeps_zero_pending_updates(medical_file):
+    # A snapshot created by a concurrent read, or reset by a rebuild, while
+    # the write that scheduled this refresh was in flight
+    patient, dossier, consultation = medical_file
+    DossierSnapshot.objects.create(patient=patient, dossier=dossier, data={}, pendingUpdates=0)
+
+    refresh_snapshot(dossier.pk, {consultation.consultationID})
+
+    snapshot = DossierSnapshot.objects.get(pk=patient.pk)
+    assert snapshot.pendingUpdates == 0
+    assert snapshot.data["consultations"][0]["consultationID"] == str(consultation.consultationID)
+
+
+@pytest.mark.django_db
+def test_staff_and_hospital_edits_drop_the_snapshots(django_capture_on_commit_callbacks, medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+    client.get(url)
+
+    medecin_user = patient.medecin.user
+    with django_capture_on_commit_callbacks(execute=True):
+        medecin_user.save(update_fields=["last_login"])
+    assert DossierSnapshot.objects.filter(pk=patient.pk).exists()
+
+    medecin_user.last_name = "House"
+    with django_capture_on_commit_callbacks(execute=True):
+        medecin_user.save()
+    assert not DossierSnapshot.objects.filter(pk=patient.pk).exists()
+    assert client.get(url).data["consultations"][0]["medecin_name"] == "Dr.  House"
+
+    centre = patient.centreHospitalier
+    centre.nom = "Centre Renomme"
+    with django_capture_on_commit_callbacks(execute=True):
+        centre.save()
+    assert client.get(url).data["patient"]["centre_hospitalier"]["nom"] == "Centre Renomme"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_dropped_while_the_first_read_serializes_is_not_stored(medical_file, monkeypatch):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="patient", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+    serialize = patient_service.serialize_medical_file
+    centre = patient.centreHospitalier
+
+    def serialize_then_rename(dossier):
+        data = serialize(dossier)
+        if centre.nom != "Centre Renomme":
+            centre.nom = "Centre Renomme"
+            centre.save()
+        return data
+
+    monkeypatch.setattr(patient_service, "serialize_medical_file", serialize_then_rename)
+    client.get(url)
+
+    assert not DossierSnapshot.objects.filter(pk=patient.pk).exists()
+    assert client.get(url).data["patient"]["centre_hospitalier"]["nom"] == "Centre Renomme"
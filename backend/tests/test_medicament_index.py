@@ -0,0 +1,78 @@
+import pytest
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Medicament
+from healthhub_back.common.search.medicament_index import medicament_index
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    # The index is per process and outlives the rolled back test transactions
+    medicament_index.clear()
+    yield
+    medicament_index.clear()
+
+
+def create_catalog():
+    for nom, type_ in [
+        ("Doliprane", "comprime"),
+        ("Doliprane Enfant", "sirop"),
+        ("Dafalgan", "comprime"),
+        ("Éfferalgan", "comprime"),
+        ("Amoxicilline Biogaran", "comprime"),
+    ]:
+        Medicament.objects.create(nom=nom, type=type_, description=f"Description {nom}")
+
+
+def names(results):
+    return [row["nom"] for row in results]
+
+
+@pytest.mark.django_db
+def test_search_ranks_prefix_before_infix():
+    create_catalog()
+
+    assert names(medicament_index.search("doli")) == ["Doliprane", "Doliprane Enfant"]
+    assert names(medicament_index.search("doliprane")) == ["Doliprane", "Doliprane Enfant"]
+    # Accent-insensitive, name prefix before infix
+    assert names(medicament_index.search("EFFER")) == ["Éfferalgan"]
+    assert names(medicament_index.search("algan")) == ["Dafalgan", "Éfferalgan"]
+    assert names(medicament_index.search("enfant dol")) == ["Doliprane Enfant"]
+    assert names(medicament_index.search("doli", type_="sirop")) == ["Doliprane Enfant"]
+    assert names(medicament_index.search("algan", limit=1)) == ["Dafalgan"]
+    assert medicament_index.search("xyz") == []
+
+
+@pytest.mark.django_db
+def test_index_follows_medicament_writes(django_capture_on_commit_callbacks):
+    create_catalog()
+    medicament_index.search("")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Medicament.objects.create(nom="Dolko", type="comprime", description="Paracetamol")
+        doliprane = Medicament.objects.get(nom="Doliprane")
+        doliprane.nom = "Paracetamol Doliprane"
+        doliprane.save()
+        Medicament.objects.get(nom="Dafalgan").delete()
+
+    assert names(medicament_index.search("dol")) == ["Dolko", "Doliprane Enfant", "Paracetamol Doliprane"]
+    assert names(medicament_index.search("algan")) == ["Éfferalgan"]
+
+
+@pytest.mark.django_db
+def test_endpoint_answers_from_index(django_assert_num_queries, medical_file):
+    patient, dossier, consultation = medical_file
+    create_catalog()
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=patient.medecin.user).key}")
+    url = reverse("medicament-list")
+
+    # Warm the token cache and the index
+    assert client.get(url).data["count"] == 5
+
+    with django_assert_num_queries(0):
+        response = client.get(url, {"search": "doli", "type": "comprime"})
+    assert response.status_code == status.HTTP_200_OK
+    assert names(response.data["results"]) == ["Doliprane"]
@@ -0,0 +1,62 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.accounts.patient.patient_serializers import ExamensSerializer
+from healthhub_back.models import (
+    ActiviteInfermier, Examen, Infermier, Laboratin, Radiologue, ResultatLabo, ResultatRadio, User
+)
+from .conftest import QueryShapeRecorder
+
+
+def create_staff(model, username, centre, **fields):
+    user = User.objects.create_user(username=username, password="1234", email=f"{username}@example.com", role=model.__name__.lower(), first_name=username, centreHospitalier=centre)
+    return model.objects.create(user=user, telephone="123456789", **fields)
+
+
+def fill_medical_file(consultation, rows=3):
+    centre = consultation.centreHospitalier
+    for n in range(rows):
+        laborantin = create_staff(Laboratin, f"laborantin{n}", centre, shift="jour", specialite="biochimie")
+        radiologue = create_staff(Radiologue, f"radiologue{n}", centre, shift="jour", specialite="scanner")
+        infermier = create_staff(Infermier, f"infermier{n}", centre, shift="jour", specialite="generale")
+        labo = Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="termine", priorite="normal")
+        ResultatLabo.objects.create(examen=labo, laboratin=laborantin, resultat="RAS", dateAnalyse="2025-01-02", status="termine")
+        radio = Examen.objects.create(consultation=consultation, radiologue=radiologue, type="radio", etat="termine", priorite="normal")
+        ResultatRadio.objects.create(examen=radio, type="scanner", rapport="RAS", radioImgURL="https://example.com/scan.png")
+        ActiviteInfermier.objects.create(consultation=consultation, infermier=infermier, typeActivite="soins", doctors_details="", nurse_observations="", status="termine")
+
+
+@pytest.mark.django_db
+def test_medical_file_renders_without_per_row_queries(medical_file):
+    patient, dossier, consultation = medical_file
+    fill_medical_file(consultation)
+    client = APIClient()
+    client.login(username="patient", password="1234")
+
+    # The detector (tests/conftest.py) fails the test on a query per row
+    response = client.get(reverse("patient-medical-file", kwargs={"patient_id": patient.user.id}))
+    assert response.status_code == status.HTTP_200_OK
+    examens = response.data["consultations"][0]["examens"]
+    assert {exam["resultat_labo"][0]["laboratin_name"] for exam in examens if exam["type"] == "labo"} == {
+        "Laborantin laborantin0 ", "Laborantin laborantin1 ", "Laborantin laborantin2 ",
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.allow_repeated_queries
+def test_detector_reports_the_serializer_field_path(medical_file):
+    patient, dossier, consultation = medical_file
+    fill_medical_file(consultation)
+    recorder = QueryShapeRecorder()
+
+    recorder.start()
+    with connection.execute_wrapper(recorder):
+        ExamensSerializer(Examen.objects.filter(type="labo"), many=True).data
+    recorder.finish()
+
+    paths = {path for path, _sql, count in recorder.repeated(set()) if count == 3}
+    assert "ExamensSerializer.resultat_labo" in paths
+    assert "ExamensSerializer.resultat_labo.laboratin_name" in paths
+    assert "ExamensSerializer.medecin_name" in paths
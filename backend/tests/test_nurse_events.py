@@ -0,0 +1,140 @@
+import asyncio
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.common.events import InMemoryBroker, get_broker
+from healthhub_back.models import ActiviteInfermier, Infermier, User
+
+
+@pytest.fixture(autouse=True)
+def fresh_broker():
+    # The broker is per process and outlives the rolled back test transactions
+    get_broker().clear()
+    yield
+    get_broker().clear()
+
+
+@pytest.fixture
+def nurse_setup(medical_file):
+    patient, dossier, consultation = medical_file
+    user = User.objects.create_user(username="infermier", password="1234", email="infermier@example.com", role="infermier", centreHospitalier=patient.centreHospitalier)
+    infermier = Infermier.objects.create(user=user, shift="jour", specialite="generale", telephone="123456789")
+    doctor = APIClient()
+    doctor.login(username="medecin", password="1234")
+    nurse = APIClient()
+    nurse.login(username="infermier", password="1234")
+    return doctor, nurse, infermier, consultation
+
+
+def test_broker_backlog_and_reset():
+    broker = InMemoryBroker(backlog=3)
+    for n in range(5):
+        broker.publish("nurse:1", "activite_created", {"n": n})
+
+    events, reset = broker.since("nurse:1", 3)
+    assert [event["data"]["n"] for event in events] == [3, 4] and not reset
+    assert broker.since("nurse:1", 5) == ([], False)
+    # Event 2 was dropped from the backlog
+    assert broker.since("nurse:1", 1)[1] is True
+    assert broker.since("nurse:2", 0) == ([], False)
+
+
+def test_broker_wakes_waiters_from_other_threads():
+    broker = InMemoryBroker(backlog=10)
+
+    async def listen():
+        timer = threading.Timer(0.05, broker.publish, args=("nurse:1", "activite_started", {}))
+        timer.start()
+        return await broker.wait("nurse:1", 0, timeout=5)
+
+    events, reset = asyncio.run(listen())
+    assert [event["id"] for event in events] == [1] and not reset
+    assert asyncio.run(broker.wait("nurse:1", 1, timeout=0)) == ([], False)
+
+
+@pytest.mark.django_db
+def test_worklist_changes_are_pushed_to_the_nurse(nurse_setup, django_capture_on_commit_callbacks):
+    doctor, nurse, infermier, consultation = nurse_setup
+    events_url = reverse("nurse_activites_events")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = doctor.post(reverse("activite-infermier-create"), {
+            "consultation": str(consultation.pk),
+            "infermier": infermier.pk,
+            "typeActivite": "soins",
+            "doctors_details": "Pansement",
+            "status": "planifie",
+        }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    activite = ActiviteInfermier.objects.get()
+
+    listing = nurse.get(reverse("nurse_activites_list"))
+    assert listing["Last-Event-ID"] == "1"
+
+    response = nurse.get(events_url, {"last_event_id": 0, "timeout": 0})
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["last_event_id"] == 1 and not body["reset"]
+    assert [event["type"] for event in body["events"]] == ["activite_created"]
+    assert body["events"][0]["data"] == listing.json()["results"][0]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        nurse.patch(reverse("start_activity", kwargs={"activiteinfermier_id": activite.pk}))
+    with django_capture_on_commit_callbacks(execute=True):
+        nurse.patch(reverse("validate_activity", kwargs={"activiteinfermier_id": activite.pk}), {"nurse_observations": "RAS"}, format="json")
+
+    body = nurse.get(events_url, {"timeout": 0}, HTTP_LAST_EVENT_ID="1").json()
+    assert [event["type"] for event in body["events"]] == ["activite_started", "activite_validated"]
+    assert body["events"][1]["data"]["activities"][0]["nurse_observations"] == "RAS"
+    assert body["last_event_id"] == 3
+
+    # Up to date: the long-poll times out empty
+    assert nurse.get(events_url, {"last_event_id": 3, "timeout": 0}).json()["events"] == []
+
+
+@pytest.mark.django_db
+def test_event_stream_is_reserved_to_nurses(nurse_setup):
+    doctor, nurse, infermier, consultation = nurse_setup
+    events_url = reverse("nurse_activites_events")
+
+    assert doctor.get(events_url, {"timeout": 0}).status_code == status.HTTP_403_FORBIDDEN
+    assert APIClient().get(events_url, {"timeout": 0}).status_code == status.HTTP_401_UNAUTHORIZED
+    assert nurse.get(events_url, {"last_event_id": "abc"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_event_stream_sends_server_sent_events(nurse_setup, settings):
+    doctor, nurse, infermier, consultation = nurse_setup
+    settings.EVENTS_STREAM_SECONDS = 0.2
+    channel = f"nurse:{infermier.pk}"
+    get_broker().publish(channel, "activite_started", {"id": "a"})
+    get_broker().publish(channel, "activite_validated", {"id": "a"})
+
+    client = AsyncClient()
+    client.cookies = nurse.cookies
+
+    async def read():
+        response = await client.get(reverse("nurse_activites_events"), headers={"Accept": "text/event-stream", "Last-Event-ID": "1"})
+        assert response["Content-Type"] == "text/event-stream"
+        return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+    # From this thread, which holds the test's database connection
+    body = async_to_sync(read)()
+    assert body.startswith("retry: 3000\n\n")
+    assert 'id: 2\nevent: activite_validated\ndata: {"id": "a"}\n\n' in body
+    assert "activite_started" not in body
+
+
+@pytest.mark.django_db
+def test_wsgi_clients_asking_for_a_stream_get_the_long_poll(nurse_setup):
+    doctor, nurse, infermier, consultation = nurse_setup
+    get_broker().publish(f"nurse:{infermier.pk}", "activite_started", {"id": "a"})
+
+    response = nurse.get(reverse("nurse_activites_events"), {"last_event_id": 0, "timeout": 0}, HTTP_ACCEPT="text/event-stream")
+    assert response["Content-Type"] == "application/json"
+    assert response.json()["events"][0]["type"] == "activite_started"
@@ -0,0 +1,85 @@
+import importlib
+
+import pytest
+from django.apps import apps
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import (
+    ActiviteInfermier, CentreHospitalier, Consultation, Examen, Infermier, Laboratin, Ordonnance,
+    ResultatLabo, User
+)
+
+backfill = importlib.import_module("healthhub_back.migrations.0010_patient_scope_keys")
+
+
+def create_records(consultation):
+    user = User.objects.create_user(username="laborantin", password="1234", email="laborantin@example.com", role="laborantin", centreHospitalier=consultation.centreHospitalier)
+    laborantin = Laboratin.objects.create(user=user, shift="jour", specialite="biochimie", telephone="123456789")
+    user = User.objects.create_user(username="infermier", password="1234", email="infermier@example.com", role="infermier", centreHospitalier=consultation.centreHospitalier)
+    infermier = Infermier.objects.create(user=user, shift="jour", specialite="generale", telephone="123456789")
+    examen = Examen.objects.create(consultation=consultation, laborantin=laborantin, type="labo", etat="termine", priorite="normal")
+    ResultatLabo.objects.create(examen=examen, laboratin=laborantin, resultat="RAS", dateAnalyse="2025-01-02", status="termine")
+    Ordonnance.objects.create(consultation=consultation)
+    ActiviteInfermier.objects.create(consultation=consultation, infermier=infermier, typeActivite="soins", doctors_details="", nurse_observations="", status="planifie")
+    return examen
+
+
+def scope_keys():
+    return {
+        (model.__name__, row)
+        for model in (Consultation, Ordonnance, Examen, ActiviteInfermier, ResultatLabo)
+        for row in model.objects.values_list("patient_id", "centreHospitalier_id")
+    }
+
+
+@pytest.mark.django_db
+def test_records_copy_their_patient_and_hospital(django_assert_num_queries, medical_file):
+    patient, dossier, consultation = medical_file
+    assert (consultation.patient_id, consultation.centreHospitalier_id) == (patient.pk, patient.centreHospitalier_id)
+    examen = create_records(consultation)
+    assert {keys for _model, keys in scope_keys()} == {(patient.pk, patient.centreHospitalier_id)}
+
+    # Parents that are not loaded are read once for the whole batch
+    with django_assert_num_queries(2):
+        ResultatLabo.objects.bulk_create([
+            ResultatLabo(examen_id=str(examen.pk), laboratin_id=examen.laborantin_id, resultat="RAS", dateAnalyse="2025-01-03", status="termine")
+            for _ in range(3)
+        ])
+    assert set(ResultatLabo.objects.values_list("patient_id", flat=True)) == {patient.pk}
+
+    # A transfer moves the records with the patient
+    other_centre = CentreHospitalier.objects.create(nom="Autre Centre", place="Elsewhere")
+    patient.centreHospitalier = other_centre
+    patient.save()
+    assert {keys for _model, keys in scope_keys()} == {(patient.pk, other_centre.pk)}
+
+
+@pytest.mark.django_db
+def test_migration_backfills_existing_records(medical_file):
+    patient, dossier, consultation = medical_file
+    create_records(consultation)
+    for model in (Consultation, Ordonnance, Examen, ActiviteInfermier, ResultatLabo):
+        model.objects.update(patient=None, centreHospitalier=None)
+
+    backfill.backfill_scope_keys(apps, None)
+
+    assert {keys for _model, keys in scope_keys()} == {(patient.pk, patient.centreHospitalier_id)}
+    assert len(scope_keys()) == 5
+
+
+@pytest.mark.django_db
+def test_laborantin_views_filter_on_the_copied_keys(medical_file):
+    patient, dossier, consultation = medical_file
+    examen = create_records(consultation)
+    client = APIClient()
+    client.login(username="laborantin", password="1234")
+
+    history = client.get(reverse("lab-result-history", kwargs={"patient_nss": patient.NSS}))
+    assert [row["resLaboID"] for row in history.data["results"]] == [str(ResultatLabo.objects.get().pk)]
+
+    url = f"/api/laborantin/examinations/{examen.pk}/"
+    assert client.get(url).status_code == status.HTTP_200_OK
+    other_centre = CentreHospitalier.objects.create(nom="Autre Centre", place="Elsewhere")
+    Examen.objects.filter(pk=examen.pk).update(centreHospitalier=other_centre)
+    assert client.get(url).status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,169 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from healthhub_back.models import CentreHospitalier, Medecin, Patient
+from healthhub_back.common.pagination import KeysetPagination
+from healthhub_back.common.search import patient_index
+from healthhub_back.common.search.patient_index import filter_by_patient_search, search_patient_ids
+
+User = get_user_model()
+
+
+def create_patients(*extra):
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    medecin_user = User.objects.create_user(username="medecin", password="1234", email="medecin@example.com", role="medecin", centreHospitalier=centre)
+    medecin = Medecin.objects.create(user=medecin_user, specialite="generaliste", telephone="123456789")
+    patients = {}
+    for i, (nom, prenom, nss) in enumerate([
+        ("Dupont", "Hélène", 123456789),
+        ("Dupré", "Jean", 123999999),
+        ("Martin", "Éric", 987654321),
+        *extra,
+    ]):
+        user = User.objects.create_user(username=f"patient{i}", password="1234", email=f"patient{i}@example.com", role="patient", centreHospitalier=centre)
+        patients[nom] = Patient.objects.create(
+            user=user,
+            NSS=nss,
+            nom=nom,
+            prenom=prenom,
+            dateNaissance="1990-01-01",
+            adresse="123 Test Street",
+            telephone="123456789",
+            mutuelle="Mutuelle Test",
+            contactUrgence="Emergency Contact",
+            medecin=medecin,
+            centreHospitalier=centre
+        )
+    return medecin, patients
+
+
+@pytest.mark.django_db
+def test_search_folds_accents_and_ranks_exact_matches_first():
+    medecin, patients = create_patients()
+
+    assert search_patient_ids("HELENE") == [patients["Dupont"].pk]
+    assert search_patient_ids("eric martin") == [patients["Martin"].pk]
+    # Both names start with "dup", the exact word ranks first
+    assert search_patient_ids("dupre")[0] == patients["Dupré"].pk
+    assert set(search_patient_ids("dup")) == {patients["Dupont"].pk, patients["Dupré"].pk}
+    # Infix matches go through the trigrams
+    assert search_patient_ids("upon") == [patients["Dupont"].pk]
+    # NSS prefix
+    assert set(search_patient_ids("123")) == {patients["Dupont"].pk, patients["Dupré"].pk}
+    assert search_patient_ids("987654321") == [patients["Martin"].pk]
+    assert search_patient_ids("inconnu") == []
+
+
+@pytest.mark.django_db
+def test_single_character_tokens_match_as_prefixes():
+    medecin, patients = create_patients()
+
+    assert set(search_patient_ids("d")) == {patients["Dupont"].pk, patients["Dupré"].pk}
+    assert set(search_patient_ids("1")) == {patients["Dupont"].pk, patients["Dupré"].pk}
+    assert search_patient_ids("dupont h") == [patients["Dupont"].pk]
+    assert search_patient_ids("dupont j") == []
+
+
+@pytest.mark.django_db
+def test_doctor_patient_list_short_and_empty_searches():
+    medecin, patients = create_patients()
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("doctor-patients", kwargs={"doctor_id": medecin.user.id})
+
+    response = client.get(url, {"search": "m"})
+    assert [row["nom"] for row in response.json()["results"]] == ["Martin"]
+    # Nothing to search for: the list is not filtered
+    assert client.get(url, {"search": "-"}).json()["count"] == 3
+
+
+@pytest.mark.django_db
+def test_list_searches_keep_every_match(monkeypatch):
+    medecin, patients = create_patients(*[("Durand", f"Patient{n}", 555000000 + n) for n in range(12)])
+    monkeypatch.setattr(patient_index, "MAX_SEARCH_RESULTS", 5)
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("doctor-patients", kwargs={"doctor_id": medecin.user.id})
+
+    first = client.get(url, {"search": "durand"}).json()
+    assert first["count"] == 12 and len(first["results"]) == 10
+    assert len(client.get(first["next"]).json()["results"]) == 2
+    assert len(search_patient_ids("durand")) == 5
+
+
+@pytest.mark.django_db
+def test_index_follows_patient_updates():
+    medecin, patients = create_patients()
+    patient = patients["Martin"]
+    patient.nom = "Bernard"
+    patient.save()
+
+    assert search_patient_ids("martin") == []
+    assert search_patient_ids("bernard") == [patient.pk]
+
+
+@pytest.mark.django_db
+def test_saves_leaving_the_names_unchanged_write_no_terms():
+    medecin, patients = create_patients()
+    patient = patients["Martin"]
+
+    patient.adresse = "1 Rue Neuve"
+    with CaptureQueriesContext(connection) as queries:
+        patient.save()
+        patient.save(update_fields=["telephone"])
+    index_queries = [q["sql"] for q in queries.captured_queries if "patientsearchterm" in q["sql"]]
+    assert len(index_queries) == 1 and index_queries[0].startswith("SELECT")
+
+    patient.prenom = "Paul"
+    patient.save(update_fields=["prenom"])
+    assert search_patient_ids("paul") == [patient.pk]
+    assert search_patient_ids("eric") == []
+    assert search_patient_ids("martin") == [patient.pk]
+
+
+@pytest.mark.django_db
+def test_doctor_patient_list_search():
+    medecin, patients = create_patients()
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("doctor-patients", kwargs={"doctor_id": medecin.user.id})
+
+    response = client.get(url, {"search": "dupont"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [row["NSS"] for row in response.json()["results"]] == [123456789]
+
+
+@pytest.mark.django_db
+def test_doctor_patient_list_keeps_the_search_rank():
+    # "Adupré" only matches "dupre" through its trigrams, yet sorts first by name
+    medecin, patients = create_patients(("Adupré", "Luc", 555555555))
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("doctor-patients", kwargs={"doctor_id": medecin.user.id})
+
+    response = client.get(url, {"search": "dupre"})
+    assert [row["nom"] for row in response.json()["results"]] == ["Dupré", "Adupré"]
+    response = client.get(url, {"search": "dupre", "ordering": "nom"})
+    assert [row["nom"] for row in response.json()["results"]] == ["Adupré", "Dupré"]
+
+
+@pytest.mark.django_db
+def test_keyset_pages_follow_the_search_rank():
+    medecin, patients = create_patients(("Adupré", "Luc", 555555555))
+    queryset = filter_by_patient_search(Patient.objects.all(), "dupre")
+    factory = APIRequestFactory()
+
+    seen, params = [], {"page_size": 1}
+    while True:
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, Request(factory.get("/", params)))
+        seen += [patient.nom for patient in page]
+        if not paginator.has_next:
+            break
+        params["cursor"] = paginator.encode_cursor(page[-1])
+    assert seen == ["Dupré", "Adupré"]
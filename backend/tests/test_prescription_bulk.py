@@ -0,0 +1,63 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.models import Medicament, OrdonnanceMedicament
+
+
+def medication(n, **overrides):
+    return {
+        "nom": f"Medicament {n}",
+        "type": "comprime",
+        "description": f"Description {n}",
+        "dosage": "moyen",
+        "duree": "7 jours",
+        "frequence": "3 fois par jour",
+        "instructions": "Pendant les repas",
+        **overrides,
+    }
+
+
+@pytest.fixture
+def medecin_client(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    return client, consultation
+
+
+@pytest.mark.django_db
+def test_prescription_writes_in_constant_queries(medecin_client, django_assert_max_num_queries):
+    client, consultation = medecin_client
+    Medicament.objects.create(nom="Medicament 0", type="comprime", description="")
+    for n in range(1, 5):
+        Medicament.objects.create(nom=f"Medicament {n}", type="comprime", description=f"Description {n}")
+    url = reverse("create-prescription", kwargs={"consultation_id": consultation.pk})
+
+    # Same statement count for 10 lines as for 1: no per-medication query
+    with django_assert_max_num_queries(14):
+        response = client.post(url, {"medications": [medication(n) for n in range(10)]}, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [line["medicament"]["nom"] for line in response.data["medicaments"]] == [f"Medicament {n}" for n in range(10)]
+    assert OrdonnanceMedicament.objects.filter(ordonnance_id=response.data["ordonnanceID"]).count() == 10
+    assert Medicament.objects.count() == 10
+    # The blank description of the existing medicament was filled in
+    assert Medicament.objects.get(nom="Medicament 0").description == "Description 0"
+
+
+@pytest.mark.django_db
+def test_prescription_requires_description_of_new_medications(medecin_client):
+    client, consultation = medecin_client
+    Medicament.objects.create(nom="Medicament 0", type="comprime", description="Description 0")
+    url = reverse("create-prescription", kwargs={"consultation_id": consultation.pk})
+
+    response = client.post(url, {"medications": [
+        medication(0, description=""),
+        medication(1, description=""),
+    ]}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["medications"][0] == {}
+    assert "description" in response.data["medications"][1]
+    assert not OrdonnanceMedicament.objects.exists()
@@ -0,0 +1,51 @@
+import json
+import logging
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from healthhub_back.common.profiling import fingerprint
+
+
+@pytest.fixture
+def doctor_client(settings, medical_file):
+    settings.PROFILING_SAMPLE_RATE = 1.0
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    return client, patient
+
+
+def test_fingerprint_ignores_parameters_and_in_list_lengths():
+    assert fingerprint('SELECT  "a"\n FROM "t" WHERE "id" IN (%s, %s, %s)') == fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s)')
+
+
+@pytest.mark.django_db
+def test_sampled_requests_report_their_timings(doctor_client, caplog):
+    client, patient = doctor_client
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+
+    with caplog.at_level(logging.INFO, logger="healthhub_back.common.profiling"):
+        response = client.get(url)
+
+    metrics = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+    assert set(metrics) == {"db", "serializer", "view", "total"}
+    record = json.loads(caplog.records[-1].getMessage().split(" ", 1)[1])
+    assert record["path"] == url and record["status"] == 200 and record["role"] == "medecin"
+    assert record["queries"] > 0
+    assert metrics["db"].endswith(f'desc="{record["queries"]} queries ({len(record["duplicates"])} duplicated)"')
+    assert record["serializer_ms"] > 0
+    assert 0 < record["view_ms"] <= record["total_ms"]
+
+
+@pytest.mark.django_db
+def test_sampling_by_rate_and_role(doctor_client, settings):
+    client, patient = doctor_client
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+
+    settings.PROFILING_ROLES = ["infermier"]
+    assert "Server-Timing" not in client.get(url)
+    settings.PROFILING_ROLES = ["infermier", "medecin"]
+    assert "Server-Timing" in client.get(url)
+    settings.PROFILING_SAMPLE_RATE = 0.0
+    assert "Server-Timing" not in client.get(url)
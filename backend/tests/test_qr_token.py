@@ -0,0 +1,149 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from healthhub_back.models import CentreHospitalier, Medecin, Patient, DossierMedical
+from healthhub_back.accounts.admin_management.admin_service import PatientService
+from healthhub_back.accounts.doctor.doctor_service import search_patient
+from healthhub_back.accounts.patient import patient_service
+from healthhub_back.accounts.patient.patient_service import ensure_qr_code
+
+User = get_user_model()
+
+
+def create_patient():
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    medecin_user = User.objects.create_user(username="medecin", password="1234", email="medecin@example.com", role="medecin", centreHospitalier=centre)
+    medecin = Medecin.objects.create(user=medecin_user, specialite="generaliste", telephone="123456789")
+    return PatientService.create_patient_with_dossier({
+        "username": "patient1",
+        "email": "patient1@example.com",
+        "password": "password123",
+        "NSS": 123456789,
+        "nom": "Doe",
+        "prenom": "John",
+        "dateNaissance": "1990-01-01",
+        "adresse": "123 Test Street",
+        "telephone": "123456789",
+        "mutuelle": "Mutuelle Test",
+        "contactUrgence": "Emergency Contact",
+        "medecin": medecin,
+        "centreHospitalier": centre,
+    })
+
+
+@pytest.mark.django_db
+def test_dossier_gets_unique_qr_token():
+    patient, dossier = create_patient()
+    other = DossierMedical(patient=patient)
+
+    assert 0 < len(dossier.qrToken) <= 32
+    assert dossier.qrToken != other.qrToken
+    assert search_patient(dossier.qrToken) == patient
+
+
+@pytest.mark.django_db
+def test_qr_code_is_rendered_on_first_access():
+    patient, dossier = create_patient()
+    # The worker only runs once the admission commits
+    assert dossier.qrStatus == "en_attente"
+    assert dossier.qrCode == ""
+
+    client = APIClient()
+    client.login(username="patient1", password="password123")
+    response = client.get(reverse("retrieve-qr-code", kwargs={"patient_id": patient.user.id}))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["qrStatus"] == "pret"
+    assert response.data["qrCode"]
+    assert DossierMedical.objects.get(pk=dossier.pk).qrCode == response.data["qrCode"]
+
+
+
+@pytest.mark.django_db
+def test_failed_qr_code_is_reported_and_retried_in_background(monkeypatch, django_capture_on_commit_callbacks):
+    patient, dossier = create_patient()
+    renders = []
+
+    def broken_renderer(token):
+        renders.append(token)
+        raise OSError("no font")
+
+    monkeypatch.setattr(patient_service, "render_qr_code", broken_renderer)
+    client = APIClient()
+    client.login(username="patient1", password="password123")
+    url = reverse("retrieve-qr-code", kwargs={"patient_id": patient.user.id})
+
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["qrStatus"] == "echec"
+    assert response.data["qrCode"] == ""
+    assert DossierMedical.objects.get(pk=dossier.pk).qrStatus == "echec"
+
+    # Failed dossiers are not rendered inline again, the worker retries them
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = client.get(url)
+    assert response.data["qrStatus"] == "echec"
+    assert len(renders) == 1
+    assert len(callbacks) == 1
+
+
+@pytest.mark.django_db
+def test_qr_code_of_deleted_dossier_is_not_marked_ready():
+    patient, dossier = create_patient()
+    DossierMedical.objects.filter(pk=dossier.pk).delete()
+
+    ensure_qr_code(dossier)
+    assert dossier.qrStatus == "en_attente"
+    assert dossier.qrCode == ""
+
+
+@pytest.mark.django_db
+def test_render_qr_codes_command(monkeypatch):
+    patient, dossier = create_patient()
+    DossierMedical.objects.filter(pk=dossier.pk).update(qrStatus="echec")
+    monkeypatch.setattr(patient_service, "render_qr_code", lambda token: 1 / 0)
+    call_command("render_qr_codes", stdout=StringIO())
+    assert DossierMedical.objects.get(pk=dossier.pk).qrStatus == "echec"
+
+    monkeypatch.undo()
+    out = StringIO()
+    call_command("render_qr_codes", "--failed-only", stdout=out)
+    dossier.refresh_from_db()
+    assert dossier.qrStatus == "pret"
+    assert dossier.qrCode
+    assert "Rendered 1 QR code(s)." in out.getvalue()
+
+@pytest.mark.django_db(transaction=True)
+def test_qr_code_is_rendered_after_commit(settings):
+    settings.BACKGROUND_TASKS_EAGER = True
+    with transaction.atomic():
+        patient, dossier = create_patient()
+        assert DossierMedical.objects.get(pk=dossier.pk).qrStatus == "en_attente"
+
+    dossier.refresh_from_db()
+    assert dossier.qrStatus == "pret"
+    assert dossier.qrCode
+
+
+@pytest.mark.django_db
+def test_doctor_search_by_qr_token(django_assert_max_num_queries):
+    patient, dossier = create_patient()
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+
+    url = reverse("patient-search", kwargs={"search_type": "qr", "search_value": dossier.qrToken})
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["patient"]["NSS"] == 123456789
+
+    # Session + user lookups, the token lookup, then the snapshot
+    with django_assert_max_num_queries(4):
+        client.get(url)
+
+    url = reverse("patient-search", kwargs={"search_type": "qr", "search_value": "inconnu"})
+    assert client.get(url).status_code == status.HTTP_404_NOT_FOUND
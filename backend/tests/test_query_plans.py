@@ -0,0 +1,66 @@
+import json
+import re
+
+import pytest
+from django.db import connection
+from healthhub_back.accounts.doctor.doctor_view import doctor_patient_queryset
+from healthhub_back.accounts.laborantin.laborantin_views import lab_exam_counts, lab_exam_queryset, lab_result_history
+from healthhub_back.accounts.nurse.nurse_view import activity_queryset
+from healthhub_back.accounts.radiologue.radiologue_view import radiologue_exam_queryset
+from healthhub_back.accounts.sgph.sgph_view import pending_ordonnances
+
+# The hot queries of the role views, as the views build them. Each must reach
+# its rows through an index: a full scan grows with the whole table instead
+# of the rows served.
+HOT_QUERIES = {
+    'lab_exams': lambda: lab_exam_queryset(1).filter(etat__in=['planifie', 'en_cours', 'termine']),
+    'lab_worklist': lambda: lab_exam_queryset(1).filter(etat__in=['planifie', 'en_cours']).order_by('prioriteRank', 'createdAt', 'pk'),
+    'lab_worklist_counts': lambda: lab_exam_counts(1),
+    'lab_history': lambda: lab_result_history(123456789),
+    'radiologue_exams': lambda: radiologue_exam_queryset(1).filter(etat='planifie').order_by('-createdAt', '-pk'),
+    'radiologue_history': lambda: radiologue_exam_queryset(1).filter(etat='termine').order_by('-createdAt', '-pk'),
+    'nurse_activities': lambda: activity_queryset().filter(infermier_id=1, status='planifie').order_by('-createdAt', '-pk'),
+    'nurse_history': lambda: activity_queryset().filter(infermier_id=1, status='termine').order_by('-createdAt', '-pk'),
+    'sgph_pending_ordonnances': pending_ordonnances,
+    'doctor_patients': lambda: doctor_patient_queryset(1).order_by('nom'),
+}
+
+# SQLite compiles valide=False to "NOT valide", which no index serves; MySQL
+# compares the column, which ordonnance_pending_idx answers
+SQLITE_FULL_SCANS = {'sgph_pending_ordonnances'}
+
+
+def full_scans(queryset):
+    """
+    Tables the database reads in full to answer `queryset`.
+    """
+    if connection.vendor == 'mysql':
+        plan = json.loads(queryset.explain(format='json'))
+        return [table['table_name'] for table in _mysql_tables(plan) if table.get('access_type') == 'ALL']
+    plan = queryset.explain()
+    # SQLite: "SCAN <table>" without an index, "SEARCH <table> USING ..." or
+    # "SCAN <table> USING [COVERING] INDEX ..." otherwise
+    return re.findall(r'\bSCAN (\w+)(?! USING)(?:\s|$)', plan + '\n')
+
+
+def _mysql_tables(node):
+    if isinstance(node, dict):
+        if 'table' in node:
+            yield node['table']
+        for value in node.values():
+            yield from _mysql_tables(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _mysql_tables(value)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', [
+    pytest.param(name, marks=pytest.mark.xfail(
+        connection.vendor == 'sqlite' and name in SQLITE_FULL_SCANS, reason="no index serves this query on SQLite", strict=True
+    ))
+    for name in HOT_QUERIES
+])
+def test_hot_query_uses_indexes(name):
+    queryset = HOT_QUERIES[name]()
+    assert full_scans(queryset) == [], f"{name} scans a whole table:\n{queryset.explain()}"
@@ -0,0 +1,177 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from healthhub_back.accounts.radiologue import radiologue_view
+from healthhub_back.accounts.radiologue.radiologue_service import stage_image
+from healthhub_back.accounts.radiologue.radiologue_storage import LocalStorage
+from healthhub_back.models import (
+    CentreHospitalier, Medecin, Radiologue, Patient, DossierMedical, Consultation, Examen, ResultatRadio
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def local_storage(settings, tmp_path):
+    settings.BACKGROUND_TASKS_EAGER = True
+    settings.RADIOLOGY_STAGING_DIR = str(tmp_path / "staging")
+    settings.RADIOLOGY_STORAGE_BACKEND = "healthhub_back.accounts.radiologue.radiologue_storage.LocalStorage"
+    settings.RADIOLOGY_LOCAL_STORAGE_DIR = str(tmp_path / "radiology")
+    settings.RADIOLOGY_LOCAL_STORAGE_URL = "/media/radiology/"
+    return tmp_path
+
+
+def create_examen():
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    medecin_user = User.objects.create_user(username="medecin", password="1234", email="medecin@example.com", role="medecin", centreHospitalier=centre)
+    medecin = Medecin.objects.create(user=medecin_user, specialite="generaliste", telephone="123456789")
+    radiologue_user = User.objects.create_user(username="radiologue", password="1234", email="radiologue@example.com", role="radiologue", centreHospitalier=centre)
+    radiologue = Radiologue.objects.create(user=radiologue_user, specialite="radiographie", shift="jour", telephone="123456789")
+    patient_user = User.objects.create_user(username="patient", password="1234", email="patient@example.com", role="patient", centreHospitalier=centre)
+    patient = Patient.objects.create(
+        user=patient_user,
+        NSS=123456789,
+        nom="Doe",
+        prenom="John",
+        dateNaissance="1990-01-01",
+        adresse="123 Test Street",
+        telephone="123456789",
+        mutuelle="Mutuelle Test",
+        contactUrgence="Emergency Contact",
+        medecin=medecin,
+        centreHospitalier=centre
+    )
+    dossier = DossierMedical.objects.create(patient=patient)
+    consultation = Consultation.objects.create(
+        dossier=dossier,
+        dateConsultation="2025-01-01",
+        diagnostic="Test Diagnostic",
+        resume="Test Resume",
+        status="planifie"
+    )
+    return Examen.objects.create(
+        consultation=consultation, radiologue=radiologue, type="radio", etat="en_cours", priorite="urgent"
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_radio_image_is_uploaded_in_background(local_storage):
+    examen = create_examen()
+    client = APIClient()
+    client.login(username="radiologue", password="1234")
+
+    url = reverse("create_resultat_radio", kwargs={"examen_id": examen.examenID})
+    image = SimpleUploadedFile("thorax.png", b"\x89PNG fake image", content_type="image/png")
+    response = client.post(url, {"radioImgURL": image, "type": "radiographie", "rapport": "RAS"}, format="multipart")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    resultat = ResultatRadio.objects.get(pk=response.data["resRadioID"])
+    assert resultat.uploadStatus == "televerse"
+    assert resultat.radioImgURL.startswith("/media/radiology/")
+    assert resultat.stagedImage == ""
+    assert list((local_storage / "staging").iterdir()) == []
+    uploaded = local_storage / "radiology" / resultat.radioImgURL.rsplit("/", 1)[-1]
+    assert uploaded.read_bytes() == b"\x89PNG fake image"
+
+    detail = client.get(reverse("resultat_radio_detail", kwargs={"resultat_id": resultat.pk}))
+    assert detail.data["uploadStatus"] == "televerse"
+
+
+@pytest.mark.django_db
+def test_staged_image_is_removed_when_the_result_is_not_saved(local_storage, monkeypatch):
+    examen = create_examen()
+    client = APIClient()
+    client.login(username="radiologue", password="1234")
+
+    def failing_schedule(resultat):
+        raise RuntimeError("queue unavailable")
+
+    monkeypatch.setattr(radiologue_view, "schedule_image_upload", failing_schedule)
+    url = reverse("create_resultat_radio", kwargs={"examen_id": examen.examenID})
+    image = SimpleUploadedFile("thorax.png", b"\x89PNG fake image", content_type="image/png")
+    with pytest.raises(RuntimeError):
+        client.post(url, {"radioImgURL": image, "type": "radiographie", "rapport": "RAS"}, format="multipart")
+
+    assert not ResultatRadio.objects.exists()
+    assert list((local_storage / "staging").iterdir()) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_upload_is_kept_for_retry(local_storage, settings):
+    settings.RADIOLOGY_STORAGE_BACKEND = "tests.test_radiology_upload.UnavailableStorage"
+    examen = create_examen()
+    client = APIClient()
+    client.login(username="radiologue", password="1234")
+
+    url = reverse("create_resultat_radio", kwargs={"examen_id": examen.examenID})
+    response = client.post(url, {
+        "radioImgURL": "data:image/png;base64,iVBORw0KGgo=",
+        "type": "scanner",
+        "rapport": "RAS",
+    }, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+    resultat = ResultatRadio.objects.get(pk=response.data["resRadioID"])
+    assert resultat.uploadStatus == "echec"
+    assert resultat.radioImgURL is None
+
+    settings.RADIOLOGY_STORAGE_BACKEND = "healthhub_back.accounts.radiologue.radiologue_storage.LocalStorage"
+    call_command("retry_radiology_uploads", stdout=StringIO())
+    resultat.refresh_from_db()
+    assert resultat.uploadStatus == "televerse"
+    assert resultat.radioImgURL.endswith(".png")
+
+
+@pytest.mark.django_db
+def test_abandoned_uploads_are_retried(local_storage, settings):
+    settings.RADIOLOGY_UPLOAD_STALE_SECONDS = 600
+    examen = create_examen()
+    # Claimed by a worker that died mid-upload, and by one still uploading
+    abandoned, in_flight = [
+        ResultatRadio.objects.create(
+            examen=examen, type="scanner", rapport="RAS", uploadStatus="en_cours",
+            stagedImage=stage_image(SimpleUploadedFile("scan.png", b"\x89PNG")),
+            uploadStartedAt=timezone.now() - timedelta(seconds=age),
+        )
+        for age in (3600, 60)
+    ]
+
+    call_command("retry_radiology_uploads", "--failed-only", stdout=StringIO())
+    abandoned.refresh_from_db()
+    in_flight.refresh_from_db()
+    assert abandoned.uploadStatus == "televerse" and abandoned.radioImgURL.endswith(".png")
+    assert in_flight.uploadStatus == "en_cours" and in_flight.radioImgURL is None
+
+
+class UnavailableStorage:
+    def upload(self, source):
+        raise ConnectionError("Storage unavailable")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_local_paths_are_rejected(local_storage):
+    examen = create_examen()
+    client = APIClient()
+    client.login(username="radiologue", password="1234")
+
+    url = reverse("create_resultat_radio", kwargs={"examen_id": examen.examenID})
+    for source in ["/etc/passwd", "../backend/.env", "file:///etc/passwd"]:
+        response = client.post(url, {"radioImgURL": source, "type": "scanner", "rapport": "RAS"}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not ResultatRadio.objects.exists()
+
+
+def test_storage_never_reads_unstaged_files(local_storage):
+    storage = LocalStorage()
+    with pytest.raises(ValueError):
+        storage.upload("/etc/passwd")
+    assert storage.upload("https://example.com/scan.png") == "https://example.com/scan.png"
+    assert not (local_storage / "radiology").exists()
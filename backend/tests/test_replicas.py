@@ -0,0 +1,111 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, router
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.authtoken.models import Token
+from healthhub_back.common.auth.authentication import CachedTokenAuthentication, token_cache
+from healthhub_back.common.replicas import ReplicaMiddleware, ReplicaSet, replica_set
+from healthhub_back.models import CentreHospitalier, Consultation, Patient, User
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings, monkeypatch, tmp_path):
+    # The replica health is per process; the pins need a shared cache
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": str(tmp_path)}}
+    settings.DATABASE_REPLICAS = ["replica_0"]
+    settings.REPLICA_MAX_LAG = 5
+    lags = {"replica_0": 0}
+    monkeypatch.setattr(replica_set, "lag", lambda alias: lags[alias])
+    replica_set.reset()
+    cache.clear()
+    yield lags
+    replica_set.reset()
+    cache.clear()
+
+
+def handle(method, token, write=False, view=None):
+    """
+    Runs a request through the middleware; returns the aliases its reads
+    went to before and after its (optional) write.
+    """
+    reads = []
+
+    def record(request):
+        reads.append(Patient.objects.all().db)
+        if write:
+            router.db_for_write(Consultation)
+            reads.append(Patient.objects.all().db)
+        return HttpResponse()
+
+    request = getattr(RequestFactory(), method)("/api/", HTTP_AUTHORIZATION=f"Token {token}")
+    ReplicaMiddleware(view or record)(request)
+    return reads
+
+
+def test_clients_read_their_writes_from_the_primary():
+    assert handle("get", "doctor") == ["replica_0"]
+    assert handle("post", "doctor", write=True) == ["default", "default"]
+
+    assert handle("get", "doctor") == ["default"]
+    assert handle("get", "nurse") == ["replica_0"]
+
+
+def test_a_write_moves_the_rest_of_the_request_to_the_primary():
+    assert handle("get", "doctor", write=True) == ["replica_0", "default"]
+    assert handle("get", "doctor") == ["default"]
+
+
+def test_unhealthy_replicas_fall_back_to_the_primary(replicas, settings, monkeypatch):
+    settings.REPLICA_CHECK_INTERVAL = 0
+    replicas["replica_0"] = 60
+    assert handle("get", "doctor") == ["default"]
+
+    def unreachable(alias):
+        raise OperationalError("Can't connect to MySQL server")
+    monkeypatch.setattr(replica_set, "lag", unreachable)
+    assert handle("get", "doctor") == ["default"]
+
+
+def test_health_is_rechecked_after_the_interval(replicas, settings):
+    settings.REPLICA_CHECK_INTERVAL = 3600
+    assert handle("get", "doctor") == ["replica_0"]
+    replicas["replica_0"] = 60
+    assert handle("get", "doctor") == ["replica_0"]
+    settings.REPLICA_CHECK_INTERVAL = 0
+    assert handle("get", "doctor") == ["default"]
+
+
+def test_reads_outside_requests_use_the_primary():
+    assert Patient.objects.all().db == "default"
+    assert router.allow_migrate("replica_0", "healthhub_back") is False
+
+
+@pytest.mark.django_db
+def test_lag_of_a_database_that_does_not_replicate():
+    assert ReplicaSet().lag("default") == 0
+
+
+def test_replicas_need_a_shared_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    with pytest.raises(ImproperlyConfigured):
+        ReplicaMiddleware(lambda request: HttpResponse())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_tokens_are_looked_up_on_the_primary():
+    # A token created at login may not have reached the replica yet
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    user = User.objects.create_user(username="doctor", password="1234", email="doctor@example.com", role="medecin", centreHospitalier=centre)
+    token = Token.objects.create(user=user)
+    token_cache.clear()
+    authenticated = []
+
+    def view(request):
+        assert Patient.objects.all().db == "replica_0"
+        authenticated.append(CachedTokenAuthentication().authenticate_credentials(token.key)[0])
+        return HttpResponse()
+
+    handle("get", token.key, view=view)
+    assert authenticated == [user]
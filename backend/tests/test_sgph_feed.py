@@ -0,0 +1,97 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_api_key.models import APIKey
+from healthhub_back.models import Medicament, Ordonnance, OrdonnanceMedicament
+
+
+@pytest.fixture
+def sgph_client(settings):
+    settings.SGPH_FEED_SETTLE_SECONDS = 0
+    _, key = APIKey.objects.create_key(name="sgph")
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Api-Key {key}")
+    return client
+
+
+@pytest.mark.django_db
+def test_feed_returns_only_changes_since_cursor(sgph_client, medical_file):
+    patient, dossier, consultation = medical_file
+    medicament = Medicament.objects.create(nom="Doliprane", type="comprime", description="Paracetamol")
+    ordonnances = [Ordonnance.objects.create(consultation=consultation) for _ in range(3)]
+    OrdonnanceMedicament.objects.create(
+        ordonnance=ordonnances[0], med=medicament, duree="7 jours", dosage="moyen",
+        frequence="3 fois par jour", instructions="Pendant les repas"
+    )
+    url = reverse("get_ordonnances_feed")
+
+    first = sgph_client.get(url, {"limit": 2})
+    assert first.status_code == status.HTTP_200_OK
+    assert first.data["has_more"] is True
+    second = sgph_client.get(url, {"limit": 2, "cursor": first.data["cursor"]})
+    assert second.data["has_more"] is False
+    seen = [row["ordonnanceID"] for row in first.data["results"] + second.data["results"]]
+    assert sorted(seen) == sorted(str(o.pk) for o in ordonnances)
+    assert any(row["medicaments"] for row in first.data["results"] + second.data["results"])
+
+    # Idle poll: nothing new, the cursor stays put
+    cursor = second.data["cursor"]
+    idle = sgph_client.get(url, {"cursor": cursor})
+    assert idle.data["results"] == []
+    assert idle.data["cursor"] == cursor
+
+    # Unchanged feed: 304 on the ETag
+    not_modified = sgph_client.get(url, {"cursor": cursor}, HTTP_IF_NONE_MATCH=idle["ETag"])
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Validating an ordonnance puts it back in the feed
+    sgph_client.post(reverse("validate_ordonnance", kwargs={"ordonnance_id": ordonnances[1].pk}))
+    changed = sgph_client.get(url, {"cursor": cursor}, HTTP_IF_NONE_MATCH=idle["ETag"])
+    assert changed.status_code == status.HTTP_200_OK
+    assert [row["ordonnanceID"] for row in changed.data["results"]] == [str(ordonnances[1].pk)]
+    assert changed.data["results"][0]["valide"] is True
+
+
+@pytest.mark.django_db
+def test_feed_serializes_with_constant_queries(sgph_client, django_assert_max_num_queries, medical_file):
+    patient, dossier, consultation = medical_file
+    medicament = Medicament.objects.create(nom="Doliprane", type="comprime", description="Paracetamol")
+    for _ in range(20):
+        ordonnance = Ordonnance.objects.create(consultation=consultation)
+        OrdonnanceMedicament.objects.create(
+            ordonnance=ordonnance, med=medicament, duree="7 jours", dosage="moyen",
+            frequence="3 fois par jour", instructions="Pendant les repas"
+        )
+
+    # API key check, ETag aggregate, page, lines, medicaments
+    with django_assert_max_num_queries(5):
+        response = sgph_client.get(reverse("get_ordonnances_feed"), {"limit": 20})
+    assert len(response.data["results"]) == 20
+
+
+@pytest.mark.django_db
+def test_batch_validation_reports_each_outcome(sgph_client, medical_file):
+    patient, dossier, consultation = medical_file
+    pending = Ordonnance.objects.create(consultation=consultation)
+    valid = Ordonnance.objects.create(consultation=consultation, valide=True)
+    missing = "00000000-0000-0000-0000-000000000000"
+
+    response = sgph_client.post(reverse("validate_ordonnances_batch"), {
+        "ordonnance_ids": [str(pending.pk), str(valid.pk), missing],
+    }, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["outcomes"] == {
+        str(pending.pk): "validated",
+        str(valid.pk): "already_valid",
+        missing: "not_found",
+    }
+    assert sorted(row["ordonnanceID"] for row in response.data["ordonnances"]) == sorted([str(pending.pk), str(valid.pk)])
+    pending.refresh_from_db()
+    assert pending.valide is True
+
+
+@pytest.mark.django_db
+def test_batch_validation_rejects_invalid_ids(sgph_client):
+    response = sgph_client.post(reverse("validate_ordonnances_batch"), {"ordonnance_ids": ["nope"]}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,78 @@
+import pytest
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from healthhub_back.models import CentreHospitalier
+from healthhub_back.common.auth.authentication import TokenCache, token_cache
+
+User = get_user_model()
+
+
+def token_client(username, role="admin"):
+    centre = CentreHospitalier.objects.create(nom="Centre Test", place="Test City")
+    user = User.objects.create_user(username=username, password="old-password", email=f"{username}@example.com", role=role, centreHospitalier=centre)
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return user, token, client
+
+
+def test_token_cache_expires_and_evicts(monkeypatch):
+    cache = TokenCache(max_size=2, ttl=10)
+    user = User(username="u")
+    clock = [100.0]
+    monkeypatch.setattr("healthhub_back.common.auth.authentication.time.monotonic", lambda: clock[0])
+
+    cache.set("a", (user, None))
+    cache.set("b", (user, None))
+    assert cache.get("a") is not None
+    cache.set("c", (user, None))  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.django_db
+def test_cached_token_skips_auth_query(django_assert_num_queries):
+    user, token, client = token_client("admin")
+    url = reverse("token-cache-metrics")
+
+    assert client.get(url).status_code == status.HTTP_200_OK
+    hits = token_cache.stats()["hits"]
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.data["hits"] == hits + 1
+
+
+@pytest.mark.django_db
+def test_logout_and_password_change_invalidate_the_cache():
+    user, token, client = token_client("admin")
+    url = reverse("token-cache-metrics")
+    assert client.get(url).status_code == status.HTTP_200_OK
+
+    client.post(reverse("logout"))
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    token = Token.objects.create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    response = client.put(reverse("change_password"), {"old_password": "old-password", "new_password": "new-password"})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_admin_user_update_invalidates_the_cache():
+    admin, admin_token, admin_client = token_client("admin")
+    user, token, client = token_client("staff", role="medecin")
+    url = reverse("token-cache-metrics")
+    assert client.get(url).status_code == status.HTTP_403_FORBIDDEN
+
+    detail = reverse("admin_user_detail", kwargs={"user_id": user.id})
+    assert admin_client.patch(detail, {"role": "admin"}).status_code == status.HTTP_200_OK
+    assert client.get(url).status_code == status.HTTP_200_OK
+
+    assert admin_client.delete(detail).status_code == status.HTTP_204_NO_CONTENT
+    assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
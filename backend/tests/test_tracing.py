@@ -0,0 +1,84 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework import status
+from healthhub_back.common.tracing import RingBufferExporter, get_exporter, span, start_trace
+from healthhub_back.models import User
+
+
+@pytest.fixture(autouse=True)
+def fresh_exporter():
+    # The ring buffer is per process and outlives the rolled back test transactions
+    get_exporter().clear()
+    yield
+    get_exporter().clear()
+
+
+def login(username, role, centre):
+    User.objects.create_user(username=username, password="1234", email=f"{username}@example.com", role=role, centreHospitalier=centre)
+    client = APIClient()
+    client.login(username=username, password="1234")
+    return client
+
+
+@pytest.mark.django_db
+def test_sampled_request_is_served_to_admins(settings, medical_file):
+    settings.TRACING_SAMPLE_RATE = 1.0
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    url = reverse("patient-medical-file", kwargs={"patient_id": patient.user.id})
+    assert client.get(url).status_code == status.HTTP_200_OK
+
+    settings.TRACING_SAMPLE_RATE = 0.0
+    admin = login("admin", "admin", consultation.centreHospitalier)
+    response = admin.get(reverse("trace-buffer"))
+    assert response.status_code == status.HTTP_200_OK
+    [trace] = response.data["traces"]
+    assert trace["name"] == "request" and trace["error"] is None
+    assert trace["attributes"] == {
+        "method": "GET", "path": url, "route": "api/patient/medical-file/<uuid:patient_id>/",
+        "status": 200, "role": "medecin",
+    }
+    spans = {span["span_id"]: span for span in trace["spans"]}
+    names = {span["name"] for span in spans.values()}
+    assert {"view", "permissions", "serializer"} <= names
+    assert all(
+        spans[span["parent_id"]]["name"] == "view"
+        for span in spans.values() if span["name"] in ("permissions", "serializer")
+    )
+    assert all(0 <= span["duration_ms"] <= trace["duration_ms"] for span in spans.values())
+
+
+@pytest.mark.django_db
+def test_trace_buffer_is_admin_only(medical_file):
+    patient, dossier, consultation = medical_file
+    client = APIClient()
+    client.login(username="medecin", password="1234")
+    assert client.get(reverse("trace-buffer")).status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_unsampled_spans_record_nothing(settings):
+    settings.TRACING_SAMPLE_RATE = 0.0
+    with start_trace("request") as root, span("view") as child:
+        assert root is None and child is None
+    assert get_exporter().dump() == []
+
+
+def test_ring_buffer_keeps_the_last_traces():
+    exporter = RingBufferExporter(size=2)
+    for n in range(3):
+        exporter.export({"n": n})
+    assert exporter.dump() == [{"n": 2}, {"n": 1}]
+
+
+def test_failing_spans_record_the_error(settings):
+    settings.TRACING_SAMPLE_RATE = 1.0
+    with pytest.raises(ValueError):
+        with start_trace("radiology.upload", resultat="1"), span("upload.storage"):
+            raise ValueError
+
+    [trace] = get_exporter().dump()
+    assert trace["attributes"] == {"resultat": "1"} and trace["error"] == "ValueError"
+    [child] = trace["spans"]
+    assert child["name"] == "upload.storage" and child["error"] == "ValueError"